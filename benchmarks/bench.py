@@ -0,0 +1,196 @@
+# bench.py - Offline benchmarks for the SEO analysis pipeline
+#
+# Runs each stage over the recorded pages in benchmarks/corpus with Groq
+# replaced by a stub, reports per-stage timings and peak memory, and compares
+# them with a saved baseline. Baselines are machine specific: save one on the
+# machine you compare on.
+#
+#   python benchmarks/bench.py            # compare with benchmarks/baseline.json
+#   python benchmarks/bench.py --save     # record a new baseline
+import argparse
+import gzip
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CORPUS = pathlib.Path(__file__).resolve().parent / "corpus"
+DEFAULT_BASELINE = pathlib.Path(__file__).resolve().parent / "baseline.json"
+
+# Keep the app's on-disk stores out of the measurements
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["HISTORY_DB_PATH"] = ""
+os.environ.setdefault("JOBS_DB_PATH", ":memory:")
+sys.path.insert(0, str(ROOT))
+
+import scrap  # noqa: E402
+
+PAGE_URL = "https://shop.example/benchmark"
+BUSINESS_CONTEXT = scrap.build_business_context("Sales", "B2C", "Mid-Range", "National", None, "Buy")
+STUB_RESPONSE = json.dumps({
+    "recommendations": [
+        {
+            "parameter": f"Parameter {i}",
+            "issue": "Stubbed issue text of a realistic length for the benchmark run",
+            "recommendation": "Stubbed recommendation text of a realistic length for the benchmark run",
+            "examples": ["First example", "Second example", "Third example"],
+            "priority": "medium"
+        }
+        for i in range(10)
+    ]
+}, indent=2)
+
+
+class StubCompletions:
+    """
+    Stands in for client.chat.completions with a fixed, instant completion
+    """
+
+    def create(self, **kwargs):
+        message = types.SimpleNamespace(content=STUB_RESPONSE)
+        usage = types.SimpleNamespace(prompt_tokens=700, completion_tokens=500, total_tokens=1200)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+
+def install_stubs():
+    scrap.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=StubCompletions()))
+    scrap.llm_cache = scrap.LLMCache("", 0, 0, 0)
+    scrap.groq_scheduler = scrap.GroqScheduler(0, 0, 0, {"interactive": None, "batch": None})
+
+
+def load_corpus(names=None) -> dict:
+    pages = {}
+    for path in sorted(CORPUS.glob("*.html.gz")):
+        name = path.name[:-len(".html.gz")]
+        if not names or name in names:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def stages_for(html: str) -> dict:
+    """
+    The stages measured for one page, each a zero-argument callable
+    """
+    seo_data = scrap.parse_seo_html(html, PAGE_URL)
+    text = seo_data["content"]["text"]
+    title = seo_data["title"]["content"] or ''
+
+    def pipeline():
+        data = scrap.parse_seo_html(html, PAGE_URL)
+        return scrap.get_groq_recommendations(data, BUSINESS_CONTEXT)
+
+    return {
+        "parse": lambda: scrap.parse_seo_html(html, PAGE_URL),
+        "extract": lambda: scrap.extract_page(html, PAGE_URL),
+        "content_context": lambda: scrap.analyze_content_context(text),
+        "headings": lambda: scrap.analyze_heading_structure(seo_data["headings"]),
+        "meta_quality": lambda: scrap.analyze_meta_quality(title, seo_data["meta_description"], PAGE_URL),
+        "prompt": lambda: scrap.build_groq_request(seo_data, BUSINESS_CONTEXT),
+        "rules": lambda: scrap.rule_recommendations(seo_data, BUSINESS_CONTEXT),
+        "recommendations": lambda: scrap.get_groq_recommendations(seo_data, BUSINESS_CONTEXT),
+        "pipeline": pipeline,
+    }
+
+
+def measure(fn, min_time: float, min_runs: int, max_runs: int) -> dict:
+    fn()  # warm-up
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    # Peak memory in a separate run; tracemalloc slows everything down
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "runs": len(timings),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Stages slower or hungrier than the baseline by more than threshold (and
+    by more than a noise floor of 0.5 ms / 256 KB)
+    """
+    regressions = []
+    for page, stages in results.items():
+        for stage, current in stages.items():
+            base = baseline.get(page, {}).get(stage)
+            if base is None:
+                continue
+            if current["median_ms"] > base["median_ms"] * (1 + threshold) and current["median_ms"] - base["median_ms"] > 0.5:
+                regressions.append((page, stage, "time", base["median_ms"], current["median_ms"]))
+            if current["peak_kb"] > base["peak_kb"] * (1 + threshold) and current["peak_kb"] - base["peak_kb"] > 256:
+                regressions.append((page, stage, "memory", base["peak_kb"], current["peak_kb"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the SEO analysis pipeline")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="baseline file to compare with or save to")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before flagging, as a fraction")
+    parser.add_argument("--pages", help="comma separated corpus pages to run (default all)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend timing each stage")
+    parser.add_argument("--min-runs", type=int, default=5)
+    parser.add_argument("--max-runs", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    install_stubs()
+    pages = load_corpus(args.pages.split(",") if args.pages else None)
+    if not pages:
+        parser.error(f"no corpus pages found in {CORPUS}")
+
+    results = {}
+    for page, html in pages.items():
+        results[page] = {}
+        for stage, fn in stages_for(html).items():
+            results[page][stage] = measure(fn, args.min_time, args.min_runs, args.max_runs)
+
+    baseline_path = pathlib.Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text())["results"] if baseline_path.exists() and not args.save else {}
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.json:
+        print(json.dumps({"results": results, "regressions": regressions}, indent=2))
+    else:
+        print(f"{'page':<14} {'stage':<16} {'median ms':>10} {'min ms':>9} {'runs':>5} {'peak KB':>9} {'baseline ms':>12}")
+        for page, stages in results.items():
+            for stage, r in stages.items():
+                base = baseline.get(page, {}).get(stage)
+                base_ms = f"{base['median_ms']:.3f}" if base else "-"
+                print(f"{page:<14} {stage:<16} {r['median_ms']:>10.3f} {r['min_ms']:>9.3f} {r['runs']:>5} {r['peak_kb']:>9.1f} {base_ms:>12}")
+        for page, stage, kind, before, after in regressions:
+            unit = "ms" if kind == "time" else "KB"
+            print(f"REGRESSION {page}/{stage} {kind}: {before} -> {after} {unit}")
+
+    if args.save:
+        baseline_path.write_text(json.dumps({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results
+        }, indent=2) + "\n")
+        print(f"Baseline saved to {baseline_path}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
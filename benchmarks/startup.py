@@ -0,0 +1,129 @@
+# startup.py - Cold-start check for the app
+#
+# Imports scrap in fresh interpreters (what `uvicorn scrap:app` does on a new
+# dyno), reports how long the import took and which modules dominated it, and
+# fails when the median is over budget or when a module that is meant to load
+# lazily (Groq SDK, Jinja) or not at all (BeautifulSoup) was imported eagerly.
+# Like the benchmark baselines, the budget is machine specific. tests/test_startup.py
+# runs it with the test suite.
+#
+#   python benchmarks/startup.py                  # check against the default budget
+#   python benchmarks/startup.py --budget-ms 400 --warmup
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Tuple
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# Loaded on first use or by the warm-up, never by the import itself; bs4 is
+# only the tests' reference extractor
+LAZY_MODULES = ("groq", "jinja2", "bs4")
+
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import scrap
+result = {{
+    "import_ms": (time.perf_counter() - started) * 1000,
+    "eager": [name for name in {lazy!r} if name in sys.modules],
+}}
+if {warmup!r}:
+    result["warmup_ms"] = {{name: seconds * 1000 for name, seconds in asyncio.run(scrap.warm_up()).items()}}
+    scrap.parse_executor.shutdown()
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[dict, int]:
+    """
+    Cumulative microseconds of each module imported directly by scrap, and
+    the microseconds spent running scrap's own module body
+    """
+    modules, body = {}, 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line.split("|")
+        try:
+            own, cumulative = int(own.split(":")[1]), int(cumulative)
+        except ValueError:
+            continue  # the header line
+        # Children are listed before their parent, indented two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "scrap":
+                body = own
+                break
+            modules = {}  # imports of the probe itself, not of scrap
+        elif depth == 1:
+            modules[name.strip()] = cumulative
+    return modules, body
+
+
+def probe(warmup: bool) -> dict:
+    env = dict(os.environ, LLM_CACHE_PATH="", HISTORY_DB_PATH="", JOBS_DB_PATH=":memory:")
+    code = PROBE.format(root=str(ROOT), lazy=LAZY_MODULES, warmup=warmup)
+    # A scratch working directory keeps the app's static/ and templates/ out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True
+        )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["modules"], result["body_us"] = parse_importtime(completed.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start check for the app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "750")),
+                        help="allowed median import time (default 750, or IMPORT_BUDGET_MS)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest direct imports to list")
+    parser.add_argument("--warmup", action="store_true", help="also time the warm-up steps")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    probe(False)  # refresh __pycache__ so compiling scrap.py is not measured
+    runs = [probe(args.warmup) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    body_ms = statistics.median(run["body_us"] for run in runs) / 1000
+    modules = {name: statistics.median(run["modules"].get(name, 0) for run in runs) / 1000 for name in runs[0]["modules"]}
+    slowest = sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+    eager = sorted({name for run in runs for name in run["eager"]})
+    warmup = {name: statistics.median(run["warmup_ms"][name] for run in runs) for name in runs[0].get("warmup_ms", {})}
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.1f} ms, budget {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+
+    if args.json:
+        print(json.dumps({
+            "import_ms": import_ms, "body_ms": body_ms, "slowest": slowest,
+            "warmup_ms": warmup, "failures": failures
+        }, indent=2))
+    else:
+        print(f"import scrap: {import_ms:.1f} ms median of {args.runs} (budget {args.budget_ms:.0f} ms), "
+              f"{body_ms:.1f} ms of it running the module body")
+        for name, ms in slowest:
+            print(f"  {name:<32} {ms:>8.1f} ms")
+        for name, ms in warmup.items():
+            print(f"warm-up {name:<24} {ms:>8.1f} ms")
+        for failure in failures:
+            print(f"FAIL {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,707 +1,4696 @@
 # main.py - SEO Analyzer with Business Context
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Request, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import asyncio
+import functools
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from html.entities import html5 as HTML5_ENTITIES
+from html.parser import HTMLParser
+from collections import Counter, OrderedDict, deque
 import re
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode, urldefrag
+from urllib.robotparser import RobotFileParser
 import os
-from groq import Groq
+import sys
 import json
-import time
-from typing import Dict, List, Optional
+import orjson
+import gzip
+import math
+from typing import Dict, List, Optional, Tuple, Union
 import pathlib
+import hashlib
+import heapq
+import sqlite3
+import threading
+import types
+import uuid
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import brotli  # in requirements.txt; without it responses fall back to gzip
+except ImportError:
+    brotli = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the job queue and warm-up with the server, release everything on stop
+    """
+    await start_up()
+    try:
+        yield
+    finally:
+        await shut_down()
+
 
-app = FastAPI(title="Professional SEO Analyzer with AI & Business Context")
+app = FastAPI(title="Professional SEO Analyzer with AI & Business Context", lifespan=lifespan)
 
 # Initialize FastMCP for context management - removed for deployment
 # mcp = FastMCP("SEO_Analyzer_Context")
 
-# Create required directories if they don't exist
-os.makedirs("static", exist_ok=True)
-os.makedirs("templates", exist_ok=True)
+# Setup templates and static files. The directories are created by start_up()
+# and the Jinja environment on first render, so importing the app stays cheap.
+app.mount("/static", StaticFiles(directory="static", check_dir=False), name="static")
 
-# Setup templates and static files
-try:
-    app.mount("/static", StaticFiles(directory="static"), name="static")
-except RuntimeError:
-    os.makedirs("static", exist_ok=True)
-    app.mount("/static", StaticFiles(directory="static"), name="static")
+_templates = None
+
+
+def get_templates():
+    """
+    Return the Jinja2 templates, creating them on first use
+    """
+    global _templates
+    if _templates is None:
+        from fastapi.templating import Jinja2Templates
+        _templates = Jinja2Templates(directory="templates")
+    return _templates
 
-templates = Jinja2Templates(directory="templates")
 
-# Initialize Groq client
+# Groq client, created on first use (see get_groq_client)
 GROQ_API_KEY = "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"
-client = Groq(api_key=GROQ_API_KEY)
+client = None
+_client_lock = threading.Lock()
+
+
+def get_groq_client():
+    """
+    Return the Groq client, importing groq and creating the client on first use.
+    GROQ_BASE_URL (read by the client) points it at another endpoint, e.g. a local fake server.
+    Retries are left to groq_scheduler so 429s are paced against the shared budget.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from groq import Groq
+                client = Groq(api_key=GROQ_API_KEY, max_retries=0)
+    return client
+
 
 # User-Agent header
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
+# Async fetch engine settings (shared connection pool for all analyses)
+FETCH_MAX_CONNECTIONS = int(os.environ.get("FETCH_MAX_CONNECTIONS", "200"))
+FETCH_MAX_KEEPALIVE = int(os.environ.get("FETCH_MAX_KEEPALIVE", "50"))
+FETCH_KEEPALIVE_EXPIRY = float(os.environ.get("FETCH_KEEPALIVE_EXPIRY", "30"))
+FETCH_PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", "6"))
+FETCH_CONNECT_TIMEOUT = float(os.environ.get("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_READ_TIMEOUT = float(os.environ.get("FETCH_READ_TIMEOUT", "10"))
 
-# FastMCP Tools for Context Analysis - converted to regular functions
-def analyze_content_context(content: str, max_length: int = 2000) -> Dict:
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
     """
-    Analyze website content to extract key themes, topics, and context
-    using FastMCP for better understanding
+    Return the shared async HTTP client, creating it on first use
     """
-    # Clean content
-    clean_content = ' '.join(content.split())[:max_length]
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(FETCH_READ_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=FETCH_MAX_KEEPALIVE,
+                keepalive_expiry=FETCH_KEEPALIVE_EXPIRY
+            )
+        )
+    return _http_client
 
-    # Extract key information
-    words = clean_content.lower().split()
-    word_freq = {}
 
-    # Common words to ignore
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'is', 'are', 'was',
-                  'were', 'be', 'been', 'being'}
+class HostLimiter:
+    """
+    Cap the number of concurrent requests per host
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[str, List] = {}
 
-    for word in words:
-        word = re.sub(r'[^a-z0-9]', '', word)
-        if len(word) > 3 and word not in stop_words:
-            word_freq[word] = word_freq.get(word, 0) + 1
+    def _host(self, url: str) -> str:
+        return urlparse(url).netloc.lower()
 
-    # Get top keywords
-    top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:10]
+    async def acquire(self, url: str) -> str:
+        host = self._host(url)
+        slot = self._slots.setdefault(host, [asyncio.Semaphore(self.limit), 0])
+        slot[1] += 1
+        try:
+            await slot[0].acquire()
+        except BaseException:
+            self._forget(host, slot)
+            raise
+        return host
 
-    # Detect content type
-    content_lower = clean_content.lower()
-    content_type = "general"
+    def release(self, host: str):
+        slot = self._slots.get(host)
+        if slot:
+            slot[0].release()
+            self._forget(host, slot)
 
-    if any(word in content_lower for word in ['shop', 'buy', 'product', 'price', 'cart', 'checkout']):
-        content_type = "e-commerce"
-    elif any(word in content_lower for word in ['blog', 'article', 'post', 'author', 'published']):
-        content_type = "blog"
-    elif any(word in content_lower for word in ['service', 'consulting', 'solution', 'contact', 'about']):
-        content_type = "service"
-    elif any(word in content_lower for word in ['portfolio', 'project', 'work', 'design']):
-        content_type = "portfolio"
+    def _forget(self, host: str, slot: List):
+        # Drop idle hosts so the table does not grow with every domain ever seen
+        slot[1] -= 1
+        if slot[1] <= 0:
+            self._slots.pop(host, None)
 
-    return {
-        "keywords": [k[0] for k in top_keywords],
-        "content_type": content_type,
-        "content_length": len(clean_content),
-        "word_count": len(words),
-        "preview": clean_content[:500]
-    }
 
+host_limiter = HostLimiter(FETCH_PER_HOST_LIMIT)
 
-def analyze_heading_structure(headings: Dict) -> Dict:
+
+FETCH_MAX_BYTES = int(os.environ.get("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class PageTooLarge(Exception):
     """
-    Analyze heading structure and hierarchy for SEO best practices
+    Raised when a page is bigger than the download limit
     """
-    h1_count = len(headings.get('h1', []))
-    h2_count = len(headings.get('h2', []))
-    h3_count = len(headings.get('h3', []))
 
-    issues = []
-    recommendations = []
+    def __init__(self, limit: int):
+        super().__init__(f"Page exceeds the {limit} byte download limit")
 
-    if h1_count == 0:
-        issues.append("No H1 tag found")
-        recommendations.append("Add a single, descriptive H1 tag")
-    elif h1_count > 1:
-        issues.append(f"Multiple H1 tags found ({h1_count})")
-        recommendations.append("Use only one H1 tag per page")
 
-    if h2_count == 0:
-        issues.append("No H2 tags found")
-        recommendations.append("Add H2 tags to structure your content")
+def _check_declared_size(response: httpx.Response, max_bytes: int):
+    declared = response.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise PageTooLarge(max_bytes)
 
-    hierarchy_score = 100
-    if h1_count != 1:
-        hierarchy_score -= 30
-    if h2_count == 0:
-        hierarchy_score -= 20
-    if h3_count > h2_count * 3:
-        hierarchy_score -= 10
 
+def _check_received_size(response: httpx.Response, received: int, max_bytes: int):
+    if response.num_bytes_downloaded > max_bytes or received > max_bytes:
+        raise PageTooLarge(max_bytes)
+
+
+class PageNotModified(Exception):
+    """
+    Raised when a conditional request is answered with 304 Not Modified
+    """
+
+
+def _conditional_headers(validators: Optional[Dict]) -> Dict:
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def _response_validators(response: httpx.Response) -> Dict:
     return {
-        "h1_count": h1_count,
-        "h2_count": h2_count,
-        "h3_count": h3_count,
-        "issues": issues,
-        "recommendations": recommendations,
-        "hierarchy_score": max(0, hierarchy_score)
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified")
     }
 
 
-def analyze_meta_quality(title: str, description: str, url: str) -> Dict:
+async def fetch_html(url: str, max_bytes: int = FETCH_MAX_BYTES, validators: Optional[Dict] = None) -> Tuple[str, Dict, str]:
     """
-    Analyze meta tags quality and provide specific recommendations
+    Fetch a page over the shared connection pool and return its HTML, cache
+    validators and final URL after redirects, aborting the download once it
+    exceeds max_bytes. With validators the request is conditional and may
+    raise PageNotModified.
     """
-    analysis = {
-        "title": {},
-        "description": {},
-        "url_structure": {}
-    }
+    host = await host_limiter.acquire(url)
+    try:
+        async with get_http_client().stream("GET", url, headers=_conditional_headers(validators)) as response:
+            if response.status_code == 304:
+                raise PageNotModified()
+            response.raise_for_status()
+            _check_declared_size(response, max_bytes)
+            chunks = []
+            received = 0
+            async for chunk in response.aiter_text():
+                received += len(chunk)
+                _check_received_size(response, received, max_bytes)
+                chunks.append(chunk)
+            metrics.inc("seo_fetch_bytes_total", response.num_bytes_downloaded)
+            return ''.join(chunks), _response_validators(response), str(response.url)
+    finally:
+        host_limiter.release(host)
 
-    # Title analysis
-    if not title:
-        analysis["title"] = {
-            "status": "critical",
-            "issue": "Missing title tag",
-            "score": 0
-        }
-    else:
-        title_length = len(title)
-        if title_length < 30:
-            analysis["title"] = {
-                "status": "poor",
-                "issue": f"Title too short ({title_length} chars)",
-                "score": 30
-            }
-        elif title_length > 70:
-            analysis["title"] = {
-                "status": "warning",
-                "issue": f"Title too long ({title_length} chars)",
-                "score": 60
-            }
-        else:
-            analysis["title"] = {
-                "status": "good",
-                "issue": "Title length optimal",
-                "score": 100
-            }
 
-    # Description analysis
-    if not description:
-        analysis["description"] = {
-            "status": "critical",
-            "issue": "Missing meta description",
-            "score": 0
-        }
-    else:
-        desc_length = len(description)
-        if desc_length < 120:
-            analysis["description"] = {
-                "status": "warning",
-                "issue": f"Description too short ({desc_length} chars)",
-                "score": 50
-            }
-        elif desc_length > 160:
-            analysis["description"] = {
-                "status": "warning",
-                "issue": f"Description too long ({desc_length} chars)",
-                "score": 70
-            }
-        else:
-            analysis["description"] = {
-                "status": "good",
-                "issue": "Description length optimal",
-                "score": 100
-            }
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
-    # URL structure
-    url_lower = url.lower()
-    url_score = 100
-    url_issues = []
 
-    if '?' in url:
-        url_issues.append("Contains query parameters")
-        url_score -= 10
-    if len(url) > 100:
-        url_issues.append("URL too long")
-        url_score -= 20
-    if '_' in url:
-        url_issues.append("Contains underscores (use hyphens)")
-        url_score -= 10
+# Metrics: Prometheus histograms/counters plus per-request stage timings for Server-Timing
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
 
-    analysis["url_structure"] = {
-        "score": url_score,
-        "issues": url_issues
-    }
+# Stage durations (ms) of the request being handled; threads started through
+# BoundedExecutor see the same dict
+request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_timings", default=None)
 
-    return analysis
 
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
-def generate_contextual_examples(
-    content_context: Dict,
-    element_type: str,
-    current_value: str = None
-) -> List[str]:
+
+def _label_text(labels: Tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in labels) + '}'
+
+
+class Metrics:
     """
-    Generate contextual examples based on website content analysis
+    Minimal thread-safe registry rendered in the Prometheus text format
     """
-    keywords = content_context.get('keywords', [])
-    content_type = content_context.get('content_type', 'general')
 
-    examples = []
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, list]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
 
-    if element_type == "title":
-        if content_type == "e-commerce":
-            examples = [
-                f"Buy {keywords[0].title()} Online | Premium Quality | Free Shipping",
-                f"{keywords[0].title()} Products | Best Prices & Fast Delivery",
-                f"Shop {keywords[0].title()} | Trusted Store | Secure Checkout"
-            ]
-        elif content_type == "blog":
-            examples = [
-                f"Expert Guide to {keywords[0].title()} | Tips & Insights",
-                f"{keywords[0].title()} Blog | Latest News & Tutorials",
-                f"Master {keywords[0].title()} | Comprehensive Resources"
-            ]
-        elif content_type == "service":
-            examples = [
-                f"Professional {keywords[0].title()} Services | Expert Solutions",
-                f"{keywords[0].title()} Consulting | Transform Your Business",
-                f"Expert {keywords[0].title()} Solutions | Get Results Today"
-            ]
-        else:
-            examples = [
-                f"{keywords[0].title() if keywords else 'Professional'} Services | Quality Solutions",
-                f"Expert {keywords[0].title() if keywords else 'Business'} | Trusted Provider",
-                f"{keywords[0].title() if keywords else 'Your'} Solutions | Industry Leader"
-            ]
+    def counter(self, name: str, help_text: str):
+        self._help[name] = ("counter", help_text)
+        self._counters[name] = {}
 
-    elif element_type == "meta_description":
-        if content_type == "e-commerce":
-            examples = [
-                f"Discover premium {keywords[0]} products at unbeatable prices. Fast shipping, secure checkout, and 100% satisfaction guaranteed. Shop now and save!",
-                f"Your trusted source for quality {keywords[0]}. Browse our extensive collection, enjoy exclusive deals, and experience exceptional customer service.",
-                f"Find the perfect {keywords[0]} for your needs. Premium quality, competitive prices, and expert support. Order today with free shipping!"
-            ]
-        elif content_type == "blog":
-            examples = [
-                f"Explore expert insights on {keywords[0]}. Get tips, tutorials, and latest trends from industry professionals. Subscribe for weekly updates!",
-                f"Your go-to resource for {keywords[0]} knowledge. In-depth articles, how-to guides, and practical advice. Start learning today!",
-                f"Master {keywords[0]} with our comprehensive guides and expert analysis. Join thousands of readers improving their skills daily."
-            ]
-        elif content_type == "service":
-            examples = [
-                f"Professional {keywords[0]} services for growing businesses. Expert team, proven results, and personalized solutions. Get your free consultation today!",
-                f"Transform your business with our {keywords[0]} expertise. Tailored solutions, industry experience, and dedicated support. Contact us now!",
-                f"Leading {keywords[0]} provider with 10+ years experience. Custom solutions, measurable results, and exceptional service. Start your project today!"
-            ]
-        else:
-            examples = [
-                f"Discover professional solutions for {keywords[0] if keywords else 'your needs'}. Expert guidance, quality service, and proven results. Learn more today!",
-                f"Your trusted partner for {keywords[0] if keywords else 'business success'}. Comprehensive services, experienced team, and customer-first approach.",
-                f"Excellence in {keywords[0] if keywords else 'service delivery'}. Industry expertise, innovative solutions, and commitment to your success."
-            ]
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self._help[name] = ("histogram", help_text)
+        self._histograms[name] = {}
+        self._buckets[name] = buckets
 
-    elif element_type == "h1":
-        if content_type == "e-commerce":
-            examples = [
-                f"Premium {keywords[0].title()} Products for Every Need",
-                f"Discover Our Collection of Quality {keywords[0].title()}",
-                f"Shop {keywords[0].title()} | Best Selection & Prices"
-            ]
-        elif content_type == "blog":
-            examples = [
-                f"Everything You Need to Know About {keywords[0].title()}",
-                f"The Ultimate Guide to {keywords[0].title()}",
-                f"Expert Insights on {keywords[0].title()} | Latest Updates"
-            ]
-        elif content_type == "service":
-            examples = [
-                f"Professional {keywords[0].title()} Services That Deliver Results",
-                f"Transform Your Business with Expert {keywords[0].title()} Solutions",
-                f"Leading {keywords[0].title()} Provider | Trusted by Businesses"
-            ]
-        else:
-            examples = [
-                f"Professional {keywords[0].title() if keywords else 'Solutions'} for Modern Businesses",
-                f"Expert {keywords[0].title() if keywords else 'Services'} | Quality You Can Trust",
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._histograms[name].get(key)
+            if series is None:
+                # Per-bucket counts, then sum and count
+                series = self._histograms[name][key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, extra: List[Tuple[str, str, str, Dict[Tuple, float]]] = ()) -> str:
+        """
+        Text exposition; extra is (name, type, help, {labels: value}) read from stats elsewhere
+        """
+        lines = []
+        with self._lock:
+            for name, series in self._counters.items():
+                kind, help_text = self._help[name]
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_label_text(key)} {value}" for key, value in series.items()]
+            for name, histogram in self._histograms.items():
+                kind, help_text = self._help[name]
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                buckets = self._buckets[name]
+                for key, series in histogram.items():
+                    cumulative = 0
+                    for bound, count in zip(buckets, series):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_label_text(key + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_label_text(key + (('le', '+Inf'),))} {series[-1]}")
+                    lines.append(f"{name}_sum{_label_text(key)} {series[-2]}")
+                    lines.append(f"{name}_count{_label_text(key)} {series[-1]}")
+        for name, kind, help_text, series in extra:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_label_text(key)} {value}" for key, value in series.items()]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.histogram("seo_stage_duration_seconds", "Time spent in each analysis stage")
+metrics.histogram("seo_http_request_duration_seconds", "HTTP request latency until the response starts")
+metrics.counter("seo_stage_errors_total", "Analysis stages that failed")
+metrics.counter("seo_fetch_bytes_total", "Bytes downloaded from analyzed sites")
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Record a stage's duration in the histogram and in the current request's Server-Timing
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except PageNotModified:
+        raise
+    except Exception:
+        metrics.inc("seo_stage_errors_total", stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("seo_stage_duration_seconds", elapsed, stage=stage)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+def server_timing_header(timings: Dict[str, float], total_ms: float) -> str:
+    entries = [f"{stage};dur={duration:.1f}" for stage, duration in timings.items()]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ', '.join(entries)
+
+
+def collected_metrics() -> List[Tuple[str, str, str, Dict[Tuple, float]]]:
+    """
+    Counters and gauges kept as stats by the caches, the Groq scheduler and the executors
+    """
+    def labelled(label: str, stats: Dict, keys=None) -> Dict[Tuple, float]:
+        return {((label, key),): stats[key] for key in (keys or stats)}
+
+    scheduler = groq_scheduler.snapshot()
+    router = llm_router.snapshot()
+    backend_calls, backend_latency = {}, {}
+    for name, backend in router["backends"].items():
+        for event in ("calls", "failures", "timeouts"):
+            backend_calls[(("backend", name), ("event", event))] = backend[event]
+        for quantile in ("p50", "p95"):
+            if backend[f"{quantile}_ms"] is not None:
+                backend_latency[(("backend", name), ("quantile", quantile))] = backend[f"{quantile}_ms"] / 1000
+    cache_events = {}
+    for cache, stats in (("seo", seo_cache.stats), ("llm", llm_cache.stats), ("links", link_cache.stats),
+                         ("images", image_cache.stats)):
+        for event, value in stats.items():
+            cache_events[(("cache", cache), ("event", event))] = value
+    for flight, stats in (("seo", seo_flights.stats), ("analysis", analysis_flights.stats), ("links", link_flights.stats),
+                          ("images", image_flights.stats)):
+        for event, value in stats.items():
+            cache_events[(("cache", f"single_flight_{flight}"), ("event", event))] = value
+    return [
+        ("seo_cache_events_total", "counter", "Cache hits, misses and other events by cache", cache_events),
+        ("seo_llm_tokens_total", "counter", "Groq tokens reported as used",
+         {(("kind", "prompt"),): scheduler["prompt_tokens"], (("kind", "completion"),): scheduler["completion_tokens"]}),
+        ("seo_groq_events_total", "counter", "Groq calls made, rate limited, retried and rejected",
+         labelled("event", scheduler, ("requests", "rate_limited", "retries", "rejected"))),
+        ("seo_groq_wait_seconds_total", "counter", "Time Groq calls waited for rate limit budget",
+         {(): scheduler["wait_seconds"]}),
+        ("seo_llm_router_events_total", "counter", "Hedged LLM requests fired and won, failovers and missed deadlines",
+         labelled("event", router, ("hedges", "hedge_wins", "failovers", "deadline_exceeded"))),
+        ("seo_llm_backend_calls_total", "counter", "Calls, failures and timeouts per LLM backend", backend_calls),
+        ("seo_llm_backend_latency_seconds", "gauge", "Median and p95 latency over each LLM backend's recent calls",
+         backend_latency),
+        ("seo_executor_pending", "gauge", "Work running or queued per executor",
+         {(("executor", e.name),): e.pending for e in (groq_executor, groq_batch_executor, parse_executor, rules_executor)}),
+        ("seo_startup_seconds", "gauge", "Time spent importing the app and in each warm-up step",
+         labelled("phase", startup_stats)),
+    ]
+
+
+# Execution layer: blocking stages run off the event loop with bounded queues
+GROQ_WORKERS = int(os.environ.get("GROQ_WORKERS", "8"))
+GROQ_QUEUE_LIMIT = int(os.environ.get("GROQ_QUEUE_LIMIT", "32"))
+GROQ_BATCH_WORKERS = int(os.environ.get("GROQ_BATCH_WORKERS", "4"))
+GROQ_BATCH_QUEUE_LIMIT = int(os.environ.get("GROQ_BATCH_QUEUE_LIMIT", "256"))
+PARSE_EXECUTOR = os.environ.get("PARSE_EXECUTOR", "process")  # "process" or "thread"
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", str(os.cpu_count() or 2)))
+PARSE_QUEUE_LIMIT = int(os.environ.get("PARSE_QUEUE_LIMIT", "64"))
+RULES_WORKERS = int(os.environ.get("RULES_WORKERS", "2"))
+RULES_QUEUE_LIMIT = int(os.environ.get("RULES_QUEUE_LIMIT", "64"))
+SATURATED_RETRY_AFTER = int(os.environ.get("SATURATED_RETRY_AFTER", "5"))
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when a stage already has as much work queued as it is allowed
+    """
+
+    def __init__(self, stage: str, retry_after: int = SATURATED_RETRY_AFTER):
+        super().__init__(f"Server busy: {stage} queue is full, please retry shortly")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Run blocking callables in a worker pool, rejecting work beyond the queue limit
+    """
+
+    def __init__(self, name: str, kind: str, workers: int, queue_limit: int):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        if self.pending >= self.workers + self.queue_limit:
+            raise ExecutorSaturated(self.name)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if self.kind != "process":
+                # Threads carry the request's context (stage timings) like asyncio.to_thread
+                call = functools.partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self._get_executor(), call)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Interactive and batch Groq calls get separate threads so a backlog of batch
+# work waiting on the rate limit never holds up /analyze
+groq_executor = BoundedExecutor("groq", "thread", GROQ_WORKERS, GROQ_QUEUE_LIMIT)
+groq_batch_executor = BoundedExecutor("groq-batch", "thread", GROQ_BATCH_WORKERS, GROQ_BATCH_QUEUE_LIMIT)
+parse_executor = BoundedExecutor("parse", PARSE_EXECUTOR, PARSE_WORKERS, PARSE_QUEUE_LIMIT)
+# The rule engine feeds this process's keyword corpus, so it runs in threads
+rules_executor = BoundedExecutor("rules", "thread", RULES_WORKERS, RULES_QUEUE_LIMIT)
+
+
+# Groq completion settings
+GROQ_MODEL = "llama-3.3-70b-versatile"
+GROQ_TEMPERATURE = 0.3
+GROQ_MAX_TOKENS = 3072  # Increased for more detailed recommendations
+
+# Groq rate limit budget (0 disables a limit), shared by every call this process makes
+GROQ_TPM_LIMIT = int(os.environ.get("GROQ_TPM_LIMIT", "12000"))
+GROQ_RPM_LIMIT = int(os.environ.get("GROQ_RPM_LIMIT", "30"))
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "3"))
+GROQ_BACKOFF_BASE = float(os.environ.get("GROQ_BACKOFF_BASE", "1.0"))
+GROQ_INTERACTIVE_MAX_WAIT = float(os.environ.get("GROQ_INTERACTIVE_MAX_WAIT", "20"))
+GROQ_LANES = ("interactive", "batch")
+GROQ_PROMPT_TOKEN_BUDGET = int(os.environ.get("GROQ_PROMPT_TOKEN_BUDGET", "900"))
+
+
+class GroqRateLimited(ExecutorSaturated):
+    """
+    Raised when a Groq call cannot be made within its lane's wait limit
+    (local, the request was never sent), or is still answered with 429
+    after all retries
+    """
+
+    def __init__(self, retry_after: float, local: bool = False):
+        self.stage = "groq"
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.local = local
+        Exception.__init__(self, f"Server busy: Groq rate limit reached, please retry in {self.retry_after}s")
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English prose and JSON
+    return len(text) // 4 + 1
+
+
+def estimate_message_tokens(messages: List[Dict]) -> int:
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+def retry_after_seconds(error, attempt: int) -> float:
+    """
+    Delay asked for by a 429, or exponential backoff when it gives none
+    """
+    value = error.response.headers.get("retry-after") if error.response is not None else None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return min(60.0, GROQ_BACKOFF_BASE * 2 ** attempt)
+
+
+class GroqScheduler:
+    """
+    Pace Groq calls against a tokens/requests per minute budget.
+    Each call reserves its estimated prompt plus completion tokens in a
+    sliding one-minute window and is corrected with the real usage once
+    it returns. Batch callers wait while an interactive caller is waiting,
+    and a 429 pauses every lane for as long as the server asked.
+    """
+
+    def __init__(self, tpm: int, rpm: int, max_retries: int, max_wait: Dict[str, Optional[float]]):
+        self.tpm = tpm
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.completion_estimate = GROQ_MAX_TOKENS // 2
+        self._window = deque()  # [start, tokens] for calls in the last minute
+        self._waiting = {lane: 0 for lane in GROQ_LANES}
+        self._paused_until = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "rejected": 0,
+            "wait_seconds": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0
+        }
+
+    def _delay(self, tokens: int, now: float) -> float:
+        while self._window and self._window[0][0] <= now - 60:
+            self._window.popleft()
+        delay = self._paused_until - now
+        if self.rpm and len(self._window) >= self.rpm:
+            delay = max(delay, self._window[-self.rpm][0] + 60 - now)
+        if self.tpm:
+            # Oldest reservations free up first; a call bigger than the whole
+            # budget goes through once the window is empty
+            excess = sum(entry[1] for entry in self._window) + tokens - self.tpm
+            for start, used in self._window:
+                if excess <= 0:
+                    break
+                excess -= used
+                delay = max(delay, start + 60 - now)
+        return delay
+
+    def acquire(self, tokens: int, lane: str, cancelled: Optional[threading.Event] = None) -> list:
+        """
+        Block until the budget has room for tokens, then reserve them.
+        Raises LLMCancelled once cancelled is set while waiting.
+        """
+        started = time.monotonic()
+        max_wait = self.max_wait.get(lane)
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Groq scheduler is shut down")
+                    if cancelled is not None and cancelled.is_set():
+                        raise LLMCancelled()
+                    now = time.monotonic()
+                    delay = self._delay(tokens, now)
+                    outranked = lane != "interactive" and self._waiting["interactive"] > 0
+                    if delay <= 0 and not outranked:
+                        entry = [now, tokens]
+                        self._window.append(entry)
+                        self.stats["requests"] += 1
+                        self.stats["wait_seconds"] += now - started
+                        return entry
+                    if max_wait is not None and now + max(delay, 0) > started + max_wait:
+                        self.stats["rejected"] += 1
+                        raise GroqRateLimited(max(delay, 1), local=True)
+                    timeout = delay if delay > 0 else None
+                    if max_wait is not None:
+                        timeout = min(timeout or max_wait, started + max_wait - now)
+                    if cancelled is not None:
+                        # Nothing notifies on cancellation, so look again every second
+                        timeout = min(timeout or 1.0, 1.0)
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting[lane] -= 1
+                self._cond.notify_all()
+
+    def settle(self, entry: list, usage):
+        """
+        Replace a reservation with the tokens the call actually used
+        """
+        if usage is None:
+            return
+        with self._cond:
+            entry[1] = usage.total_tokens
+            self.stats["prompt_tokens"] += usage.prompt_tokens
+            self.stats["completion_tokens"] += usage.completion_tokens
+            self.completion_estimate = int(0.8 * self.completion_estimate + 0.2 * usage.completion_tokens)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.stats["rate_limited"] += 1
+
+    def create(self, lane: str, messages: List[Dict], deadline: Optional["LLMDeadline"] = None, **kwargs):
+        """
+        Blocking: client.chat.completions.create paced by the budget,
+        retrying 429s after the delay the server asked for. With a deadline,
+        its clock starts once the budget has room, and the request timeout
+        is what is left of it.
+        """
+        from groq import RateLimitError
+
+        tokens = estimate_message_tokens(messages) + min(self.completion_estimate, kwargs.get("max_tokens", GROQ_MAX_TOKENS))
+        for attempt in range(self.max_retries + 1):
+            entry = self.acquire(tokens, lane, deadline.cancelled if deadline is not None else None)
+            if deadline is not None:
+                kwargs["timeout"] = deadline.remaining()
+            try:
+                completion = get_groq_client().chat.completions.create(messages=messages, **kwargs)
+            except RateLimitError as e:
+                delay = retry_after_seconds(e, attempt)
+                self.pause(delay)
+                if attempt == self.max_retries:
+                    raise GroqRateLimited(delay)
+                self.stats["retries"] += 1
+                continue
+            self.settle(entry, getattr(completion, "usage", None))
+            return completion
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return dict(
+                self.stats,
+                window_requests=len(self._window),
+                window_tokens=sum(entry[1] for entry in self._window),
+                waiting=dict(self._waiting),
+                paused_for=round(max(0.0, self._paused_until - time.monotonic()), 3)
+            )
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+groq_scheduler = GroqScheduler(
+    GROQ_TPM_LIMIT,
+    GROQ_RPM_LIMIT,
+    GROQ_MAX_RETRIES,
+    {"interactive": GROQ_INTERACTIVE_MAX_WAIT, "batch": None}
+)
+
+# LLM backends: models and providers tried in order of observed latency, with
+# per-call deadlines and a hedged second request when the first one is slow
+LLM_BACKENDS = os.environ.get("LLM_BACKENDS", f"groq:{GROQ_MODEL}")
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", "45"))
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", "10"))  # until a backend has enough samples
+LLM_LATENCY_WINDOW = int(os.environ.get("LLM_LATENCY_WINDOW", "200"))
+LLM_LATENCY_MIN_SAMPLES = int(os.environ.get("LLM_LATENCY_MIN_SAMPLES", "20"))
+LLM_FAILURE_THRESHOLD = int(os.environ.get("LLM_FAILURE_THRESHOLD", "3"))
+LLM_BACKEND_COOLDOWN = float(os.environ.get("LLM_BACKEND_COOLDOWN", "30"))
+LLM_HEDGE_WORKERS = int(os.environ.get("LLM_HEDGE_WORKERS", str(GROQ_WORKERS + GROQ_BATCH_WORKERS)))
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+
+metrics.histogram("seo_llm_backend_duration_seconds", "Time taken by each LLM backend call, by outcome")
+
+
+class LatencyStats:
+    """
+    Sliding window of a backend's recent call durations
+    """
+
+    def __init__(self, window: int):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        The q-quantile of the window, or None until it has enough samples to mean anything
+        """
+        with self._lock:
+            if len(self._samples) < LLM_LATENCY_MIN_SAMPLES:
+                return None
+            samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class LLMCancelled(Exception):
+    """
+    Raised in a backend call the router no longer needs, such as a hedge that lost
+    """
+
+
+class LLMDeadline:
+    """
+    Time budget of one routed call, shared by every backend it tries. The
+    clock starts when the first backend call gets going, after any wait for
+    groq_scheduler's budget, so queueing does not eat into it. cancel() tells
+    calls still running that their answer is no longer needed.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires: Optional[float] = None
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """
+        Seconds left, starting the clock on first use
+        """
+        if self.cancelled.is_set():
+            raise LLMCancelled()
+        with self._lock:
+            if self.expires is None:
+                self.expires = time.monotonic() + self.seconds
+            remaining = self.expires - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("LLM deadline exceeded")
+        return remaining
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class LLMBackend:
+    """
+    One model on one provider. complete() and stream() are blocking, give up
+    at the LLMDeadline or once it is cancelled, and keep the latency and
+    failure statistics routing is based on. Only the backend's own errors
+    count as failures: a cancelled call or a local rate-limit rejection says
+    nothing about it. Subclasses implement _complete and _stream.
+    """
+
+    kind = None
+
+    def __init__(self, model: str, base_url: Optional[str] = None):
+        self.model = model
+        self.base_url = base_url
+        self.name = f"{self.kind}:{model}"
+        self.latency = LatencyStats(LLM_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._cooldown_until = 0.0
+        self.stats = {
+            "calls": 0,
+            "failures": 0,
+            "timeouts": 0
+        }
+
+    def available(self) -> bool:
+        return self._cooldown_until <= time.monotonic()
+
+    def complete(self, messages: List[Dict], lane: str, deadline: LLMDeadline) -> Tuple[str, object]:
+        """
+        Completion text and token usage (None when the provider reports none)
+        """
+        return self._observe(self._complete, messages, lane, deadline)
+
+    def stream(self, messages: List[Dict], lane: str, deadline: LLMDeadline, emit, stopped: threading.Event):
+        """
+        Pass each text delta to emit until done or stopped; returns the token usage
+        """
+        return self._observe(self._stream, messages, lane, deadline, emit, stopped)
+
+    def _observe(self, call, messages, lane, deadline, *args):
+        started = time.monotonic()
+        with self._lock:
+            self.stats["calls"] += 1
+        try:
+            result = call(messages, lane, deadline, *args)
+        except LLMCancelled:
+            raise
+        except GroqRateLimited as e:
+            if not e.local:
+                self._failed(e, time.monotonic() - started)
+            raise
+        except BaseException as e:
+            if not deadline.cancelled.is_set():
+                self._failed(e, time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._consecutive_failures = 0
+        self.latency.record(elapsed)
+        metrics.observe("seo_llm_backend_duration_seconds", elapsed, backend=self.name, outcome="ok")
+        return result
+
+    def _failed(self, e: BaseException, elapsed: float):
+        timed_out = isinstance(e, TimeoutError) or "timeout" in type(e).__name__.lower()
+        with self._lock:
+            self.stats["failures"] += 1
+            self.stats["timeouts"] += timed_out
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= LLM_FAILURE_THRESHOLD:
+                self._cooldown_until = time.monotonic() + LLM_BACKEND_COOLDOWN
+        if timed_out:
+            # A timeout says the backend is slow, which routing should hear about
+            self.latency.record(elapsed)
+        metrics.observe("seo_llm_backend_duration_seconds", elapsed, backend=self.name,
+                        outcome="timeout" if timed_out else "error")
+
+    def _complete(self, messages: List[Dict], lane: str, deadline: LLMDeadline) -> Tuple[str, object]:
+        raise NotImplementedError
+
+    def _stream(self, messages: List[Dict], lane: str, deadline: LLMDeadline, emit, stopped: threading.Event):
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict:
+        p50, p95 = self.latency.quantile(0.5), self.latency.quantile(0.95)
+        return dict(
+            self.stats,
+            samples=len(self.latency),
+            p50_ms=round(p50 * 1000, 1) if p50 is not None else None,
+            p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+            available=self.available()
+        )
+
+
+class GroqBackend(LLMBackend):
+    """
+    A Groq model, paced by the shared groq_scheduler budget
+    """
+
+    kind = "groq"
+
+    def _complete(self, messages, lane, deadline):
+        completion = groq_scheduler.create(
+            lane,
+            messages,
+            model=self.model,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=GROQ_MAX_TOKENS,
+            deadline=deadline,
+        )
+        return completion.choices[0].message.content, getattr(completion, "usage", None)
+
+    def _stream(self, messages, lane, deadline, emit, stopped):
+        usage = None
+        stream = groq_scheduler.create(
+            lane,
+            messages,
+            model=self.model,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=GROQ_MAX_TOKENS,
+            stream=True,
+            deadline=deadline,
+        )
+        try:
+            for chunk in stream:
+                if stopped.is_set():
+                    break
+                deadline.remaining()
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    emit(delta)
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+        finally:
+            stream.close()
+        return usage
+
+
+class OpenAIBackend(LLMBackend):
+    """
+    A model behind any OpenAI-compatible chat completions API (OpenAI, vLLM,
+    Ollama, Together, ...); OPENAI_API_KEY is sent as the bearer token
+    """
+
+    kind = "openai"
+
+    def __init__(self, model: str, base_url: Optional[str] = None):
+        super().__init__(model, base_url or "https://api.openai.com/v1")
+        self._client: Optional[httpx.Client] = None
+
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"} if OPENAI_API_KEY else {}
+                    self._client = httpx.Client(base_url=self.base_url, headers=headers)
+        return self._client
+
+    def _body(self, messages: List[Dict], **extra) -> Dict:
+        return dict(model=self.model, messages=messages, temperature=GROQ_TEMPERATURE, max_tokens=GROQ_MAX_TOKENS, **extra)
+
+    def _complete(self, messages, lane, deadline):
+        response = self.client().post("/chat/completions", json=self._body(messages), timeout=deadline.remaining())
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get("usage")
+        return data["choices"][0]["message"]["content"], types.SimpleNamespace(**usage) if usage else None
+
+    def _stream(self, messages, lane, deadline, emit, stopped):
+        usage = None
+        body = self._body(messages, stream=True, stream_options={"include_usage": True})
+        with self.client().stream("POST", "/chat/completions", json=body, timeout=deadline.remaining()) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if stopped.is_set():
+                    break
+                deadline.remaining()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                choices = chunk.get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    emit(delta)
+                if chunk.get("usage"):
+                    usage = types.SimpleNamespace(**chunk["usage"])
+        return usage
+
+
+class StubBackend(LLMBackend):
+    """
+    Local stand-in for tests and load tests: answers with a fixed, valid
+    completion after the number of seconds given as its model ("stub:0.5")
+    """
+
+    kind = "stub"
+    COMPLETION = json.dumps({
+        "recommendations": [
+            {
+                "parameter": "Title Tag",
+                "issue": "Stub backend answer",
+                "recommendation": "Configure a real LLM backend in LLM_BACKENDS",
+                "examples": ["groq:llama-3.3-70b-versatile"],
+                "priority": "low"
+            }
+        ]
+    })
+
+    def __init__(self, model: str, base_url: Optional[str] = None):
+        super().__init__(model or "0", base_url)
+        self.delay = float(self.model)
+
+    def _wait(self, seconds: float, deadline: LLMDeadline, stopped: Optional[threading.Event] = None):
+        remaining = deadline.remaining()
+        if seconds > remaining:
+            deadline.cancelled.wait(remaining)
+            deadline.remaining()
+            raise TimeoutError("LLM deadline exceeded")
+        (stopped or deadline.cancelled).wait(seconds)
+        deadline.remaining()
+
+    def _complete(self, messages, lane, deadline):
+        self._wait(self.delay, deadline)
+        return self.COMPLETION, None
+
+    def _stream(self, messages, lane, deadline, emit, stopped):
+        pieces = [self.COMPLETION[i:i + 16] for i in range(0, len(self.COMPLETION), 16)]
+        for piece in pieces:
+            if stopped.is_set():
+                break
+            self._wait(self.delay / len(pieces), deadline, stopped)
+            emit(piece)
+        return None
+
+
+LLM_BACKEND_KINDS = {backend.kind: backend for backend in (GroqBackend, OpenAIBackend, StubBackend)}
+
+
+def parse_llm_backends(spec: str) -> List[LLMBackend]:
+    """
+    Backends from a comma separated list of kind:model[@base_url], most preferred first
+    """
+    backends = []
+    for entry in filter(None, (part.strip() for part in spec.split(','))):
+        kind, _, model = entry.partition(':')
+        model, _, base_url = model.partition('@')
+        if kind not in LLM_BACKEND_KINDS:
+            raise ValueError(f"Unknown LLM backend {kind!r} in LLM_BACKENDS; expected one of: {', '.join(LLM_BACKEND_KINDS)}")
+        backends.append(LLM_BACKEND_KINDS[kind](model, base_url or None))
+    if not backends:
+        raise ValueError("LLM_BACKENDS lists no backend")
+    return backends
+
+
+class LLMRouter:
+    """
+    Choose backends by observed latency and hedge slow calls.
+
+    Backends with enough samples are tried fastest median first, ahead of the
+    ones still unmeasured (which keep their configured order); backends that
+    failed LLM_FAILURE_THRESHOLD times in a row sit out LLM_BACKEND_COOLDOWN
+    seconds. If the first backend has not answered by its own p95 (or
+    LLM_HEDGE_DELAY before it has a p95), the next one is started as well and
+    whichever answers first wins; a failure moves on to the next backend
+    straight away. The loser is cancelled: dropped if it has not started,
+    stopped if it is waiting for Groq budget, and otherwise left to its HTTP
+    timeout, since a blocking request cannot be interrupted. A cancelled
+    call does not count towards its backend's statistics.
+
+    The deadline starts with the first backend call rather than when the
+    request is routed, so waiting in groq_scheduler does not use it up.
+    """
+
+    def __init__(self, backends: List[LLMBackend], deadline: float, hedge: bool, workers: int):
+        self.backends = backends
+        self.deadline = deadline
+        self.hedge = hedge
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            "hedges": 0,
+            "hedge_wins": 0,
+            "failovers": 0,
+            "deadline_exceeded": 0
+        }
+
+    @property
+    def cache_model(self) -> str:
+        """
+        Model part of LLM cache keys: answers stay valid while the backends do
+        """
+        if len(self.backends) == 1:
+            return self.backends[0].model
+        return ','.join(backend.name for backend in self.backends)
+
+    def ordered(self) -> List[LLMBackend]:
+        candidates = [backend for backend in self.backends if backend.available()] or list(self.backends)
+
+        def rank(item):
+            index, backend = item
+            median = backend.latency.quantile(0.5)
+            return (0, median, index) if median is not None else (1, 0, index)
+
+        return [backend for _, backend in sorted(enumerate(candidates), key=rank)]
+
+    def hedge_delay(self, backend: LLMBackend) -> float:
+        p = backend.latency.quantile(LLM_HEDGE_QUANTILE)
+        return p if p is not None else LLM_HEDGE_DELAY
+
+    def _submit(self, fn, *args) -> Future:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="llm")
+        return self._pool.submit(fn, *args)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def complete(self, messages: List[Dict], lane: str) -> Tuple[str, object, Dict]:
+        """
+        Blocking: (text, usage, route) of the first backend to answer, where
+        route records the backend and whether a hedge was fired
+        """
+        candidates = self.ordered()
+        deadline = LLMDeadline(self.deadline)
+        running: Dict[Future, LLMBackend] = {}
+        launched: List[LLMBackend] = []
+        hedged = False
+        error = None
+
+        def launch() -> Optional[float]:
+            backend = candidates.pop(0)
+            launched.append(backend)
+            running[self._submit(backend.complete, messages, lane, deadline)] = backend
+            # When to start the next backend if this one has not answered
+            return time.monotonic() + self.hedge_delay(backend) if self.hedge and candidates else None
+
+        try:
+            hedge_at = launch()
+            while running:
+                # No deadline yet while every call is still waiting for its turn
+                limits = [at for at in (hedge_at, deadline.expires) if at is not None]
+                timeout = max(0.0, min(limits) - time.monotonic()) if limits else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    backend = running.pop(future)
+                    try:
+                        text, usage = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if any(launched.index(other) < launched.index(backend) for other in running.values()):
+                        # Answered while a backend started before it was still busy
+                        self._count("hedge_wins")
+                    return text, usage, {"backend": backend.name, "hedged": hedged}
+
+                if done and not running and candidates:
+                    self._count("failovers")
+                    hedge_at = launch()
+                elif hedge_at is not None and time.monotonic() >= hedge_at:
+                    self._count("hedges")
+                    hedged = True
+                    hedge_at = launch()
+                elif not done and deadline.expires is not None and time.monotonic() >= deadline.expires:
+                    self._count("deadline_exceeded")
+                    raise TimeoutError(f"No LLM backend answered within {self.deadline:g}s")
+            raise error
+        finally:
+            deadline.cancel()
+            for future in running:
+                future.cancel()
+
+    def stream(self, messages: List[Dict], lane: str, emit, stopped: threading.Event) -> Tuple[object, Dict]:
+        """
+        Blocking: stream from the preferred backend, failing over to the next
+        while nothing has been emitted yet. Streams are not hedged, since two
+        would interleave their text.
+        """
+        deadline = LLMDeadline(self.deadline)
+        emitted = []
+
+        def forward(piece: str):
+            emitted.append(True)
+            emit(piece)
+
+        error = None
+        for attempt, backend in enumerate(self.ordered()):
+            if attempt:
+                self._count("failovers")
+            try:
+                return backend.stream(messages, lane, deadline, forward, stopped), {"backend": backend.name, "hedged": False}
+            except Exception as e:
+                if emitted:
+                    raise
+                error = e
+        raise error
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        return dict(stats, backends={backend.name: backend.snapshot() for backend in self.backends})
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        for backend in self.backends:
+            if isinstance(backend, OpenAIBackend) and backend._client is not None:
+                backend._client.close()
+
+
+llm_router = LLMRouter(parse_llm_backends(LLM_BACKENDS), LLM_DEADLINE, LLM_HEDGE, LLM_HEDGE_WORKERS)
+
+
+# LLM response cache: in-memory LRU in front of an SQLite file
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_DISK_ENTRIES = int(os.environ.get("LLM_CACHE_DISK_ENTRIES", "10000"))
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")  # empty string disables the disk tier
+
+
+class LLMCache:
+    """
+    Two-tier cache of completion texts keyed on a fingerprint of the request
+    (model, sampling parameters and the fully rendered messages)
+    """
+
+    def __init__(self, path: str, memory_entries: int, disk_entries: int, ttl: float):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0
+        }
+
+    @staticmethod
+    def fingerprint(model: str, temperature: float, max_tokens: int, messages: List[Dict]) -> str:
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": messages},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if now - cached[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return cached[1]
+                del self._memory[key]
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute(
+                    "SELECT response, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self.stats["writes"] += 1
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                # Drop expired rows, then the least recently used ones beyond the size cap
+                db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - self.ttl,))
+                db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_entries,)
+                )
+                db.commit()
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, memory_entries=len(self._memory), disk_path=self.path or None, ttl=self.ttl)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+llm_cache = LLMCache(LLM_CACHE_PATH, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_DISK_ENTRIES, LLM_CACHE_TTL)
+
+
+# Keyword engine: whole-document term counts ranked by TF-IDF against the pages seen so far
+KEYWORD_IDF_MIN_DOCS = int(os.environ.get("KEYWORD_IDF_MIN_DOCS", "20"))
+KEYWORD_CORPUS_MAX_TERMS = int(os.environ.get("KEYWORD_CORPUS_MAX_TERMS", "200000"))
+KEYWORD_CORPUS_MAX_DOCS = int(os.environ.get("KEYWORD_CORPUS_MAX_DOCS", "10000"))
+
+# Common words to ignore
+STOP_WORDS = frozenset({b'the', b'a', b'an', b'and', b'or', b'but', b'in', b'on', b'at', b'to', b'for', b'of', b'with',
+                        b'is', b'are', b'was', b'were', b'be', b'been', b'being'})
+
+# Lowercased text is encoded to ASCII and tokenized with one bytes.translate:
+# ASCII whitespace becomes a space, everything but [a-z0-9] is deleted
+# (so "e-mail" counts as "email", as the per-word loop this replaces did)
+_TOKEN_TABLE = bytes(32 if chr(c).isspace() else c for c in range(256))
+_TOKEN_DELETE = bytes(c for c in range(128) if not (chr(c).isspace() or 'a' <= chr(c) <= 'z' or '0' <= chr(c) <= '9'))
+
+
+_WHITESPACE = re.compile(r'\s')
+
+
+def text_blocks(text: str, size: int = 1 << 16):
+    """
+    Slices of about size characters, each ending on whitespace so no word is
+    cut; lets whole-document passes avoid materializing a list of every word
+    """
+    start = 0
+    while start < len(text):
+        space = _WHITESPACE.search(text, start + size)
+        end = space.start() if space else len(text)
+        yield text[start:end]
+        start = end
+
+
+def term_counts(text: str) -> Tuple[Counter, int]:
+    """
+    Count the terms (over 3 characters, minus stop words) of a whole document.
+    Returns the counts and the number of words.
+    """
+    counts = Counter()
+    word_count = 0
+    for block in text_blocks(text):
+        lowered = block.lower()
+        if not lowered.isascii():
+            # Unicode whitespace must still separate words once the rest is dropped
+            lowered = ' '.join(lowered.split())
+        tokens = lowered.encode('ascii', 'ignore').translate(_TOKEN_TABLE, _TOKEN_DELETE).split()
+        counts.update(tokens)
+        word_count += len(tokens)
+    for term in [t for t in counts if len(t) <= 3 or t in STOP_WORDS]:
+        del counts[term]
+    return counts, word_count
+
+
+class KeywordCorpus:
+    """
+    Document frequencies of terms over the pages analyzed by this process,
+    used to rank a page's terms by (sublinear) TF-IDF. Until min_docs pages
+    have been seen, ranking is by plain frequency so the keywords and the
+    prompts built from them stay stable while the corpus is still small.
+    """
+
+    def __init__(self, min_docs: int, max_terms: int, max_docs: int):
+        self.min_docs = min_docs
+        self.max_terms = max_terms
+        self.max_docs = max_docs
+        self.doc_count = 0
+        self._df: Counter = Counter()
+        self._seen = OrderedDict()  # hashes of documents already counted
+        self._lock = threading.Lock()
+
+    def add(self, text: str, counts: Counter):
+        key = hash(text)
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return
+            self._seen[key] = None
+            if len(self._seen) > self.max_docs:
+                self._seen.popitem(last=False)
+            self.doc_count += 1
+            self._df.update(counts.keys())
+            if len(self._df) > self.max_terms:
+                # Forget terms only one page ever used
+                for term in [t for t, df in self._df.items() if df == 1]:
+                    del self._df[term]
+
+    def rank(self, counts: Counter, limit: int) -> List[str]:
+        if self.doc_count < self.min_docs:
+            top = counts.most_common(limit)
+        else:
+            n = self.doc_count
+            df = self._df
+            top = heapq.nlargest(
+                limit,
+                counts.items(),
+                key=lambda item: (1 + math.log(item[1])) * (math.log((1 + n) / (1 + df.get(item[0], 0))) + 1)
+            )
+        return [term.decode() for term, _ in top]
+
+    def snapshot(self) -> Dict:
+        return {"documents": self.doc_count, "terms": len(self._df), "idf_active": self.doc_count >= self.min_docs}
+
+
+keyword_corpus = KeywordCorpus(KEYWORD_IDF_MIN_DOCS, KEYWORD_CORPUS_MAX_TERMS, KEYWORD_CORPUS_MAX_DOCS)
+
+
+# FastMCP Tools for Context Analysis - converted to regular functions
+def analyze_content_context(content: str, max_length: int = 2000) -> Dict:
+    """
+    Analyze website content to extract key themes, topics, and context
+    using FastMCP for better understanding. Keywords come from the whole
+    document; content type and preview from its first max_length characters.
+    """
+    # Clean content (whitespace collapsed, so a little more than max_length is enough)
+    clean_content = ' '.join(content[:max_length * 4].split())[:max_length]
+    if len(clean_content) < max_length and len(content) > max_length * 4:
+        clean_content = ' '.join(content.split())[:max_length]
+
+    # Extract key information
+    counts, word_count = term_counts(content)
+    top_keywords = keyword_corpus.rank(counts, 10)
+    keyword_corpus.add(content, counts)
+    # IDF weights move as the corpus grows, so the LLM cache keys on plain frequency
+    frequent_keywords = [term.decode() for term, _ in counts.most_common(10)]
+
+    # Detect content type
+    content_lower = clean_content.lower()
+    content_type = "general"
+
+    if any(word in content_lower for word in ['shop', 'buy', 'product', 'price', 'cart', 'checkout']):
+        content_type = "e-commerce"
+    elif any(word in content_lower for word in ['blog', 'article', 'post', 'author', 'published']):
+        content_type = "blog"
+    elif any(word in content_lower for word in ['service', 'consulting', 'solution', 'contact', 'about']):
+        content_type = "service"
+    elif any(word in content_lower for word in ['portfolio', 'project', 'work', 'design']):
+        content_type = "portfolio"
+
+    return {
+        "keywords": top_keywords,
+        "frequent_keywords": frequent_keywords,
+        "content_type": content_type,
+        "content_length": len(clean_content),
+        "word_count": word_count,
+        "preview": clean_content[:500]
+    }
+
+
+def analyze_heading_structure(headings: Dict) -> Dict:
+    """
+    Analyze heading structure and hierarchy for SEO best practices
+    """
+    h1_count = len(headings.get('h1', []))
+    h2_count = len(headings.get('h2', []))
+    h3_count = len(headings.get('h3', []))
+
+    issues = []
+    recommendations = []
+
+    if h1_count == 0:
+        issues.append("No H1 tag found")
+        recommendations.append("Add a single, descriptive H1 tag")
+    elif h1_count > 1:
+        issues.append(f"Multiple H1 tags found ({h1_count})")
+        recommendations.append("Use only one H1 tag per page")
+
+    if h2_count == 0:
+        issues.append("No H2 tags found")
+        recommendations.append("Add H2 tags to structure your content")
+
+    hierarchy_score = 100
+    if h1_count != 1:
+        hierarchy_score -= 30
+    if h2_count == 0:
+        hierarchy_score -= 20
+    if h3_count > h2_count * 3:
+        hierarchy_score -= 10
+
+    return {
+        "h1_count": h1_count,
+        "h2_count": h2_count,
+        "h3_count": h3_count,
+        "issues": issues,
+        "recommendations": recommendations,
+        "hierarchy_score": max(0, hierarchy_score)
+    }
+
+
+def analyze_meta_quality(title: str, description: str, url: str) -> Dict:
+    """
+    Analyze meta tags quality and provide specific recommendations
+    """
+    analysis = {
+        "title": {},
+        "description": {},
+        "url_structure": {}
+    }
+
+    # Title analysis
+    if not title:
+        analysis["title"] = {
+            "status": "critical",
+            "issue": "Missing title tag",
+            "score": 0
+        }
+    else:
+        title_length = len(title)
+        if title_length < 30:
+            analysis["title"] = {
+                "status": "poor",
+                "issue": f"Title too short ({title_length} chars)",
+                "score": 30
+            }
+        elif title_length > 70:
+            analysis["title"] = {
+                "status": "warning",
+                "issue": f"Title too long ({title_length} chars)",
+                "score": 60
+            }
+        else:
+            analysis["title"] = {
+                "status": "good",
+                "issue": "Title length optimal",
+                "score": 100
+            }
+
+    # Description analysis
+    if not description:
+        analysis["description"] = {
+            "status": "critical",
+            "issue": "Missing meta description",
+            "score": 0
+        }
+    else:
+        desc_length = len(description)
+        if desc_length < 120:
+            analysis["description"] = {
+                "status": "warning",
+                "issue": f"Description too short ({desc_length} chars)",
+                "score": 50
+            }
+        elif desc_length > 160:
+            analysis["description"] = {
+                "status": "warning",
+                "issue": f"Description too long ({desc_length} chars)",
+                "score": 70
+            }
+        else:
+            analysis["description"] = {
+                "status": "good",
+                "issue": "Description length optimal",
+                "score": 100
+            }
+
+    # URL structure
+    url_lower = url.lower()
+    url_score = 100
+    url_issues = []
+
+    if '?' in url:
+        url_issues.append("Contains query parameters")
+        url_score -= 10
+    if len(url) > 100:
+        url_issues.append("URL too long")
+        url_score -= 20
+    if '_' in url:
+        url_issues.append("Contains underscores (use hyphens)")
+        url_score -= 10
+
+    analysis["url_structure"] = {
+        "score": url_score,
+        "issues": url_issues
+    }
+
+    return analysis
+
+
+def generate_contextual_examples(
+    content_context: Dict,
+    element_type: str,
+    current_value: str = None
+) -> List[str]:
+    """
+    Generate contextual examples based on website content analysis
+    """
+    keywords = content_context.get('keywords', [])
+    content_type = content_context.get('content_type', 'general')
+    if not keywords:
+        # The typed examples are built around the top keyword; without one use the generic ones
+        content_type = 'general'
+
+    examples = []
+
+    if element_type == "title":
+        if content_type == "e-commerce":
+            examples = [
+                f"Buy {keywords[0].title()} Online | Premium Quality | Free Shipping",
+                f"{keywords[0].title()} Products | Best Prices & Fast Delivery",
+                f"Shop {keywords[0].title()} | Trusted Store | Secure Checkout"
+            ]
+        elif content_type == "blog":
+            examples = [
+                f"Expert Guide to {keywords[0].title()} | Tips & Insights",
+                f"{keywords[0].title()} Blog | Latest News & Tutorials",
+                f"Master {keywords[0].title()} | Comprehensive Resources"
+            ]
+        elif content_type == "service":
+            examples = [
+                f"Professional {keywords[0].title()} Services | Expert Solutions",
+                f"{keywords[0].title()} Consulting | Transform Your Business",
+                f"Expert {keywords[0].title()} Solutions | Get Results Today"
+            ]
+        else:
+            examples = [
+                f"{keywords[0].title() if keywords else 'Professional'} Services | Quality Solutions",
+                f"Expert {keywords[0].title() if keywords else 'Business'} | Trusted Provider",
+                f"{keywords[0].title() if keywords else 'Your'} Solutions | Industry Leader"
+            ]
+
+    elif element_type == "meta_description":
+        if content_type == "e-commerce":
+            examples = [
+                f"Discover premium {keywords[0]} products at unbeatable prices. Fast shipping, secure checkout, and 100% satisfaction guaranteed. Shop now and save!",
+                f"Your trusted source for quality {keywords[0]}. Browse our extensive collection, enjoy exclusive deals, and experience exceptional customer service.",
+                f"Find the perfect {keywords[0]} for your needs. Premium quality, competitive prices, and expert support. Order today with free shipping!"
+            ]
+        elif content_type == "blog":
+            examples = [
+                f"Explore expert insights on {keywords[0]}. Get tips, tutorials, and latest trends from industry professionals. Subscribe for weekly updates!",
+                f"Your go-to resource for {keywords[0]} knowledge. In-depth articles, how-to guides, and practical advice. Start learning today!",
+                f"Master {keywords[0]} with our comprehensive guides and expert analysis. Join thousands of readers improving their skills daily."
+            ]
+        elif content_type == "service":
+            examples = [
+                f"Professional {keywords[0]} services for growing businesses. Expert team, proven results, and personalized solutions. Get your free consultation today!",
+                f"Transform your business with our {keywords[0]} expertise. Tailored solutions, industry experience, and dedicated support. Contact us now!",
+                f"Leading {keywords[0]} provider with 10+ years experience. Custom solutions, measurable results, and exceptional service. Start your project today!"
+            ]
+        else:
+            examples = [
+                f"Discover professional solutions for {keywords[0] if keywords else 'your needs'}. Expert guidance, quality service, and proven results. Learn more today!",
+                f"Your trusted partner for {keywords[0] if keywords else 'business success'}. Comprehensive services, experienced team, and customer-first approach.",
+                f"Excellence in {keywords[0] if keywords else 'service delivery'}. Industry expertise, innovative solutions, and commitment to your success."
+            ]
+
+    elif element_type == "h1":
+        if content_type == "e-commerce":
+            examples = [
+                f"Premium {keywords[0].title()} Products for Every Need",
+                f"Discover Our Collection of Quality {keywords[0].title()}",
+                f"Shop {keywords[0].title()} | Best Selection & Prices"
+            ]
+        elif content_type == "blog":
+            examples = [
+                f"Everything You Need to Know About {keywords[0].title()}",
+                f"The Ultimate Guide to {keywords[0].title()}",
+                f"Expert Insights on {keywords[0].title()} | Latest Updates"
+            ]
+        elif content_type == "service":
+            examples = [
+                f"Professional {keywords[0].title()} Services That Deliver Results",
+                f"Transform Your Business with Expert {keywords[0].title()} Solutions",
+                f"Leading {keywords[0].title()} Provider | Trusted by Businesses"
+            ]
+        else:
+            examples = [
+                f"Professional {keywords[0].title() if keywords else 'Solutions'} for Modern Businesses",
+                f"Expert {keywords[0].title() if keywords else 'Services'} | Quality You Can Trust",
                 f"{keywords[0].title() if keywords else 'Your'} Partner for Success"
             ]
 
-    # Ensure we always have 3 examples
-    while len(examples) < 3:
-        examples.append(f"Professional solution for {keywords[0] if keywords else 'your business'}")
+    # Ensure we always have 3 examples
+    while len(examples) < 3:
+        examples.append(f"Professional solution for {keywords[0] if keywords else 'your business'}")
+
+    return examples[:3]
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from sections ranked by value and fit it into a token
+    budget: sections that know how to shorten themselves are trimmed first,
+    then whole sections are dropped, least valuable first in both passes.
+    Priority 0 sections are never dropped.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.sections: List[Dict] = []
+
+    def add(self, name: str, text: str, priority: int, shrink=None):
+        """
+        shrink(max_tokens) returns a shorter text for the section; it may stop
+        at a minimum size of its own rather than meet max_tokens
+        """
+        self.sections.append({"name": name, "text": text, "priority": priority, "shrink": shrink})
+
+    def build(self) -> Tuple[str, Dict]:
+        sizes = [estimate_tokens(section["text"]) for section in self.sections]
+        order = sorted(range(len(self.sections)), key=lambda i: (-self.sections[i]["priority"], -i))
+        trimmed, dropped = [], []
+
+        for index in order:
+            excess = sum(sizes) - self.budget
+            if excess <= 0:
+                break
+            section = self.sections[index]
+            if section["shrink"] is not None:
+                text = section["shrink"](sizes[index] - excess)
+                if estimate_tokens(text) < sizes[index]:
+                    section["text"] = text
+                    sizes[index] = estimate_tokens(text)
+                    trimmed.append(section["name"])
+
+        for index in order:
+            if sum(sizes) <= self.budget:
+                break
+            section = self.sections[index]
+            if section["priority"] > 0:
+                section["text"] = None
+                sizes[index] = 0
+                dropped.append(section["name"])
+                if section["name"] in trimmed:
+                    trimmed.remove(section["name"])
+
+        prompt = '\n\n'.join(section["text"] for section in self.sections if section["text"])
+        return prompt, {"budget": self.budget, "estimated_tokens": sum(sizes), "trimmed": trimmed, "dropped": dropped}
+
+
+def _clip_text(text: str, label: str, min_chars: int = 80):
+    """
+    shrink callback cutting a one-line section to about max_tokens on a word
+    boundary, keeping at least min_chars of the text
+    """
+    def shrink(max_tokens: int) -> str:
+        room = max(min_chars, (max_tokens - estimate_tokens(label)) * 4)
+        if len(text) <= room:
+            return label + text
+        return label + text[:room].rsplit(' ', 1)[0] + '...'
+    return shrink
+
+
+def run_fastmcp_analyzers(seo_data: Dict) -> Dict:
+    """
+    Run the FastMCP analyzers on a page; shared by the Groq prompt and the rule engine
+    """
+    # Extract website content for context
+    content_text = seo_data.get('content', {}).get('text', '')
+
+    # Use FastMCP to analyze content context
+    content_context = analyze_content_context(content_text, max_length=2000)
+
+    # Use FastMCP to analyze heading structure
+    heading_analysis = analyze_heading_structure(seo_data.get('headings', {}))
+
+    # Use FastMCP to analyze meta quality
+    meta_analysis = analyze_meta_quality(
+        seo_data.get('title', {}).get('content', ''),
+        seo_data.get('meta_description', ''),
+        seo_data.get('url', '')
+    )
+
+    # Generate contextual examples using FastMCP
+    title_examples = generate_contextual_examples(content_context, "title")
+    desc_examples = generate_contextual_examples(content_context, "meta_description")
+    h1_examples = generate_contextual_examples(content_context, "h1")
+
+    return {
+        "content_context": content_context,
+        "heading_analysis": heading_analysis,
+        "meta_analysis": meta_analysis,
+        "title_examples": title_examples,
+        "desc_examples": desc_examples,
+        "h1_examples": h1_examples,
+        "fastmcp_context": {
+            'content_type': content_context.get('content_type', 'general'),
+            'keywords': content_context.get('keywords', [])[:5],
+            'heading_score': heading_analysis.get('hierarchy_score', 0),
+            'title_score': meta_analysis.get('title', {}).get('score', 0),
+            'description_score': meta_analysis.get('description', {}).get('score', 0)
+        }
+    }
+
+
+def build_groq_request(seo_data: Dict, business_context: Dict = None, analysis: Optional[Dict] = None) -> Dict:
+    """
+    Run the FastMCP analyzers on a page (unless given their analysis) and
+    render the Groq messages for it, fitted into GROQ_PROMPT_TOKEN_BUDGET.
+
+    The LLM cache key is taken from the messages rendered with keywords ranked
+    by plain frequency. The TF-IDF ranking in the prompt depends on the pages
+    this process happened to analyze before, and keying on it would give the
+    same page a different key as the corpus grows, or on another worker.
+    """
+    if analysis is None:
+        analysis = run_fastmcp_analyzers(seo_data)
+    messages, fit = render_groq_messages(seo_data, business_context, analysis)
+
+    content_context = analysis["content_context"]
+    key_messages = messages
+    if content_context["frequent_keywords"] != content_context["keywords"]:
+        key_context = dict(content_context, keywords=content_context["frequent_keywords"])
+        key_analysis = dict(
+            analysis,
+            content_context=key_context,
+            title_examples=generate_contextual_examples(key_context, "title"),
+            desc_examples=generate_contextual_examples(key_context, "meta_description"),
+            h1_examples=generate_contextual_examples(key_context, "h1")
+        )
+        key_messages = render_groq_messages(seo_data, business_context, key_analysis)[0]
+
+    return {
+        "messages": messages,
+        "cache_key": LLMCache.fingerprint(llm_router.cache_model, GROQ_TEMPERATURE, GROQ_MAX_TOKENS, key_messages),
+        "prompt_budget": dict(fit, budget=GROQ_PROMPT_TOKEN_BUDGET, estimated_tokens=estimate_message_tokens(messages)),
+        "content_context": content_context,
+        "meta_analysis": analysis["meta_analysis"],
+        "title_examples": analysis["title_examples"],
+        "desc_examples": analysis["desc_examples"],
+        "fastmcp_context": analysis["fastmcp_context"]
+    }
+
+
+def render_groq_messages(seo_data: Dict, business_context: Optional[Dict], analysis: Dict) -> Tuple[List[Dict], Dict]:
+    """
+    The system and user messages for a page's analysis, and how the prompt was fitted
+    """
+    content_context = analysis["content_context"]
+    heading_analysis = analysis["heading_analysis"]
+    meta_analysis = analysis["meta_analysis"]
+    title_examples = analysis["title_examples"]
+    desc_examples = analysis["desc_examples"]
+    h1_examples = analysis["h1_examples"]
+
+    content_type = content_context['content_type']
+    h1_content = ', '.join(seo_data.get('headings', {}).get('h1', [])) or 'NONE'
+
+    system_message = {
+        "role": "system",
+        "content": f"You are an expert SEO consultant. This is a {content_type} website about {', '.join(content_context['keywords'][:3])}. Provide specific, actionable recommendations based on the analysis you are given."
+    }
+
+    # Sections in prompt order; priority decides what goes first when over budget
+    builder = PromptBuilder(GROQ_PROMPT_TOKEN_BUDGET - estimate_message_tokens([system_message]) - 4)
+    builder.add("page", f"""Website URL: {seo_data.get('url', 'Unknown')}
+Content Type: {content_type}""", 0)
+
+    if business_context:
+        builder.add("business_context", "BUSINESS CONTEXT:\n" + '\n'.join(
+            f"- {key.replace('_', ' ').title()}: {value}"
+            for key, value in business_context.items() if value and value != "Not specified"
+        ), 1)
+
+    builder.add("title", f"""TITLE:
+- Current: {seo_data.get('title', {}).get('content', 'MISSING')}
+- Length: {seo_data.get('title', {}).get('length', 0)} characters
+- Status: {meta_analysis['title'].get('status', 'unknown')}, score {meta_analysis['title'].get('score', 0)}/100
+- Issue: {meta_analysis['title'].get('issue', 'N/A')}""", 1)
+
+    builder.add("meta_description", f"""META DESCRIPTION:
+- Current: {seo_data.get('meta_description') or 'MISSING'}
+- Length: {len(seo_data.get('meta_description') or '')} characters
+- Status: {meta_analysis['description'].get('status', 'unknown')}, score {meta_analysis['description'].get('score', 0)}/100
+- Issue: {meta_analysis['description'].get('issue', 'N/A')}""", 1)
+
+    headings = f"""HEADINGS:
+- H1/H2/H3 Tags: {heading_analysis['h1_count']}/{heading_analysis['h2_count']}/{heading_analysis['h3_count']}
+- Hierarchy Score: {heading_analysis['hierarchy_score']}/100
+- Issues: {', '.join(heading_analysis['issues']) if heading_analysis['issues'] else 'None'}
+"""
+    builder.add("headings", headings + f"- H1 Content: {h1_content}", 2, _clip_text(h1_content, headings + "- H1 Content: "))
+
+    builder.add("technical", f"""TECHNICAL SEO:
+- Canonical URL: {'Present' if seo_data.get('canonical') else 'MISSING'}
+- Robots Meta: {seo_data.get('robots', 'MISSING')}
+- Open Graph Tags: {'Present' if seo_data.get('open_graph', {}).get('title') else 'MISSING'}
+- Twitter Card: {'Present' if seo_data.get('twitter_card', {}).get('card') else 'MISSING'}
+- Structured Data: {len(seo_data.get('structured_data', []))} schemas found
+- URL Structure Score: {meta_analysis['url_structure']['score']}/100""", 2)
+
+    builder.add("keywords", f"""CONTENT:
+- Top Keywords: {', '.join(content_context['keywords'][:5])}
+- Word Count: {content_context['word_count']}""", 3)
+
+    builder.add("images_links", f"""IMAGES AND LINKS:
+- Images: {seo_data.get('images', {}).get('total', 0)} total, {seo_data.get('images', {}).get('without_alt', 0)} without ALT
+- Links: {seo_data.get('links', {}).get('total', 0)} total, {seo_data.get('links', {}).get('internal', 0)} internal, {seo_data.get('links', {}).get('external', 0)} external""", 3)
+
+    builder.add("examples", f"""REFERENCE EXAMPLES (from content analysis):
+- Title: {json.dumps(title_examples)}
+- Description: {json.dumps(desc_examples)}
+- H1: {json.dumps(h1_examples)}""", 4)
+
+    preview = content_context['preview']
+    builder.add("content_preview", f"Content Preview: {preview}", 5, _clip_text(preview, "Content Preview: "))
+
+    builder.add("instructions", f"""INSTRUCTIONS:
+1. Give SPECIFIC recommendations for the most impactful issues first, judged by the scores above. Maximum 10 recommendations.
+2. Each recommendation needs at least 3 DIFFERENT realistic examples for a {content_type} site, using the reference examples as inspiration.
+
+Return ONLY valid JSON in this exact format:
+{{"recommendations": [{{"parameter": "Title Tag", "issue": "specific issue with its score", "recommendation": "actionable advice for a {content_type} site", "examples": ["first", "second", "third"], "priority": "critical|high|medium|low"}}]}}""", 0)
+
+    prompt, fit = builder.build()
+
+    messages = [
+        system_message,
+        {
+            "role": "user",
+            "content": prompt,
+        }
+    ]
+    return messages, fit
+
+
+def parse_groq_response(response_text: str, groq_request: Dict) -> Dict:
+    """
+    Decode the recommendations JSON in a completion (raises json.JSONDecodeError if there is none)
+    """
+    # Try to extract JSON response
+    json_match = re.search(r'({.*})', response_text, re.DOTALL)
+    if json_match:
+        response_text = json_match.group(1)
+
+    recommendations = json.loads(response_text)
+
+    # Add FastMCP context to response
+    recommendations['fastmcp_context'] = dict(groq_request["fastmcp_context"])
+
+    return recommendations
+
+
+def fallback_recommendations(groq_request: Dict) -> Dict:
+    """
+    Recommendations built from the FastMCP examples when the completion is not valid JSON
+    """
+    content_context = groq_request["content_context"]
+    meta_analysis = groq_request["meta_analysis"]
+    return {
+        "recommendations": [
+            {
+                "parameter": "Title Tag",
+                "issue": f"Based on FastMCP analysis, your title needs improvement. Current score: {meta_analysis['title'].get('score', 0)}/100",
+                "recommendation": f"Create a compelling title for your {content_context['content_type']} website focusing on: {', '.join(content_context['keywords'][:3])}",
+                "examples": groq_request["title_examples"],
+                "priority": "high"
+            },
+            {
+                "parameter": "Meta Description",
+                "issue": f"FastMCP analysis shows description issues. Score: {meta_analysis['description'].get('score', 0)}/100",
+                "recommendation": f"Write an engaging description for your {content_context['content_type']} site",
+                "examples": groq_request["desc_examples"],
+                "priority": "high"
+            }
+        ],
+        "fastmcp_context": dict(groq_request["fastmcp_context"]),
+        "fallback": True
+    }
+
+
+# Rule engine behind mode "fast": recommendations without a Groq call
+RULE_PRIORITIES = ("critical", "high", "medium", "low")
+RULE_MIN_WORDS = 300  # below this the page counts as thin content
+
+STRUCTURED_DATA_EXAMPLES = {
+    "e-commerce": ["Product with Offer (price, availability)", "AggregateRating from product reviews", "BreadcrumbList for category navigation"],
+    "blog": ["Article or BlogPosting with author and datePublished", "Person for the author", "BreadcrumbList for the post's section"],
+    "service": ["LocalBusiness or ProfessionalService with address and hours", "Service describing each offering", "FAQPage for common client questions"],
+}
+
+
+def rule_recommendations(seo_data: Dict, business_context: Dict = None) -> Dict:
+    """
+    Complete, prioritized recommendations from the FastMCP analyzers and a
+    fixed rule set over the extracted page, in the shape get_groq_recommendations returns
+    """
+    analysis = run_fastmcp_analyzers(seo_data)
+    content_context = analysis["content_context"]
+    meta_analysis = analysis["meta_analysis"]
+    heading_analysis = analysis["heading_analysis"]
+    content_type = content_context["content_type"]
+    keywords = content_context["keywords"]
+    topic = keywords[0] if keywords else "your main topic"
+    context = {
+        key: value for key, value in (business_context or {}).items() if value and value != "Not specified"
+    }
+    recommendations = []
+
+    def add(parameter: str, issue: str, recommendation: str, examples: List[str], priority: str):
+        recommendations.append({
+            "parameter": parameter,
+            "issue": issue,
+            "recommendation": recommendation,
+            "examples": examples,
+            "priority": priority
+        })
+
+    # Title and description, from analyze_meta_quality
+    title = meta_analysis["title"]
+    if title["status"] != "good":
+        add(
+            "Title Tag",
+            f"{title['issue']}. Score: {title['score']}/100",
+            f"Write a 30-70 character title for your {content_type} site that leads with: {', '.join(keywords[:3]) or topic}",
+            analysis["title_examples"],
+            {"critical": "critical", "poor": "high"}.get(title["status"], "medium")
+        )
+
+    description = meta_analysis["description"]
+    if description["status"] != "good":
+        action = f" and ends with a call to action ({context['desired_action']})" if "desired_action" in context else ""
+        add(
+            "Meta Description",
+            f"{description['issue']}. Score: {description['score']}/100",
+            f"Write a 120-160 character description that mentions {topic}{action}",
+            analysis["desc_examples"],
+            "high" if description["status"] == "critical" else "medium"
+        )
+
+    # Headings, from analyze_heading_structure
+    if heading_analysis["h1_count"] != 1:
+        add(
+            "H1 Heading",
+            f"{heading_analysis['issues'][0]}. Hierarchy score: {heading_analysis['hierarchy_score']}/100",
+            heading_analysis["recommendations"][0],
+            analysis["h1_examples"],
+            "high" if heading_analysis["h1_count"] == 0 else "medium"
+        )
+    if heading_analysis["h2_count"] == 0:
+        add(
+            "H2 Headings",
+            "No H2 tags found",
+            "Break the content into sections with descriptive H2 headings",
+            [f"What to Look for in {topic.title()}", f"How {topic.title()} Works", f"Frequently Asked Questions About {topic.title()}"],
+            "medium"
+        )
+
+    # Indexability
+    robots = (seo_data.get("robots") or "").lower()
+    if "noindex" in robots:
+        add(
+            "Robots Meta",
+            f"The page asks search engines not to index it (robots: {seo_data['robots']})",
+            "Remove noindex unless this page should stay out of search results",
+            ["index, follow", "max-image-preview:large", "Remove the robots meta tag to use the default (index, follow)"],
+            "critical"
+        )
+    elif "nofollow" in robots:
+        add(
+            "Robots Meta",
+            f"Links on the page are not followed (robots: {seo_data['robots']})",
+            "Drop nofollow so link equity reaches the pages this one links to",
+            ["index, follow", "max-snippet:-1", "Remove the robots meta tag to use the default (index, follow)"],
+            "high"
+        )
+
+    canonical = seo_data.get("canonical")
+    page_url = seo_data.get("url", "")
+    if not canonical:
+        add(
+            "Canonical URL",
+            "No canonical link found",
+            "Declare the preferred URL so duplicates (tracking parameters, http/https, trailing slashes) consolidate to it",
+            [f'<link rel="canonical" href="{page_url.split("?")[0]}">', "Use absolute https URLs in canonical links", "Point paginated and filtered variants at their main page"],
+            "medium"
+        )
+    elif normalize_url(urljoin(page_url, canonical)) != normalize_url(page_url):
+        add(
+            "Canonical URL",
+            f"Canonical points to a different URL ({canonical})",
+            "Check that this page is meant to be a duplicate; otherwise make the canonical self-referencing",
+            [f'<link rel="canonical" href="{page_url.split("?")[0]}">', "Keep canonicals consistent with internal links", "Avoid canonical chains"],
+            "low"
+        )
+
+    # Content
+    word_count = seo_data.get("content", {}).get("word_count", 0)
+    if word_count < RULE_MIN_WORDS:
+        add(
+            "Content Depth",
+            f"Thin content ({word_count} words)",
+            f"Expand the page to at least {RULE_MIN_WORDS} words of useful copy about {topic}",
+            [f"A buying or getting-started guide for {topic}", f"Answers to the top questions customers ask about {topic}", "Specifications, comparisons or case studies"],
+            "high" if word_count < RULE_MIN_WORDS // 3 else "medium"
+        )
+
+    # Images and links
+    images = seo_data.get("images", {})
+    without_alt = images.get("without_alt", 0)
+    if without_alt:
+        add(
+            "Image ALT Text",
+            f"{without_alt} of {images.get('total', 0)} images have no ALT text",
+            "Describe each meaningful image in its ALT attribute; use empty ALT only for decorative images",
+            [f"{topic.title()} shown from the front", f"Customer using {topic} at home", f"Close-up of {topic} details"],
+            "high" if without_alt * 2 > images.get("total", 0) else "medium"
+        )
+
+    links = seo_data.get("links", {})
+    if links.get("internal", 0) == 0:
+        add(
+            "Internal Links",
+            f"No internal links ({links.get('total', 0)} links in total)",
+            "Link to related pages on the site with descriptive anchor text",
+            [f"Related {topic} guides", "Category or service pages this page belongs to", "Contact or next-step page"],
+            "medium"
+        )
+
+    # Sharing and rich results
+    open_graph = seo_data.get("open_graph", {})
+    missing_og = [name for name in ("title", "description", "image", "url") if not open_graph.get(name)]
+    if missing_og:
+        add(
+            "Open Graph Tags",
+            f"Missing og:{', og:'.join(missing_og)}",
+            "Add Open Graph tags so shared links show a title, description and image",
+            ([f'<meta property="og:{name}" content="...">' for name in missing_og] + ["Use a 1200x630 image for og:image", "Keep og:title under 60 characters"])[:3],
+            "medium" if len(missing_og) == 4 else "low"
+        )
+
+    if not seo_data.get("twitter_card", {}).get("card"):
+        add(
+            "Twitter Card",
+            "No twitter:card meta tag",
+            "Add a Twitter Card so links shared on X render as rich previews",
+            ['<meta name="twitter:card" content="summary_large_image">', '<meta name="twitter:title" content="...">', '<meta name="twitter:image" content="...">'],
+            "low"
+        )
+
+    if not seo_data.get("structured_data"):
+        add(
+            "Structured Data",
+            "No JSON-LD structured data found",
+            f"Add schema.org markup that fits a {content_type} site to qualify for rich results",
+            STRUCTURED_DATA_EXAMPLES.get(content_type, ["Organization with logo and sameAs profiles", "WebSite with a SearchAction", "BreadcrumbList for navigation"]),
+            "medium"
+        )
+
+    url_issues = meta_analysis["url_structure"]["issues"]
+    if url_issues:
+        add(
+            "URL Structure",
+            f"{', '.join(url_issues)}. Score: {meta_analysis['url_structure']['score']}/100",
+            "Use short, lowercase, hyphenated paths without query parameters for indexable pages",
+            [f"/{topic.replace(' ', '-')}", f"/{content_type}/{topic.replace(' ', '-')}", "/category/product-name"],
+            "low"
+        )
+
+    recommendations.sort(key=lambda item: RULE_PRIORITIES.index(item["priority"]))
+    return {
+        "recommendations": recommendations,
+        "fastmcp_context": analysis["fastmcp_context"],
+        "engine": "rules"
+    }
+
+
+def error_recommendations(error: Exception) -> Dict:
+    return {
+        "recommendations": [
+            {
+                "parameter": "API Error",
+                "issue": "Failed to generate recommendations with FastMCP",
+                "recommendation": f"Error: {str(error)}. Please try again.",
+                "examples": [
+                    "Check your API connection",
+                    "Verify FastMCP is properly configured",
+                    "Try analyzing the website again"
+                ],
+                "priority": "high"
+            }
+        ],
+        "fastmcp_context": {
+            'content_type': 'unknown',
+            'keywords': [],
+            'heading_score': 0,
+            'title_score': 0,
+            'description_score': 0
+        }
+    }
+
+
+def token_usage(groq_request: Dict, usage, cached: bool, started: float, first_token: Optional[float] = None,
+                route: Optional[Dict] = None) -> Dict:
+    """
+    Per-request record of what the prompt cost and how it was fitted to the budget
+    """
+    record = {
+        "cached": cached,
+        "estimated_prompt_tokens": groq_request["prompt_budget"]["estimated_tokens"],
+        "prompt_tokens": usage.prompt_tokens if usage is not None else None,
+        "completion_tokens": usage.completion_tokens if usage is not None else None,
+        "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        "prompt_budget": groq_request["prompt_budget"]["budget"],
+        "trimmed_sections": groq_request["prompt_budget"]["trimmed"],
+        "dropped_sections": groq_request["prompt_budget"]["dropped"]
+    }
+    if first_token is not None:
+        record["first_token_ms"] = round((first_token - started) * 1000, 1)
+    if route is not None:
+        record.update(route)
+    return record
+
+
+def get_groq_recommendations(seo_data: Dict, business_context: Dict = None, lane: str = "interactive",
+                             analysis: Optional[Dict] = None) -> Dict:
+    """
+    Generate SEO recommendations using Groq API with FastMCP-enhanced context and business goals
+    """
+    try:
+        with timed("context"):
+            groq_request = build_groq_request(seo_data, business_context, analysis)
+        messages = groq_request["messages"]
+
+        # Identical prompts (unchanged pages, shared templates) are answered from the cache
+        cache_key = groq_request["cache_key"]
+        response_text = llm_cache.get(cache_key)
+        from_cache = response_text is not None
+        started = time.monotonic()
+        usage = route = None
+
+        if not from_cache:
+            # Call the fastest LLM backend with FastMCP-enhanced parameters
+            with timed("groq"):
+                response_text, usage, route = llm_router.complete(messages, lane)
+
+        try:
+            recommendations = parse_groq_response(response_text, groq_request)
+
+            # Only completions that parsed are worth replaying
+            if not from_cache:
+                llm_cache.put(cache_key, response_text)
+        except json.JSONDecodeError:
+            # Fallback with FastMCP-generated examples
+            recommendations = fallback_recommendations(groq_request)
+
+        recommendations["usage"] = token_usage(groq_request, usage, from_cache, started, route=route)
+        return recommendations
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        return error_recommendations(e)
+
+
+class RecommendationStreamParser:
+    """
+    Pick complete recommendation objects out of a completion while it is
+    still streaming. Expects the {"recommendations": [{...}, ...]} shape the
+    prompt asks for; objects are reported as soon as their closing brace arrives.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.current = None
+
+    def feed(self, text: str) -> List[Dict]:
+        found = []
+        for ch in text:
+            if self.current is not None:
+                self.current.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                # Quotes in prose before the JSON starts are not strings
+                self.in_string = self.depth > 0
+            elif ch in '{[':
+                self.depth += 1
+                if ch == '{' and self.depth == 3:
+                    self.current = ['{']
+            elif ch in '}]':
+                if ch == '}' and self.depth == 3 and self.current is not None:
+                    try:
+                        item = json.loads(''.join(self.current))
+                        if isinstance(item, dict):
+                            found.append(item)
+                    except json.JSONDecodeError:
+                        pass
+                    self.current = None
+                self.depth = max(0, self.depth - 1)
+        return found
+
+
+def _stream_completion(messages: List[Dict], emit, stopped: threading.Event):
+    """
+    Blocking: stream a completion from the preferred LLM backend, passing each
+    text delta to emit. Returns the token usage reported with the last chunk,
+    if any, and the route taken.
+    """
+    with timed("groq"):
+        return llm_router.stream(messages, "interactive", emit, stopped)
+
+
+async def stream_groq_recommendations(groq_request: Dict):
+    """
+    Async generator of ("recommendation", item) events while Groq is generating,
+    ending with ("done", recommendations) carrying the same payload
+    get_groq_recommendations would have returned
+    """
+    parser = RecommendationStreamParser()
+    try:
+        messages = groq_request["messages"]
+        cache_key = groq_request["cache_key"]
+        # The cache's disk tier is SQLite, so lookups and writes run in a thread
+        response_text = await asyncio.to_thread(llm_cache.get, cache_key)
+        from_cache = response_text is not None
+        started = time.monotonic()
+        first_token = usage = route = None
+
+        if from_cache:
+            for item in parser.feed(response_text):
+                yield "recommendation", item
+        else:
+            loop = asyncio.get_running_loop()
+            pieces = asyncio.Queue()
+            stopped = threading.Event()
+
+            def emit(piece: str):
+                loop.call_soon_threadsafe(pieces.put_nowait, piece)
+
+            completion = asyncio.ensure_future(groq_executor.run(_stream_completion, messages, emit, stopped))
+            completion.add_done_callback(lambda _: pieces.put_nowait(None))
+            parts = []
+            try:
+                while True:
+                    piece = await pieces.get()
+                    if piece is None:
+                        break
+                    if first_token is None:
+                        first_token = time.monotonic()
+                    parts.append(piece)
+                    for item in parser.feed(piece):
+                        yield "recommendation", item
+            finally:
+                # Stop the worker thread if the client went away mid-stream
+                stopped.set()
+            usage, route = await completion
+            response_text = ''.join(parts)
+
+        try:
+            recommendations = parse_groq_response(response_text, groq_request)
+            if not from_cache:
+                await asyncio.to_thread(llm_cache.put, cache_key, response_text)
+        except json.JSONDecodeError:
+            recommendations = fallback_recommendations(groq_request)
+        recommendations["usage"] = token_usage(groq_request, usage, from_cache, started, first_token, route)
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        recommendations = error_recommendations(e)
+
+    yield "done", recommendations
+
+
+# "full" parses the whole page, "head" stops reading at </head> (title, meta, canonical, OG, Twitter);
+# "fast" parses the whole page but answers from the rule engine instead of Groq
+ANALYSIS_MODES = ("full", "head", "fast")
+
+# URL-level cache of extracted seo_data
+SEO_CACHE_TTL = float(os.environ.get("SEO_CACHE_TTL", "300"))
+SEO_CACHE_MAX_ENTRIES = int(os.environ.get("SEO_CACHE_MAX_ENTRIES", "512"))
+SEO_CACHE_MAX_BYTES = int(os.environ.get("SEO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for cache keys: lowercase scheme and host,
+    default port and fragment dropped, query parameters sorted
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        return url
+    host = (parsed.hostname or '').lower()
+    if port is not None and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, query, ''))
+
+
+class SEOCache:
+    """
+    LRU cache of extracted pages (PageRecord) with a TTL, bounded by entry
+    count and by the approximate bytes the records hold. Expired entries keep
+    their ETag / Last-Modified so they can be revalidated with a conditional request.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "refreshed": 0,
+            "evictions": 0
+        }
+
+    def get(self, key) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return entry["expires_at"] > time.monotonic()
+
+    def put(self, key, page: "PageRecord", validators: Dict):
+        if self.max_entries <= 0:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous["size"]
+        size = page.size()
+        if self.max_bytes and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return
+        self._entries[key] = {
+            "page": page,
+            "size": size,
+            "validators": validators,
+            "expires_at": time.monotonic() + self.ttl
+        }
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted["size"]
+            self.stats["evictions"] += 1
+
+    def touch(self, entry: Dict):
+        entry["expires_at"] = time.monotonic() + self.ttl
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, entries=len(self._entries), bytes=self.bytes, max_entries=self.max_entries,
+                    max_bytes=self.max_bytes, ttl=self.ttl)
+
+
+seo_cache = SEOCache(SEO_CACHE_MAX_ENTRIES, SEO_CACHE_TTL, SEO_CACHE_MAX_BYTES)
+
+
+async def _fetch_and_extract(url: str, mode: str, validators: Optional[Dict]) -> Tuple["PageRecord", Dict]:
+    if mode == "head":
+        with timed("fetch_head"):
+            seo_data, page_validators = await fetch_head_seo_data(url, validators=validators)
+        return PageRecord.from_dict(seo_data), page_validators
+
+    with timed("fetch"):
+        html, page_validators, _ = await fetch_html(url, validators=validators)
+    with timed("parse"):
+        page = await parse_executor.run(extract_page, html, url)
+    return page, page_validators
+
+
+class SingleFlight:
+    """
+    Let concurrent callers with the same key share one in-flight call
+    """
+
+    def __init__(self):
+        self._calls: Dict = {}
+        self.stats = {
+            "leaders": 0,
+            "coalesced": 0
+        }
+
+    async def run(self, key, fn, *args):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded so one caller going away does not cancel the others' result
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, in_flight=len(self._calls))
+
+
+seo_flights = SingleFlight()
+
+
+async def analyze_seo_async(url: str, mode: str = "full") -> Dict:
+    """
+    Analyze SEO for the given URL without blocking the event loop.
+    Results are cached per normalized URL and revalidated once stale;
+    concurrent requests for the same page share one fetch and parse.
+    """
+    page = await analyze_page_async(url, mode)
+    return page if isinstance(page, dict) else page.as_dict(url)
+
+
+async def analyze_page_async(url: str, mode: str = "full") -> Union["PageRecord", Dict]:
+    """
+    analyze_seo_async returning the cached PageRecord itself, or {"error": ...}
+    """
+    # "fast" extracts the same data as "full" and shares its cache entries
+    key = (normalize_url(url), "head" if mode == "head" else "full")
+    return await seo_flights.run(key, _analyze_seo, url, key)
+
+
+async def _analyze_seo(url: str, key: Tuple[str, str]) -> Union["PageRecord", Dict]:
+    mode = key[1]
+    try:
+        entry = seo_cache.get(key)
+
+        if entry is not None and seo_cache.is_fresh(entry):
+            seo_cache.stats["hits"] += 1
+            return entry["page"]
+
+        try:
+            page, validators = await _fetch_and_extract(url, mode, entry["validators"] if entry else None)
+        except PageNotModified:
+            seo_cache.touch(entry)
+            seo_cache.stats["revalidated"] += 1
+            return entry["page"]
+
+        seo_cache.stats["refreshed" if entry is not None else "misses"] += 1
+        seo_cache.put(key, page, validators)
+        return page
+
+    except ExecutorSaturated:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+
+# Meta tags read by the extractor, mapped to their place in seo_data
+META_NAME_FIELDS = {
+    "description": ("meta_description",),
+    "keywords": ("meta_keywords",),
+    "robots": ("robots",),
+    "twitter:card": ("twitter_card", "card"),
+    "twitter:title": ("twitter_card", "title"),
+    "twitter:description": ("twitter_card", "description"),
+    "twitter:image": ("twitter_card", "image"),
+}
+META_PROPERTY_FIELDS = {
+    "og:title": ("open_graph", "title"),
+    "og:description": ("open_graph", "description"),
+    "og:image": ("open_graph", "image"),
+    "og:url": ("open_graph", "url"),
+}
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6")
+
+# Tree-building rules of BeautifulSoup's html.parser builder, which the extractor
+# mirrors. Copied rather than imported, since importing bs4 is a good part of a
+# cold start; tests/test_extractor_parity.py checks them against bs4.
+VOID_TAGS = frozenset((
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+    'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+))
+PRESERVE_WHITESPACE_TAGS = frozenset(('pre', 'textarea'))
+STRING_CONTAINER_TAGS = frozenset(('rt', 'rp', 'style', 'script', 'template'))
+ASCII_SPACES = ' \n\t\x0c\r'
+# Named character references without their semicolon; sorted in reverse so the
+# first spelling of a name is the one left in the dict
+HTML_ENTITIES = {name.rstrip(';'): character for name, character in sorted(HTML5_ENTITIES.items(), reverse=True)}
+
+# Body text kept per page; longer text is cut (word_count still covers all of it).
+# With FETCH_MAX_BYTES this bounds the memory one analysis can hold.
+EXTRACT_MAX_TEXT_CHARS = int(os.environ.get("EXTRACT_MAX_TEXT_CHARS", "1000000"))
+
+
+def empty_seo_data(url: str) -> Dict:
+    return {
+        "url": url,
+        "title": {
+            "content": None,
+            "length": 0
+        },
+        "meta_description": None,
+        "meta_keywords": None,
+        "headings": {
+            "h1": [],
+            "h2": [],
+            "h3": [],
+            "h4": [],
+            "h5": [],
+            "h6": []
+        },
+        "images": {
+            "total": 0,
+            "without_alt": 0,
+            "with_alt": 0
+        },
+        "links": {
+            "internal": 0,
+            "external": 0,
+            "total": 0
+        },
+        "content": {
+            "word_count": 0,
+            "text": ""
+        },
+        "open_graph": {
+            "title": None,
+            "description": None,
+            "image": None,
+            "url": None
+        },
+        "twitter_card": {
+            "card": None,
+            "title": None,
+            "description": None,
+            "image": None
+        },
+        "canonical": None,
+        "robots": None,
+        "structured_data": []
+    }
+
+
+def count_words(text: str) -> int:
+    """
+    len(text.split()) without building the list of every word
+    """
+    return sum(len(block.split()) for block in text_blocks(text))
+
+
+def _element_string(element: List) -> Optional[str]:
+    """
+    Same rule as Tag.string: the only child string, looking through single-child tags
+    """
+    children = element[1]
+    if len(children) != 1:
+        return None
+    child = children[0]
+    if isinstance(child, str):
+        return child
+    return _element_string(child)
+
+
+# Browsers drop tabs and newlines anywhere in a URL
+_URL_CONTROL_CHARS = str.maketrans('', '', '\t\n\r')
+_AUTHORITY_END = re.compile(r'[/?#]')
+
+
+def resolve_link(href: str, page_url: str) -> Optional[str]:
+    """
+    Absolute URL of an href without its fragment, or None when it is not an
+    http(s) link (mailto:, tel:, javascript: and the like)
+    """
+    href = href.strip()
+    if not href.isprintable():
+        href = href.translate(_URL_CONTROL_CHARS)
+    # Fast paths for the common absolute and root-relative links; urljoin costs
+    # ~10 us a call, which adds up on listing pages with thousands of links
+    if '/.' not in href:
+        if href.startswith(('http://', 'https://')):
+            # Hosts urlparse would reject (a stray bracket, non-ASCII that
+            # normalizes to a delimiter) take the slow path and come back None
+            authority = _AUTHORITY_END.split(href.split('//', 1)[1], 1)[0]
+            if authority.isascii() and '[' not in authority and ']' not in authority:
+                return href.split('#', 1)[0]
+        if href.startswith('/') and not href.startswith('//'):
+            origin = _origin(page_url)
+            return origin + href.split('#', 1)[0] if origin else None
+    try:
+        link = urldefrag(urljoin(page_url, href))[0]
+    except ValueError:
+        return None  # e.g. a malformed IPv6 host
+    return link if link.startswith(('http://', 'https://')) else None
+
+
+def _invalid_url_result(url: str, error: Exception, **fields) -> Dict:
+    # Not worth retrying: cached like an answer rather than like a timeout
+    return dict({"url": url, "status": "invalid", "error": str(error) or type(error).__name__}, **fields)
+
+
+@functools.lru_cache(maxsize=256)
+def _origin(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}" if parsed.scheme in ('http', 'https') else None
+
+
+_SRCSET_URL = re.compile(r'[\s,]*(\S*)')
+_SRCSET_DESCRIPTORS = re.compile(r'(?:[^,(]+|\([^)]*\)?)*,?')
+
+
+def srcset_urls(srcset: str) -> List[str]:
+    """
+    Candidate URLs of a srcset attribute, following the HTML parsing rules:
+    a URL may contain commas but not end with one, descriptors run to the next
+    comma outside parentheses
+    """
+    urls = []
+    position = 0
+    while True:
+        match = _SRCSET_URL.match(srcset, position)
+        url, position = match.group(1), match.end()
+        if not url:
+            return urls
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            position = _SRCSET_DESCRIPTORS.match(srcset, position).end()
+        if url:
+            urls.append(url)
+
+
+def site_host(url: str) -> str:
+    """
+    Lowercase host of a URL, without a leading "www."
+    """
+    try:
+        host = urlparse(url).hostname or ''
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+class HeadComplete(Exception):
+    """
+    Raised inside the extractor when a head-only parse has seen the end of <head>
+    """
+
+
+class SEOExtractor(HTMLParser):
+    """
+    Single-pass SEO extractor.
+
+    Tokenizes the document once and fills every field of seo_data as tags
+    and text stream past, without building a DOM. Tag nesting, whitespace
+    and entity handling follow BeautifulSoup's html.parser tree builder, so
+    the result is identical to querying the parsed soup field by field.
+    Markup can be fed in chunks.
+
+    With head_only=True parsing stops at </head> (or <body>) and `complete`
+    is set, so the caller can stop downloading. With collect_links=True the
+    distinct http(s) URLs the <a> hrefs resolve to are kept in `link_urls`
+    (a dict used as an ordered set), and each <img> as its resolved src and
+    srcset URLs in `images`.
+    """
+
+    def __init__(self, url: str, head_only: bool = False, collect_links: bool = False,
+                 max_text_chars: int = EXTRACT_MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=False)
+        self.head_only = head_only
+        self.complete = False
+        self.url = url
+        self.site = site_host(url)
+        self.origin = (_origin(url) or "") + "/"
+        self.link_urls = {} if collect_links else None
+        self.images = [] if collect_links else None
+        self.seo_data = empty_seo_data(url)
+
+        # Open elements as [name, children, text collector]. Children are only
+        # recorded where Tag.string is needed (the title and JSON-LD scripts).
+        self.stack = []
+        self.open_counts = Counter()
+        self.preserve_whitespace_depth = 0
+        self.container_stack = []
+        self.closed_void_tags = Counter()
+        self.current_data = []
+
+        # Text collectors of the open body/heading elements, outermost first
+        self.collectors = []
+        self.heading_parts = {name: [] for name in HEADING_TAGS}
+        self.body_parts = None
+        self.max_text_chars = max_text_chars
+        self.body_chars = 0
+        self.text_truncated = False
+        self.dropped_words = 0
+        self.in_word = False
+        self.title_element = None
+        self.json_ld_elements = []
+        self.canonical_found = False
+        self.meta_found = set()
+
+    # Tree building
+
+    def _push(self, name: str, attrs: Dict):
+        if self.head_only and name == 'body':
+            raise HeadComplete()
+        self._end_data()
+        parent = self.stack[-1] if self.stack else None
+        element = [name, None, None]
+
+        if parent is not None and parent[1] is not None:
+            element[1] = []
+            parent[1].append(element)
+
+        if name in self.heading_parts:
+            element[2] = []
+            self.heading_parts[name].append(element[2])
+        elif name == 'body':
+            if self.body_parts is None:
+                element[2] = self.body_parts = []
+        elif name == 'title':
+            if self.title_element is None:
+                self.title_element = element
+                if element[1] is None:
+                    element[1] = []
+        elif name == 'script':
+            if attrs.get('type') == 'application/ld+json':
+                self.json_ld_elements.append(element)
+                if element[1] is None:
+                    element[1] = []
+        else:
+            self._inspect_tag(name, attrs)
+
+        if element[2] is not None:
+            self.collectors.append(element[2])
+        self.stack.append(element)
+        self.open_counts[name] += 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_depth += 1
+        if name in STRING_CONTAINER_TAGS:
+            self.container_stack.append(name)
+
+    def _pop(self) -> List:
+        element = self.stack.pop()
+        name = element[0]
+        self.open_counts[name] -= 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_whitespace_depth -= 1
+        if name in STRING_CONTAINER_TAGS:
+            self.container_stack.pop()
+        if element[2] is not None:
+            self.collectors.pop()
+        if self.head_only and name == 'head':
+            raise HeadComplete()
+        return element
+
+    def _close(self, name: str):
+        self._end_data()
+        # Pop up to and including the most recent open element with this name
+        if not self.open_counts.get(name):
+            return
+        while self._pop()[0] != name:
+            pass
+
+    def _end_data(self, string_class=None):
+        if not self.current_data:
+            return
+        data = ''.join(self.current_data)
+        self.current_data = []
+
+        # Whitespace-only strings collapse to a single space or newline
+        if not self.preserve_whitespace_depth and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+
+        if self.stack:
+            children = self.stack[-1][1]
+            if children is not None:
+                children.append(data)
+
+        # Only plain text counts towards get_text() (no comments, scripts, styles)
+        if string_class == "cdata" or (string_class is None and not self.container_stack):
+            for parts in self.collectors:
+                if parts is self.body_parts:
+                    self._add_body_text(data)
+                else:
+                    parts.append(data)
+
+    def _add_body_text(self, data: str):
+        if not self.text_truncated:
+            if self.body_chars + len(data) <= self.max_text_chars:
+                self.body_parts.append(data)
+                self.body_chars += len(data)
+                return
+            self.text_truncated = True
+            last = self.body_parts[-1] if self.body_parts else ''
+            self.in_word = bool(last) and not last[-1].isspace()
+        # Past the ceiling only words are counted; one running across the cut counts once
+        if data:
+            words = len(data.split())
+            if words and self.in_word and not data[0].isspace():
+                words -= 1
+            self.dropped_words += words
+            self.in_word = not data[-1].isspace()
+
+    def _inspect_tag(self, name: str, attrs: Dict):
+        seo_data = self.seo_data
+
+        if name == 'meta':
+            for fields, key in ((META_NAME_FIELDS, 'name'), (META_PROPERTY_FIELDS, 'property')):
+                path = fields.get(attrs.get(key))
+                if path and path not in self.meta_found:
+                    self.meta_found.add(path)
+                    target = seo_data
+                    for part in path[:-1]:
+                        target = target[part]
+                    target[path[-1]] = attrs.get('content', '')
+
+        elif name == 'img':
+            seo_data["images"]["total"] += 1
+            if not attrs.get('alt'):
+                seo_data["images"]["without_alt"] += 1
+            else:
+                seo_data["images"]["with_alt"] += 1
+            if self.images is not None:
+                self._collect_image(attrs)
+
+        elif name == 'a':
+            href = attrs.get('href')
+            if href is not None:
+                seo_data["links"]["total"] += 1
+                # Hosts are compared after resolving, so relative links count as internal and
+                # lookalikes such as example.com.evil.net or a.net/?ref=example.com do not
+                link = resolve_link(href, self.url)
+                if link is not None:
+                    if link.startswith(self.origin) or site_host(link) == self.site:
+                        seo_data["links"]["internal"] += 1
+                    else:
+                        seo_data["links"]["external"] += 1
+                    if self.link_urls is not None:
+                        self.link_urls[link] = None
+
+        elif name == 'link':
+            if not self.canonical_found and 'canonical' in attrs.get('rel', '').split():
+                self.canonical_found = True
+                seo_data["canonical"] = attrs.get('href', '')
+
+    def _collect_image(self, attrs: Dict):
+        urls = []
+        for src in ([attrs['src']] if attrs.get('src') else []) + srcset_urls(attrs.get('srcset') or ''):
+            link = resolve_link(src, self.url)  # data: URIs are dropped here
+            if link is not None and link not in urls:
+                urls.append(link)
+        if urls:
+            # Without both, the browser cannot reserve the image's box and the layout shifts
+            sized = bool(attrs.get('width')) and bool(attrs.get('height'))
+            self.images.append(('1' if sized else '0', urls))
+
+    # HTMLParser callbacks
+
+    def handle_starttag(self, name, attrs, handle_empty_element=True):
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = '' if value is None else value
+        self._push(name, attr_dict)
+        if handle_empty_element and name in VOID_TAGS:
+            # Void tags close immediately; a later explicit end tag is ignored
+            self._close(name)
+            self.closed_void_tags[name] += 1
+
+    def handle_startendtag(self, name, attrs):
+        self.handle_starttag(name, attrs, handle_empty_element=False)
+        self.handle_endtag(name)
+
+    def handle_endtag(self, name):
+        if self.closed_void_tags[name]:
+            self.closed_void_tags[name] -= 1
+        else:
+            self._close(name)
+
+    def handle_data(self, data):
+        self.current_data.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            real_name = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            real_name = int(name.lstrip('X'), 16)
+        else:
+            real_name = int(name)
+
+        data = None
+        if real_name < 256:
+            # Low code points are often meant as windows-1252
+            try:
+                data = bytearray([real_name]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(real_name)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = HTML_ENTITIES.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def _handle_special(self, data: str, string_class: str):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(string_class)
+
+    def handle_comment(self, data):
+        self._handle_special(data, "comment")
+
+    def handle_decl(self, data):
+        self._handle_special(data[len("DOCTYPE "):], "doctype")
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._handle_special(data[len('CDATA['):], "cdata")
+        else:
+            self._handle_special(data, "declaration")
+
+    def handle_pi(self, data):
+        self._handle_special(data, "pi")
+
+    # Result
+
+    def feed(self, data):
+        if self.complete:
+            return
+        try:
+            super().feed(data)
+        except HeadComplete:
+            self.complete = True
+
+    def close(self):
+        if self.complete:
+            return
+        super().close()
+        self._end_data()
+
+    def result(self) -> Dict:
+        """
+        Finish the collected fields and return seo_data
+        """
+        seo_data = self.seo_data
+
+        # Title
+        if self.title_element is not None:
+            title = _element_string(self.title_element)
+            if title is not None:
+                seo_data["title"]["content"] = title
+                seo_data["title"]["length"] = len(title)
+
+        # Headings
+        for name, collected in self.heading_parts.items():
+            seo_data["headings"][name] = [''.join(parts).strip() for parts in collected]
+
+        # Content analysis
+        if self.body_parts is not None:
+            text = ''.join(self.body_parts)
+            self.body_parts = None
+            seo_data["content"]["text"] = text
+            seo_data["content"]["word_count"] = count_words(text) + self.dropped_words
+            if self.text_truncated:
+                seo_data["content"]["truncated"] = True
+
+        # Structured data (JSON-LD)
+        for element in self.json_ld_elements:
+            try:
+                data = json.loads(_element_string(element))
+                seo_data["structured_data"].append(data)
+            except:
+                pass
+
+        return seo_data
+
+
+def parse_seo_html(html: str, url: str) -> Dict:
+    """
+    Extract SEO data from an already downloaded HTML document
+    """
+    extractor = SEOExtractor(url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+
+def parse_seo_html_with_links(html: str, url: str) -> Tuple[Dict, List[str]]:
+    """
+    Like parse_seo_html, also returning the distinct resolved URLs the page links to
+    """
+    extractor = SEOExtractor(url, collect_links=True)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result(), list(extractor.link_urls)
+
+
+class PageRecord:
+    """
+    Compact seo_data kept in the cache and sent back by parse workers: slots
+    instead of a dozen nested dicts, tuples for the fixed groups, JSON-LD kept
+    as its serialized text, and body text as UTF-8 when that is smaller than
+    the str (one character outside Latin-1 makes every character of a str
+    take 2-4 bytes). as_dict() rebuilds the seo_data shape.
+    """
+
+    __slots__ = (
+        "url", "title", "meta_description", "meta_keywords", "headings", "images", "links",
+        "word_count", "text", "truncated", "open_graph", "twitter_card", "canonical", "robots", "structured_data",
+        "link_urls", "image_urls"
+    )
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __reduce__(self):
+        return PageRecord, tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_dict(cls, seo_data: Dict, link_urls=(), image_urls=()) -> "PageRecord":
+        images, links, content = seo_data["images"], seo_data["links"], seo_data["content"]
+        open_graph, twitter_card = seo_data["open_graph"], seo_data["twitter_card"]
+        structured_data = seo_data["structured_data"]
+        return cls(
+            seo_data["url"],
+            seo_data["title"]["content"],
+            seo_data["meta_description"],
+            seo_data["meta_keywords"],
+            tuple(tuple(seo_data["headings"][name]) for name in HEADING_TAGS),
+            (images["total"], images["without_alt"], images["with_alt"]),
+            (links["internal"], links["external"], links["total"]),
+            content["word_count"],
+            _compact_text(content["text"]),
+            content.get("truncated", False),
+            (open_graph["title"], open_graph["description"], open_graph["image"], open_graph["url"]),
+            (twitter_card["card"], twitter_card["title"], twitter_card["description"], twitter_card["image"]),
+            seo_data["canonical"],
+            seo_data["robots"],
+            # One item at a time, so the encoder never holds the whole document's pieces
+            '[' + ','.join(json.dumps(item, ensure_ascii=False, separators=(',', ':')) for item in structured_data) + ']'
+            if structured_data else None,
+            # One string rather than a list of them; resolved URLs never contain a tab or newline
+            '\n'.join(link_urls) or None,
+            '\n'.join(sized + '\t' + '\t'.join(urls) for sized, urls in image_urls) or None
+        )
+
+    def as_dict(self, url: Optional[str] = None) -> Dict:
+        text = self.text.decode("utf-8", "surrogatepass") if isinstance(self.text, bytes) else self.text
+        content = {"word_count": self.word_count, "text": text}
+        if self.truncated:
+            content["truncated"] = True
+        return {
+            "url": url or self.url,
+            "title": {
+                "content": self.title,
+                "length": len(self.title) if self.title else 0
+            },
+            "meta_description": self.meta_description,
+            "meta_keywords": self.meta_keywords,
+            "headings": {name: list(items) for name, items in zip(HEADING_TAGS, self.headings)},
+            "images": dict(zip(("total", "without_alt", "with_alt"), self.images)),
+            "links": dict(zip(("internal", "external", "total"), self.links)),
+            "content": content,
+            "open_graph": dict(zip(("title", "description", "image", "url"), self.open_graph)),
+            "twitter_card": dict(zip(("card", "title", "description", "image"), self.twitter_card)),
+            "canonical": self.canonical,
+            "robots": self.robots,
+            "structured_data": _load_json(self.structured_data) if self.structured_data else []
+        }
+
+    def size(self) -> int:
+        """
+        Approximate bytes held by the record
+        """
+        strings = [self.url, self.title, self.meta_description, self.meta_keywords, self.text, self.canonical,
+                   self.robots, self.structured_data, self.link_urls, self.image_urls, *self.open_graph, *self.twitter_card]
+        strings += [heading for level in self.headings for heading in level]
+        return sys.getsizeof(self) + sum(sys.getsizeof(value) for value in strings if value is not None)
+
+    def link_list(self) -> List[str]:
+        """
+        Distinct http(s) URLs linked from the page (none for head-only records)
+        """
+        return self.link_urls.split('\n') if self.link_urls else []
+
+    def image_list(self) -> List[Tuple[bool, List[str]]]:
+        """
+        (has width and height, [src, srcset URLs...]) of every <img> with an http(s) URL
+        """
+        images = []
+        for line in self.image_urls.split('\n') if self.image_urls else ():
+            sized, *urls = line.split('\t')
+            images.append((sized == '1', urls))
+        return images
+
+
+def _compact_text(text: str):
+    if text.isascii():
+        return text
+    encoded = text.encode("utf-8", "surrogatepass")
+    return encoded if sys.getsizeof(encoded) < sys.getsizeof(text) else text
+
+
+# orjson reads integers outside [-2**63, 2**64) as floats, which takes 19 digits
+# after a minus sign or 20 without; json.loads keeps them exact
+_LONG_DIGITS = re.compile(r'-\d{19}|\d{20}')
+
+
+def _load_json(text: str):
+    if _LONG_DIGITS.search(text):
+        return json.loads(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # NaN and Infinity, which json.loads accepts
+        return json.loads(text)
+
+
+def _dump_json(value, sort_keys: bool = False) -> bytes:
+    # orjson refuses the integers beyond 64 bits that _load_json keeps exact
+    try:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    except TypeError:
+        return json.dumps(value, sort_keys=sort_keys, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def extract_page(html: str, url: str) -> PageRecord:
+    """
+    parse_seo_html for the parse workers: the compact record pickles smaller
+    and is what the cache keeps. It also keeps the page's links and images
+    for link checks and the image audit.
+    """
+    extractor = SEOExtractor(url, collect_links=True)
+    extractor.feed(html)
+    extractor.close()
+    seo_data, link_urls, images = extractor.result(), list(extractor.link_urls), extractor.images
+    # The extractor is released before the record is built, lowering peak memory
+    del extractor
+    return PageRecord.from_dict(seo_data, link_urls, images)
+
+
+async def fetch_head_seo_data(url: str, max_bytes: int = FETCH_MAX_BYTES, validators: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+    """
+    Stream a page through a head-only extractor and close the connection
+    as soon as </head> has been parsed. Returns seo_data and cache validators.
+    """
+    extractor = SEOExtractor(url, head_only=True)
+    host = await host_limiter.acquire(url)
+    try:
+        async with get_http_client().stream("GET", url, headers=_conditional_headers(validators)) as response:
+            if response.status_code == 304:
+                raise PageNotModified()
+            response.raise_for_status()
+            page_validators = _response_validators(response)
+            received = 0
+            async for chunk in response.aiter_text():
+                received += len(chunk)
+                _check_received_size(response, received, max_bytes)
+                extractor.feed(chunk)
+                if extractor.complete:
+                    break
+            metrics.inc("seo_fetch_bytes_total", response.num_bytes_downloaded)
+    finally:
+        host_limiter.release(host)
+
+    extractor.close()
+    return extractor.result(), page_validators
+
+
+# Analysis history: one snapshot per distinct version of a page
+HISTORY_DB_PATH = os.environ.get("HISTORY_DB_PATH", "history.sqlite3")  # empty string disables history
+HISTORY_MAX_SNAPSHOTS = int(os.environ.get("HISTORY_MAX_SNAPSHOTS", "100"))  # kept per URL, mode and context
+
+
+def content_hash(seo_data: Dict) -> str:
+    """
+    Fingerprint of everything extracted from a page (the requested URL aside)
+    """
+    payload = {key: value for key, value in seo_data.items() if key != "url"}
+    return hashlib.sha256(_dump_json(payload, sort_keys=True)).hexdigest()
+
+
+def context_key(business_context: Optional[Dict]) -> str:
+    return json.dumps(business_context, sort_keys=True) if business_context else ''
+
+
+def _flatten(value, prefix: str = '') -> Dict:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    return {prefix: value}
+
+
+def diff_values(before: Dict, after: Dict) -> List[Dict]:
+    """
+    Field-level changes between two nested dicts; lists of plain values are
+    reported as added/removed items
+    """
+    old, new = _flatten(before), _flatten(after)
+    changes = []
+    for field in sorted(old.keys() | new.keys()):
+        a, b = old.get(field), new.get(field)
+        if a == b:
+            continue
+        if isinstance(a, list) and isinstance(b, list) and all(isinstance(x, (str, int, float)) for x in a + b):
+            changes.append({
+                "field": field,
+                "added": [x for x in b if x not in a],
+                "removed": [x for x in a if x not in b]
+            })
+        else:
+            changes.append({"field": field, "before": a, "after": b})
+    return changes
+
+
+class HistoryStore:
+    """
+    SQLite-backed analysis snapshots, indexed by domain, URL and time.
+    A new row is written only when a page's content hash changes; re-checks
+    of an unchanged page just move its checked_at forward. Callers on the
+    event loop run these methods in a thread (asyncio.to_thread).
+    """
+
+    def __init__(self, path: str, max_snapshots: int):
+        self.path = path
+        self.max_snapshots = max_snapshots
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, domain TEXT NOT NULL, url TEXT NOT NULL, mode TEXT NOT NULL, "
+                "context_key TEXT NOT NULL, content_hash TEXT NOT NULL, seo_data TEXT NOT NULL, "
+                "recommendations TEXT NOT NULL, fastmcp_context TEXT NOT NULL, "
+                "created_at REAL NOT NULL, checked_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_url ON snapshots (url, mode, context_key, created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS snapshots_domain ON snapshots (domain, created_at)")
+            self._db.commit()
+        return self._db
+
+    def latest(self, url: str, mode: str, context: str) -> Optional[Dict]:
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT * FROM snapshots WHERE url = ? AND mode = ? AND context_key = ? ORDER BY created_at DESC LIMIT 1",
+                (normalize_url(url), mode, context)
+            ).fetchone()
+        return self._decode(row)
+
+    def record(self, url: str, mode: str, context: str, digest: str, seo_data: Dict, recommendations: Dict) -> Optional[int]:
+        if not self.path:
+            return None
+        url = normalize_url(url)
+        now = time.time()
+        # The body text is only kept as its hash; word counts and everything else stay diffable
+        stored = dict(seo_data, url=url)
+        if "content" in stored:
+            stored["content"] = {key: value for key, value in stored["content"].items() if key != "text"}
+        row = (
+            urlparse(url).netloc, url, mode, context, digest, _dump_json(stored).decode(),
+            _dump_json(recommendations.get("recommendations", [])).decode(),
+            _dump_json(recommendations.get("fastmcp_context", {})).decode(), now, now
+        )
+        with self._lock:
+            db = self._connection()
+            cursor = db.execute(
+                "INSERT INTO snapshots (domain, url, mode, context_key, content_hash, seo_data, recommendations, "
+                "fastmcp_context, created_at, checked_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            db.execute(
+                "DELETE FROM snapshots WHERE url = ? AND mode = ? AND context_key = ? AND id NOT IN ("
+                "SELECT id FROM snapshots WHERE url = ? AND mode = ? AND context_key = ? ORDER BY created_at DESC LIMIT ?)",
+                (url, mode, context, url, mode, context, self.max_snapshots)
+            )
+            db.commit()
+        return cursor.lastrowid
+
+    def touch(self, snapshot_id: int):
+        with self._lock:
+            db = self._connection()
+            db.execute("UPDATE snapshots SET checked_at = ? WHERE id = ?", (time.time(), snapshot_id))
+            db.commit()
+
+    def get(self, snapshot_id: int) -> Optional[Dict]:
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return None
+            row = db.execute("SELECT * FROM snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        return self._decode(row)
+
+    def list(self, url: Optional[str] = None, domain: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """
+        Newest first summaries (scores and counts, no page data) for a URL or a whole domain
+        """
+        column, value = ("url", normalize_url(url)) if url else ("domain", (domain or '').lower())
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            rows = db.execute(
+                "SELECT id, url, mode, content_hash, fastmcp_context, recommendations, created_at, checked_at "
+                f"FROM snapshots WHERE {column} = ? ORDER BY created_at DESC LIMIT ?",
+                (value, limit)
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "url": row["url"],
+                "mode": row["mode"],
+                "content_hash": row["content_hash"],
+                "scores": json.loads(row["fastmcp_context"]),
+                "recommendation_count": len(json.loads(row["recommendations"])),
+                "created_at": row["created_at"],
+                "checked_at": row["checked_at"]
+            }
+            for row in rows
+        ]
+
+    def diff(self, before: Dict, after: Dict) -> Dict:
+        """
+        What changed between two snapshots: seo_data fields, scores, and
+        recommendations added or resolved (matched on parameter)
+        """
+        old_params = {r.get("parameter") for r in before["recommendations"]}
+        new_params = {r.get("parameter") for r in after["recommendations"]}
+        return {
+            "from": before["id"],
+            "to": after["id"],
+            "content_changed": before["content_hash"] != after["content_hash"],
+            "seo_data": diff_values(before["seo_data"], after["seo_data"]),
+            "scores": diff_values(before["fastmcp_context"], after["fastmcp_context"]),
+            "recommendations": {
+                "added": sorted(p for p in new_params - old_params if p),
+                "resolved": sorted(p for p in old_params - new_params if p)
+            }
+        }
+
+    @staticmethod
+    def _decode(row) -> Optional[Dict]:
+        if row is None:
+            return None
+        snapshot = dict(row)
+        for key in ("seo_data", "recommendations", "fastmcp_context"):
+            snapshot[key] = json.loads(snapshot[key])
+        return snapshot
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+history_store = HistoryStore(HISTORY_DB_PATH, HISTORY_MAX_SNAPSHOTS)
+
+
+# Link health: opt-in status checks of the links on an analyzed page
+LINK_CHECK_MAX_LINKS = int(os.environ.get("LINK_CHECK_MAX_LINKS", "500"))
+LINK_CHECK_CONCURRENCY = int(os.environ.get("LINK_CHECK_CONCURRENCY", "32"))
+LINK_CHECK_TIMEOUT = float(os.environ.get("LINK_CHECK_TIMEOUT", "5"))
+LINK_CACHE_TTL = float(os.environ.get("LINK_CACHE_TTL", "3600"))
+LINK_CACHE_ERROR_TTL = float(os.environ.get("LINK_CACHE_ERROR_TTL", "60"))
+LINK_CACHE_MAX_ENTRIES = int(os.environ.get("LINK_CACHE_MAX_ENTRIES", "20000"))
+
+
+class ProbeCache:
+    """
+    LRU cache of per-URL probe results (link statuses, image sizes) with a TTL,
+    shared by all analyses. Timeouts and connection errors are kept for a
+    shorter time than answers.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, error_ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0
+        }
+
+    def get(self, url: str) -> Optional[Dict]:
+        entry = self._entries.get(url)
+        if entry is None or entry[1] <= time.monotonic():
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(url)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def put(self, url: str, result: Dict):
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl if result["status"] is not None else min(self.ttl, self.error_ttl)
+        self._entries.pop(url, None)
+        self._entries[url] = (result, time.monotonic() + ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, entries=len(self._entries), max_entries=self.max_entries, ttl=self.ttl)
+
+
+link_cache = ProbeCache(LINK_CACHE_MAX_ENTRIES, LINK_CACHE_TTL, LINK_CACHE_ERROR_TTL)
+link_flights = SingleFlight()
+
+
+async def check_link(url: str) -> Dict:
+    """
+    Status of one link over the shared connection pool: a HEAD request, repeated
+    as a GET when it fails, since many servers answer HEAD with 403, 404 or 405
+    or drop it altogether. A URL that cannot be requested has status "invalid".
+    """
+    client = get_http_client()
+    host = None
+    try:
+        host = await host_limiter.acquire(url)
+        try:
+            response = await client.head(url, timeout=LINK_CHECK_TIMEOUT)
+        except httpx.TransportError:
+            response = None
+        method = "HEAD"
+        if response is None or response.status_code >= 400:
+            # The status line is all we need; leaving the block closes the body unread
+            async with client.stream("GET", url, timeout=LINK_CHECK_TIMEOUT) as response:
+                method = "GET"
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError) as e:
+        return _invalid_url_result(url, e, ok=False)
+    except httpx.HTTPError as e:
+        return {"url": url, "status": None, "ok": False, "error": str(e) or type(e).__name__}
+    finally:
+        if host is not None:
+            host_limiter.release(host)
+
+    result = {"url": url, "status": response.status_code, "ok": response.status_code < 400, "method": method}
+    if response.history:
+        result["final_url"] = str(response.url)
+    return result
+
+
+async def _check_and_cache(url: str) -> Dict:
+    result = await check_link(url)
+    link_cache.put(url, result)
+    return result
+
+
+async def check_page_links(urls: List[str]) -> Dict:
+    """
+    Check up to LINK_CHECK_MAX_LINKS links concurrently. Results come from the
+    shared cache where possible; otherwise at most LINK_CHECK_CONCURRENCY checks
+    per page are in flight, host_limiter caps them per host, and a link checked
+    by two analyses at once is requested only once.
+    """
+    selected = urls[:LINK_CHECK_MAX_LINKS]
+    semaphore = asyncio.Semaphore(LINK_CHECK_CONCURRENCY)
+
+    async def check(url: str) -> Dict:
+        result = link_cache.get(url)
+        if result is not None:
+            return result
+        async with semaphore:
+            return await link_flights.run(url, _check_and_cache, url)
+
+    with timed("links"):
+        results = await asyncio.gather(*(check(url) for url in selected))
+    return {
+        "checked": len(results),
+        "skipped": len(urls) - len(selected),
+        "ok": sum(1 for result in results if result["ok"]),
+        "broken": sum(1 for result in results if not result["ok"]),
+        "invalid": sum(1 for result in results if result["status"] == "invalid"),
+        "redirected": sum(1 for result in results if "final_url" in result),
+        "results": results
+    }
+
+
+# Page weight: opt-in size probes of the images on an analyzed page
+IMAGE_AUDIT_MAX_URLS = int(os.environ.get("IMAGE_AUDIT_MAX_URLS", "300"))
+IMAGE_AUDIT_CONCURRENCY = int(os.environ.get("IMAGE_AUDIT_CONCURRENCY", "16"))
+IMAGE_AUDIT_BUDGET = float(os.environ.get("IMAGE_AUDIT_BUDGET", "3"))
+IMAGE_AUDIT_TOP = int(os.environ.get("IMAGE_AUDIT_TOP", "10"))
+IMAGE_LARGE_BYTES = int(os.environ.get("IMAGE_LARGE_BYTES", str(200 * 1024)))
+IMAGE_CACHE_TTL = float(os.environ.get("IMAGE_CACHE_TTL", "86400"))
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", "20000"))
+
+image_cache = ProbeCache(IMAGE_CACHE_MAX_ENTRIES, IMAGE_CACHE_TTL, LINK_CACHE_ERROR_TTL)
+image_flights = SingleFlight()
+
+
+def _content_length(response: httpx.Response) -> Optional[int]:
+    if response.status_code == 206:
+        # Content-Range: bytes 0-0/12345
+        total = response.headers.get("content-range", "").rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("content-length")
+    return int(length) if response.status_code < 300 and length and length.isdigit() else None
+
+
+async def probe_image(url: str) -> Dict:
+    """
+    Size of one image without downloading it: Content-Length of a HEAD, or
+    when that is missing, refused or the HEAD fails, the total in
+    Content-Range of a one-byte GET
+    """
+    client = get_http_client()
+    host = None
+    try:
+        host = await host_limiter.acquire(url)
+        try:
+            response = await client.head(url, timeout=LINK_CHECK_TIMEOUT)
+            size = _content_length(response)
+        except httpx.TransportError:
+            size = None
+        if size is None:
+            # Leaving the block closes the body unread if the server ignored the range
+            async with client.stream("GET", url, headers={"Range": "bytes=0-0"}, timeout=LINK_CHECK_TIMEOUT) as response:
+                size = _content_length(response)
+    except (httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError) as e:
+        return _invalid_url_result(url, e, bytes=None)
+    except httpx.HTTPError as e:
+        return {"url": url, "status": None, "bytes": None, "error": str(e) or type(e).__name__}
+    finally:
+        if host is not None:
+            host_limiter.release(host)
+
+    return {
+        "url": url,
+        "status": response.status_code,
+        "bytes": size,
+        "content_type": response.headers.get("content-type")
+    }
+
+
+async def _probe_and_cache(url: str) -> Dict:
+    result = await probe_image(url)
+    image_cache.put(url, result)
+    return result
+
+
+async def audit_page_images(images: List[Tuple[bool, List[str]]]) -> Dict:
+    """
+    Page weight of a page's images. Each image's src (or first srcset URL,
+    what a browser loads by default) is probed first, then the other srcset
+    candidates, from the shared cache where possible and at most
+    IMAGE_AUDIT_CONCURRENCY at a time. Whatever is unanswered after
+    IMAGE_AUDIT_BUDGET seconds is reported as `pending` rather than waited for.
+    Probes already sent finish in the background (image_flights shields them)
+    and fill the cache for next time; probes still queued are cancelled.
+    """
+    primary = list(dict.fromkeys(urls[0] for _, urls in images))
+    candidates = list(dict.fromkeys(url for _, urls in images for url in urls[1:] if url not in primary))
+    selected = (primary + candidates)[:IMAGE_AUDIT_MAX_URLS]
+    semaphore = asyncio.Semaphore(IMAGE_AUDIT_CONCURRENCY)
+
+    async def probe(url: str) -> Dict:
+        result = image_cache.get(url)
+        if result is not None:
+            return result
+        async with semaphore:
+            return await image_flights.run(url, _probe_and_cache, url)
+
+    results = {}
+    with timed("images"):
+        tasks = {asyncio.ensure_future(probe(url)): url for url in selected}
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=IMAGE_AUDIT_BUDGET)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    results[tasks[task]] = task.result()
+
+    sized = [result for result in results.values() if result["bytes"] is not None]
+    largest = heapq.nlargest(IMAGE_AUDIT_TOP, sized, key=lambda result: result["bytes"])
+    missing_dimensions = list(dict.fromkeys(urls[0] for has_size, urls in images if not has_size))
+    return {
+        "images": len(images),
+        "probed": len(results),
+        "pending": len(selected) - len(results),
+        "skipped": len(primary) + len(candidates) - len(selected),
+        "unknown_size": len(results) - len(sized),
+        # What the page costs with default (src) images, each distinct URL once
+        "total_bytes": sum(results[url]["bytes"] or 0 for url in primary if url in results),
+        "large": sum(1 for result in sized if result["bytes"] >= IMAGE_LARGE_BYTES),
+        "largest": [
+            {"url": result["url"], "bytes": result["bytes"], "content_type": result["content_type"]}
+            for result in largest
+        ],
+        "missing_dimensions": len(missing_dimensions),
+        "missing_dimensions_urls": missing_dimensions[:IMAGE_AUDIT_TOP]
+    }
+
+
+def clean_url(url: str) -> str:
+    # Clean and validate URL
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+analysis_flights = SingleFlight()
+
+
+async def analyze_url(url: str, mode: str = "full", business_context: Dict = None, lane: str = "interactive",
+                      check_links: bool = False, audit_images: bool = False,
+                      clusters: Optional["TemplateClusters"] = None) -> Dict:
+    """
+    Full API pipeline for one URL: extraction followed by Groq recommendations
+    (rule-based ones in mode "fast"), and optionally the status of every link
+    and the weight of every image on the page. With clusters, pages sharing a
+    template share one LLM call. Identical concurrent requests are coalesced:
+    the key holds everything that shapes the result, down to the URL as given
+    (it is echoed back in seo_data), while fetches of the same page are
+    shared by the cache below whatever the spelling of its URL.
+    """
+    key = (url, mode, json.dumps(business_context, sort_keys=True) if business_context else None,
+           lane, check_links, audit_images, id(clusters) if clusters is not None else None)
+    return await analysis_flights.run(key, _analyze_url, url, mode, business_context, lane, check_links, audit_images, clusters)
+
+
+async def _analyze_url(url: str, mode: str, business_context: Optional[Dict], lane: str,
+                       check_links: bool, audit_images: bool, clusters: Optional["TemplateClusters"]) -> Dict:
+    # Perform SEO analysis
+    page = await analyze_page_async(url, mode)
+
+    if isinstance(page, dict):
+        return {"error": page["error"]}
+
+    checks = {}
+    if check_links:
+        checks["link_health"] = check_page_links(page.link_list())
+    if audit_images:
+        checks["page_weight"] = audit_page_images(page.image_list())
+    if not checks:
+        return await _recommend(url, mode, page.as_dict(url), business_context, lane, clusters)
+
+    # The checks run while the recommendations are generated
+    result, *reports = await asyncio.gather(
+        _recommend(url, mode, page.as_dict(url), business_context, lane, clusters),
+        *checks.values()
+    )
+    result.update(zip(checks, reports))
+    return result
+
+
+async def _recommend(url: str, mode: str, seo_data: Dict, business_context: Optional[Dict], lane: str,
+                     clusters: Optional["TemplateClusters"] = None) -> Dict:
+    if mode == "fast":
+        with timed("rules"):
+            recommendations = await rules_executor.run(rule_recommendations, seo_data, business_context)
+        return {
+            "seo_data": seo_data,
+            "recommendations": recommendations["recommendations"],
+            "fastmcp_context": recommendations["fastmcp_context"],
+            "usage": None
+        }
+
+    # An unchanged page keeps the recommendations of its latest snapshot
+    digest = content_hash(seo_data)
+    context = context_key(business_context)
+    latest = await asyncio.to_thread(history_store.latest, url, mode, context)
+    if latest is not None and latest["content_hash"] == digest:
+        await asyncio.to_thread(history_store.touch, latest["id"])
+        return {
+            "seo_data": seo_data,
+            "recommendations": latest["recommendations"],
+            "fastmcp_context": latest["fastmcp_context"],
+            "usage": None,
+            "snapshot_id": latest["id"],
+            "unchanged_since": latest["created_at"]
+        }
+
+    # Get FastMCP-enhanced recommendations
+    if clusters is not None:
+        recommendations = await clusters.recommend(seo_data)
+    else:
+        executor = groq_executor if lane == "interactive" else groq_batch_executor
+        recommendations = await executor.run(get_groq_recommendations, seo_data, business_context, lane)
+
+    result = {
+        "seo_data": seo_data,
+        "recommendations": recommendations.get("recommendations", []),
+        "fastmcp_context": recommendations.get("fastmcp_context", {}),
+        "usage": recommendations.get("usage")
+    }
+    # Failed or fallback completions are not worth pinning to this version of the page
+    if "usage" in recommendations and not recommendations.get("fallback"):
+        result["snapshot_id"] = await asyncio.to_thread(
+            history_store.record, url, mode, context, digest, seo_data, recommendations
+        )
+    return result
+
+
+# Template clustering: pages of one batch or crawl that share a template share one LLM call
+metrics.counter("seo_template_cluster_pages_total", "Batch and crawl pages that made a cluster's LLM call or reused one")
+
+
+def template_signature(seo_data: Dict, analysis: Dict, business_context: Optional[Dict] = None) -> str:
+    """
+    Fingerprint of what a page's recommendations depend on: content type,
+    the title, description, heading and URL issues the analyzers found, and
+    which technical tags are present. Pages generated from one template
+    share it even though their titles, text and keywords differ; the top
+    keyword is swapped in by personalize_recommendations instead.
+    """
+    meta, headings = analysis["meta_analysis"], analysis["heading_analysis"]
+    parts = [
+        analysis["content_context"]["content_type"],
+        meta["title"]["status"],
+        meta["description"]["status"],
+        sorted(meta["url_structure"]["issues"]),
+        min(headings["h1_count"], 2),
+        headings["h2_count"] > 0,
+        headings["h3_count"] > headings["h2_count"] * 3,
+        bool(seo_data.get("canonical")),
+        seo_data.get("robots"),
+        bool(seo_data.get("open_graph", {}).get("title")),
+        bool(seo_data.get("twitter_card", {}).get("card")),
+        bool(seo_data.get("structured_data")),
+        seo_data.get("images", {}).get("without_alt", 0) > 0,
+        context_key(business_context)
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()[:16]
+
+
+def page_specifics(seo_data: Dict, analysis: Dict) -> Dict[str, str]:
+    """
+    The page-specific strings a recommendation may quote, for personalize_recommendations
+    """
+    title = seo_data.get("title", {}).get("content") or ''
+    description = seo_data.get("meta_description") or ''
+    h1 = seo_data.get("headings", {}).get("h1") or ['']
+    keywords = analysis["content_context"]["keywords"] or ['']
+    return {
+        "url": seo_data.get("url") or '',
+        "title": title,
+        "description": description,
+        "h1": h1[0],
+        "keyword": keywords[0],
+        "title_length": str(len(title)),
+        "description_length": str(len(description))
+    }
+
+
+def personalize_recommendations(recommendations: List[Dict], source: Dict[str, str], target: Dict[str, str]) -> List[Dict]:
+    """
+    Copy a cluster's recommendations for another page of the template,
+    replacing the URL, title, description, H1, lengths and top keyword the
+    LLM quoted from the page it saw with the target page's own
+    """
+    replacements = {}
+    for key in ("url", "title", "description", "h1"):
+        # Very short values would match inside unrelated words
+        if len(source[key]) >= 4 and source[key] != target[key]:
+            replacements[source[key]] = target[key]
+    lengths = {}
+    for key in ("title_length", "description_length"):
+        if source[key] != target[key]:
+            for unit in ("chars", "characters"):
+                lengths.setdefault(f"{source[key]} {unit}", []).append(f"{target[key]} {unit}")
+    # A length shared by the title and description is ambiguous and left alone
+    replacements.update({text: targets[0] for text, targets in lengths.items() if len(targets) == 1})
+    # The prompt's examples are written around the top keyword, as is and in title case
+    words = set()
+    if source["keyword"] and target["keyword"] and source["keyword"] != target["keyword"]:
+        for text, replacement in ((source["keyword"], target["keyword"]), (source["keyword"].title(), target["keyword"].title())):
+            replacements.setdefault(text, replacement)
+            words.add(text)
+    pieces = [rf'\b{re.escape(text)}\b' if text in words else re.escape(text)
+              for text in sorted(replacements, key=len, reverse=True)]
+    pattern = re.compile('|'.join(pieces)) if pieces else None
+
+    # Rebuilds every list and dict, so pages never share the leader's objects
+    def substitute(value):
+        if isinstance(value, str):
+            return pattern.sub(lambda match: replacements[match.group(0)], value) if pattern else value
+        if isinstance(value, list):
+            return [substitute(item) for item in value]
+        if isinstance(value, dict):
+            return {key: substitute(item) for key, item in value.items()}
+        return value
+
+    return substitute(recommendations)
+
+
+class TemplateClusters:
+    """
+    Recommendations shared between the pages of one batch or crawl that have
+    the same template_signature. The first page of each cluster makes the
+    LLM call; pages arriving while it runs wait for it, and every other page
+    gets a copy personalized with its own URL, title, description, H1 and
+    top keyword. The analyzers run once per page, off the event loop, and
+    the leader's prompt is built from that same analysis.
+    A cluster whose call failed is forgotten, and the pages waiting on it
+    make their own call instead (the first of them leading the cluster anew).
+    """
+
+    def __init__(self, business_context: Optional[Dict] = None):
+        self.business_context = business_context
+        self._clusters: Dict[str, Tuple[asyncio.Future, Dict[str, str]]] = {}
+        self.stats = {
+            "clusters": 0,
+            "llm_calls": 0,
+            "shared": 0
+        }
+
+    async def recommend(self, seo_data: Dict) -> Dict:
+        with timed("context"):
+            analysis = await rules_executor.run(run_fastmcp_analyzers, seo_data)
+        signature = template_signature(seo_data, analysis, self.business_context)
+        cluster = self._clusters.get(signature)
+        while cluster is not None:
+            task, source = cluster
+            started = time.monotonic()
+            try:
+                leader = await asyncio.shield(task)
+            except Exception:
+                leader = None
+            if leader is not None and "usage" in leader and not leader.get("fallback"):
+                return self._share(seo_data, analysis, signature, leader, source, started)
+            self._forget(signature, task)
+            cluster = self._clusters.get(signature)
+
+        task = asyncio.ensure_future(
+            groq_batch_executor.run(get_groq_recommendations, seo_data, self.business_context, "batch", analysis)
+        )
+        self._clusters[signature] = (task, page_specifics(seo_data, analysis))
+        self.stats["clusters"] += 1
+        self.stats["llm_calls"] += 1
+        metrics.inc("seo_template_cluster_pages_total", role="leader")
+        try:
+            recommendations = await asyncio.shield(task)
+        except BaseException:
+            self._forget(signature, task)
+            raise
+        if "usage" not in recommendations or recommendations.get("fallback"):
+            self._forget(signature, task)
+        elif recommendations["usage"] is not None:
+            recommendations["usage"] = dict(recommendations["usage"], cluster=signature)
+        return recommendations
+
+    def _share(self, seo_data: Dict, analysis: Dict, signature: str, leader: Dict, source: Dict[str, str], started: float) -> Dict:
+        self.stats["shared"] += 1
+        metrics.inc("seo_template_cluster_pages_total", role="member")
+        result = {
+            "recommendations": personalize_recommendations(leader.get("recommendations", []), source, page_specifics(seo_data, analysis)),
+            "fastmcp_context": analysis["fastmcp_context"],
+            "usage": {
+                "cluster": signature,
+                "shared_from": source["url"],
+                "prompt_tokens": None,
+                "completion_tokens": None,
+                "latency_ms": round((time.monotonic() - started) * 1000, 1)
+            }
+        }
+        return result
+
+    def _forget(self, signature: str, task: asyncio.Future):
+        if self._clusters.get(signature, (None,))[0] is task:
+            del self._clusters[signature]
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats)
+
+
+# Batch analysis settings
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", "5000"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_HOST_INTERVAL = float(os.environ.get("BATCH_HOST_INTERVAL", "1.0"))
+# Pages analyzed at once across every batch and crawl in the process
+BULK_CONCURRENCY = int(os.environ.get("BULK_CONCURRENCY", "16"))
+
+
+class HostRateLimiter:
+    """
+    Space out request starts to the same host by a minimum interval
+    """
+
+    def __init__(self):
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str, interval: float):
+        if interval <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + interval
+        if len(self._next_slot) > 1024:
+            # Forget hosts whose reservations have all passed
+            for stale in [h for h, t in self._next_slot.items() if t < now]:
+                del self._next_slot[stale]
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BulkLimits:
+    """
+    Limits shared by every batch and crawl: pages in flight at once, and the
+    spacing of request starts per host. A request's own concurrency only sets
+    how many workers it runs, so parallel batches and crawls cannot multiply
+    the total load or the load on one host.
+    """
+
+    def __init__(self, concurrency: int):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.rate_limiter = HostRateLimiter()
+
 
-    return examples[:3]
+# Created by the app's lifespan, or on first use outside it
+_bulk_limits: Optional[BulkLimits] = None
 
 
-def get_groq_recommendations(seo_data: Dict, business_context: Dict = None) -> Dict:
+def get_bulk_limits() -> BulkLimits:
+    global _bulk_limits
+    if _bulk_limits is None:
+        _bulk_limits = BulkLimits(BULK_CONCURRENCY)
+    return _bulk_limits
+
+
+async def stream_batch_analysis(urls: List[str], mode: str, concurrency: int, host_interval: float, cluster: bool = True):
     """
-    Generate SEO recommendations using Groq API with FastMCP-enhanced context and business goals
+    Analyze URLs with a fixed pool of workers and yield one NDJSON line per
+    result as soon as it is ready. With cluster, pages sharing a template
+    share one LLM call.
     """
+    pending = iter(enumerate(urls))
+    results = asyncio.Queue(maxsize=concurrency)
+    limits = get_bulk_limits()
+    clusters = TemplateClusters() if cluster and mode != "fast" else None
+
+    async def worker():
+        for index, url in pending:
+            async with limits.slots:
+                await limits.rate_limiter.wait(url, host_interval)
+                try:
+                    result = await analyze_url(url, mode, lane="batch", clusters=clusters)
+                except Exception as e:
+                    result = {"error": f"Error analyzing website: {str(e)}"}
+            await results.put(dict(result, url=url, index=index))
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(urls)))]
     try:
-        # Extract website content for context
-        content_text = seo_data.get('content', {}).get('text', '')
+        for _ in range(len(urls)):
+            result = await results.get()
+            yield json.dumps(result) + "\n"
+    finally:
+        for task in workers:
+            task.cancel()
 
-        # Use FastMCP to analyze content context
-        content_context = analyze_content_context(content_text, max_length=2000)
 
-        # Use FastMCP to analyze heading structure
-        heading_analysis = analyze_heading_structure(seo_data.get('headings', {}))
+# Site crawler settings
+CRAWL_MAX_PAGES = int(os.environ.get("CRAWL_MAX_PAGES", "500"))
+CRAWL_MAX_DEPTH = int(os.environ.get("CRAWL_MAX_DEPTH", "5"))
+CRAWL_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "4"))
+CRAWL_HOST_INTERVAL = float(os.environ.get("CRAWL_HOST_INTERVAL", "0.5"))
 
-        # Use FastMCP to analyze meta quality
-        meta_analysis = analyze_meta_quality(
-            seo_data.get('title', {}).get('content', ''),
-            seo_data.get('meta_description', ''),
-            seo_data.get('url', '')
-        )
+# Links to these files are not HTML pages and are never queued
+CRAWL_SKIP_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.pdf', '.zip', '.gz',
+    '.mp3', '.mp4', '.avi', '.mov', '.css', '.js', '.xml', '.json', '.doc', '.docx', '.xls', '.xlsx'
+)
 
-        # Build enhanced context with FastMCP insights
-        context = f"""
-        Website URL: {seo_data.get('url', 'Unknown')}
-
-        FASTMCP CONTENT ANALYSIS:
-        - Content Type: {content_context['content_type']}
-        - Top Keywords: {', '.join(content_context['keywords'][:5])}
-        - Word Count: {content_context['word_count']}
-        - Content Preview: {content_context['preview']}
-
-        TITLE ANALYSIS (FastMCP Enhanced):
-        - Current Title: {seo_data.get('title', {}).get('content', 'MISSING')}
-        - Length: {seo_data.get('title', {}).get('length', 0)} characters
-        - Status: {meta_analysis['title'].get('status', 'unknown')}
-        - Issue: {meta_analysis['title'].get('issue', 'N/A')}
-        - Score: {meta_analysis['title'].get('score', 0)}/100
-
-        META DESCRIPTION (FastMCP Enhanced):
-        - Current: {seo_data.get('meta_description', 'MISSING')}
-        - Length: {len(seo_data.get('meta_description', ''))} characters
-        - Status: {meta_analysis['description'].get('status', 'unknown')}
-        - Issue: {meta_analysis['description'].get('issue', 'N/A')}
-        - Score: {meta_analysis['description'].get('score', 0)}/100
-
-        HEADING STRUCTURE (FastMCP Analysis):
-        - H1 Tags: {heading_analysis['h1_count']} found
-        - H2 Tags: {heading_analysis['h2_count']} found
-        - H3 Tags: {heading_analysis['h3_count']} found
-        - H1 Content: {', '.join(seo_data.get('headings', {}).get('h1', [])) or 'NONE'}
-        - Hierarchy Score: {heading_analysis['hierarchy_score']}/100
-        - Issues: {', '.join(heading_analysis['issues']) if heading_analysis['issues'] else 'None'}
-
-        IMAGES:
-        - Total Images: {seo_data.get('images', {}).get('total', 0)}
-        - Without ALT tags: {seo_data.get('images', {}).get('without_alt', 0)}
-
-        LINKS:
-        - Total: {seo_data.get('links', {}).get('total', 0)}
-        - Internal: {seo_data.get('links', {}).get('internal', 0)}
-        - External: {seo_data.get('links', {}).get('external', 0)}
-
-        TECHNICAL SEO:
-        - Canonical URL: {'Present' if seo_data.get('canonical') else 'MISSING'}
-        - Robots Meta: {seo_data.get('robots', 'MISSING')}
-        - Open Graph Tags: {'Present' if seo_data.get('open_graph', {}).get('title') else 'MISSING'}
-        - Twitter Card: {'Present' if seo_data.get('twitter_card', {}).get('card') else 'MISSING'}
-        - Structured Data: {len(seo_data.get('structured_data', []))} schemas found
-        - URL Structure Score: {meta_analysis['url_structure']['score']}/100
-        """
-
-        # Generate contextual examples using FastMCP
-        title_examples = generate_contextual_examples(content_context, "title")
-        desc_examples = generate_contextual_examples(content_context, "meta_description")
-        h1_examples = generate_contextual_examples(content_context, "h1")
-
-        # Prepare enhanced prompt with FastMCP context
-        prompt = f"""
-        You are an expert SEO consultant with FastMCP-enhanced context analysis.
-
-        {context}
-
-        FASTMCP has already generated contextual examples based on deep content analysis:
-        - Title Examples: {json.dumps(title_examples)}
-        - Description Examples: {json.dumps(desc_examples)}
-        - H1 Examples: {json.dumps(h1_examples)}
-
-        CRITICAL INSTRUCTIONS:
-        1. Use the FastMCP content analysis to understand the website's topic and type
-        2. Leverage the pre-generated contextual examples as reference
-        3. Provide SPECIFIC recommendations based on FastMCP analysis scores
-        4. For each recommendation, provide MINIMUM 3 DIFFERENT EXAMPLES
-        5. Examples must be realistic and based on the content type: {content_context['content_type']}
-        6. Prioritize issues by severity using FastMCP scores
-
-        For each issue found, provide:
-        - parameter: The SEO element that needs improvement
-        - issue: What's wrong (be specific with FastMCP scores and context)
-        - recommendation: Detailed, actionable advice based on content type and keywords
-        - examples: Array of at least 3 realistic examples (use FastMCP examples as inspiration)
-        - priority: critical/high/medium/low (based on FastMCP scores)
-
-        Return ONLY valid JSON in this exact format:
-        {{
-            "recommendations": [
-                {{
-                    "parameter": "Title Tag",
-                    "issue": "specific issue with FastMCP score",
-                    "recommendation": "specific actionable advice for {content_context['content_type']} site",
-                    "examples": [
-                        "First example based on content type and keywords",
-                        "Second example with different approach",
-                        "Third example emphasizing different aspect"
-                    ],
-                    "priority": "high"
-                }}
-            ]
-        }}
 
-        Focus on the most impactful issues first (use FastMCP scores). Maximum 10 recommendations.
-        Each recommendation MUST have at least 3 different examples tailored to the content type.
-        """
+async def fetch_robots(seed_url: str) -> RobotFileParser:
+    """
+    Load robots.txt for the seed's host. A missing file allows everything,
+    an authorization error disallows everything.
+    """
+    parsed = urlparse(seed_url)
+    robots = RobotFileParser(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+    try:
+        response = await get_http_client().get(robots.url)
+    except httpx.HTTPError:
+        robots.allow_all = True
+        return robots
 
-        # Call Groq API with FastMCP-enhanced parameters
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert SEO consultant with FastMCP-enhanced context analysis. You have access to detailed content analysis showing this is a {content_context['content_type']} website about {', '.join(content_context['keywords'][:3])}. Provide specific, actionable recommendations based on this context."
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=3072,  # Increased for more detailed recommendations
-        )
+    if response.status_code in (401, 403):
+        robots.disallow_all = True
+    elif response.status_code >= 400:
+        robots.allow_all = True
+    else:
+        robots.parse(response.text.splitlines())
+    return robots
+
+
+def crawlable_link(href: str, page_url: str, site: str) -> Optional[str]:
+    """
+    Resolve an href against its page and return it if it is an HTML page on
+    the same site (site being the site_host of the crawl's seed)
+    """
+    link = resolve_link(href, page_url) if href.strip() else None
+    if link is None or site_host(link) != site:
+        return None
+    try:
+        parsed = urlparse(link)
+    except ValueError:
+        return None
+    if parsed.path.lower().endswith(CRAWL_SKIP_EXTENSIONS):
+        return None
+    return link
+
+
+async def stream_site_crawl(
+    seed_url: str,
+    max_pages: int,
+    max_depth: int,
+    concurrency: int,
+    include_recommendations=False,
+    cluster: bool = True
+):
+    """
+    Breadth-first crawl of the seed's site. Every page goes through the same
+    extractor as a single analysis and is yielded as an NDJSON line.
+    include_recommendations is False, True (Groq) or "fast" (rule engine);
+    with cluster, Groq is asked once per template rather than once per page.
+    """
+    robots = await fetch_robots(seed_url)
+    # The site is settled by the seed's final URL, so a redirect from
+    # example.com to www.example.com (or to https) does not end the crawl
+    site = {"host": site_host(seed_url), "origin": _origin(seed_url)}
+    user_agent = HEADERS["User-Agent"]
+    crawl_delay = robots.crawl_delay(user_agent) or 0
+    host_interval = max(CRAWL_HOST_INTERVAL, float(crawl_delay))
+    limits = get_bulk_limits()
 
-        # Parse response
-        response_text = chat_completion.choices[0].message.content
+    frontier = asyncio.Queue()
+    results = asyncio.Queue()
+    seen = {normalize_url(seed_url)}
+    frontier.put_nowait((seed_url, 0))
+    stats = {"pages": 1, "blocked_by_robots": 0}
+    clusters = TemplateClusters() if include_recommendations is True and cluster else None
 
-        # Try to extract JSON response
+    def enqueue(url: str, depth: int):
+        key = normalize_url(url)
+        if key in seen or stats["pages"] >= max_pages:
+            return
+        seen.add(key)
+        if not robots.can_fetch(user_agent, url):
+            stats["blocked_by_robots"] += 1
+            return
+        stats["pages"] += 1
+        frontier.put_nowait((url, depth))
+
+    async def crawl_page(url: str, depth: int) -> Dict:
+        nonlocal robots
+        if not robots.can_fetch(user_agent, url):
+            stats["blocked_by_robots"] += 1
+            return {"url": url, "depth": depth, "error": "Blocked by robots.txt"}
+        await limits.rate_limiter.wait(url, host_interval)
         try:
-            json_match = re.search(r'({.*})', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(1)
-
-            recommendations = json.loads(response_text)
-
-            # Add FastMCP context to response
-            recommendations['fastmcp_context'] = {
-                'content_type': content_context.get('content_type', 'general'),
-                'keywords': content_context.get('keywords', [])[:5],
-                'heading_score': heading_analysis.get('hierarchy_score', 0),
-                'title_score': meta_analysis.get('title', {}).get('score', 0),
-                'description_score': meta_analysis.get('description', {}).get('score', 0)
-            }
+            html, _, final_url = await fetch_html(url)
+            if depth == 0 and _origin(final_url) != site["origin"]:
+                # The seed is crawled alone, before any other page is queued
+                site.update(host=site_host(final_url), origin=_origin(final_url))
+                robots = await fetch_robots(final_url)
+            # Links resolve against the page's final URL, as they do in a browser
+            seo_data, links = await parse_executor.run(parse_seo_html_with_links, html, final_url)
+        except Exception as e:
+            return {"url": url, "depth": depth, "error": str(e)}
+        seo_data["url"] = url
+        seen.add(normalize_url(final_url))
 
-            return recommendations
-        except json.JSONDecodeError:
-            # Fallback with FastMCP-generated examples
-            return {
-                "recommendations": [
-                    {
-                        "parameter": "Title Tag",
-                        "issue": f"Based on FastMCP analysis, your title needs improvement. Current score: {meta_analysis['title'].get('score', 0)}/100",
-                        "recommendation": f"Create a compelling title for your {content_context['content_type']} website focusing on: {', '.join(content_context['keywords'][:3])}",
-                        "examples": title_examples,
-                        "priority": "high"
-                    },
-                    {
-                        "parameter": "Meta Description",
-                        "issue": f"FastMCP analysis shows description issues. Score: {meta_analysis['description'].get('score', 0)}/100",
-                        "recommendation": f"Write an engaging description for your {content_context['content_type']} site",
-                        "examples": desc_examples,
-                        "priority": "high"
-                    }
-                ],
-                "fastmcp_context": {
-                    'content_type': content_context.get('content_type', 'general'),
-                    'keywords': content_context.get('keywords', [])[:5],
-                    'heading_score': heading_analysis.get('hierarchy_score', 0),
-                    'title_score': meta_analysis.get('title', {}).get('score', 0),
-                    'description_score': meta_analysis.get('description', {}).get('score', 0)
-                }
-            }
-    except Exception as e:
-        return {
-            "recommendations": [
-                {
-                    "parameter": "API Error",
-                    "issue": "Failed to generate recommendations with FastMCP",
-                    "recommendation": f"Error: {str(e)}. Please try again.",
-                    "examples": [
-                        "Check your API connection",
-                        "Verify FastMCP is properly configured",
-                        "Try analyzing the website again"
-                    ],
-                    "priority": "high"
-                }
-            ],
-            "fastmcp_context": {
-                'content_type': 'unknown',
-                'keywords': [],
-                'heading_score': 0,
-                'title_score': 0,
-                'description_score': 0
-            }
-        }
+        if depth < max_depth:
+            for href in links:
+                link = crawlable_link(href, final_url, site["host"])
+                if link:
+                    enqueue(link, depth + 1)
+
+        result = {"url": url, "depth": depth, "seo_data": seo_data}
+        if include_recommendations == "fast":
+            recommendations = await rules_executor.run(rule_recommendations, seo_data)
+            result["recommendations"] = recommendations["recommendations"]
+            result["fastmcp_context"] = recommendations["fastmcp_context"]
+        elif clusters is not None:
+            recommendations = await clusters.recommend(seo_data)
+            result["recommendations"] = recommendations.get("recommendations", [])
+            result["fastmcp_context"] = recommendations.get("fastmcp_context", {})
+            result["usage"] = recommendations.get("usage")
+        elif include_recommendations:
+            recommendations = await groq_batch_executor.run(get_groq_recommendations, seo_data, None, "batch")
+            result["recommendations"] = recommendations.get("recommendations", [])
+            result["fastmcp_context"] = recommendations.get("fastmcp_context", {})
+        return result
+
+    async def worker():
+        while True:
+            url, depth = await frontier.get()
+            async with limits.slots:
+                try:
+                    result = await crawl_page(url, depth)
+                except Exception as e:
+                    result = {"url": url, "depth": depth, "error": str(e)}
+            await results.put(result)
+            frontier.task_done()
+
+    async def finish():
+        await frontier.join()
+        await results.put(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    tasks.append(asyncio.create_task(finish()))
+    crawled = 0
+    try:
+        while True:
+            result = await results.get()
+            if result is None:
+                break
+            crawled += 1
+            yield json.dumps(result) + "\n"
+        summary = {"seed": seed_url, "pages": crawled, "blocked_by_robots": stats["blocked_by_robots"]}
+        if clusters is not None:
+            summary["clusters"] = clusters.snapshot()
+        yield json.dumps({"summary": summary}) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# Background job queue settings
+JOBS_DB_PATH = os.environ.get("JOBS_DB_PATH", "jobs.sqlite3")
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_QUEUE_LIMIT = int(os.environ.get("JOB_QUEUE_LIMIT", "1000"))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", str(24 * 3600)))
+
+
+class JobStore:
+    """
+    SQLite-backed record of analysis jobs, so queued work survives a restart
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        # One connection shared by the threads the queue runs store calls on
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, url TEXT NOT NULL, mode TEXT NOT NULL, business_context TEXT, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.commit()
+        return self._db
+
+    def create(self, url: str, mode: str, business_context: Optional[Dict]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "INSERT INTO jobs (id, url, mode, business_context, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, url, mode, json.dumps(business_context) if business_context else None, now, now)
+            )
+            db.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def set_status(self, job_id: str, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        payload = json.dumps(result) if result is not None else None
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, payload, error, time.time(), job_id)
+            )
+            db.commit()
+
+    def requeue_unfinished(self) -> List[str]:
+        """
+        Put jobs interrupted by a restart back in the queue and return all queued ids, oldest first
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            db.commit()
+            rows = db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self, older_than: float):
+        with self._lock:
+            db = self._connection()
+            db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - older_than,)
+            )
+            db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class JobQueue:
+    """
+    Fixed pool of asyncio workers draining jobs from the store. Store calls
+    run in threads, so a slow disk or a locked database never blocks the loop.
+    """
+
+    def __init__(self, store: JobStore, workers: int, queue_limit: int):
+        self.store = store
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        await asyncio.to_thread(self.store.prune, JOB_RETENTION)
+        for job_id in await asyncio.to_thread(self.store.requeue_unfinished):
+            self._queue.put_nowait(job_id)
+
+    async def submit(self, url: str, mode: str, business_context: Optional[Dict] = None) -> str:
+        await self.start()
+        if self._queue.qsize() >= self.queue_limit:
+            raise ExecutorSaturated("jobs")
+        job_id = await asyncio.to_thread(self.store.create, url, mode, business_context)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] != "queued":
+            return
+        await asyncio.to_thread(self.store.set_status, job_id, "running")
+        business_context = json.loads(job["business_context"]) if job["business_context"] else None
+
+        while True:
+            try:
+                result = await analyze_url(job["url"], job["mode"], business_context, lane="batch")
+                break
+            except ExecutorSaturated as e:
+                # Jobs wait for capacity instead of failing
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                error = f"Error analyzing website: {str(e)}"
+                await asyncio.to_thread(self.store.set_status, job_id, "failed", None, error)
+                return
 
+        if "error" in result:
+            await asyncio.to_thread(self.store.set_status, job_id, "failed", None, result["error"])
+        else:
+            await asyncio.to_thread(self.store.set_status, job_id, "done", result)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+
+job_store = JobStore(JOBS_DB_PATH)
+job_queue = JobQueue(job_store, JOB_WORKERS, JOB_QUEUE_LIMIT)
 
-def analyze_seo(url: str) -> Dict:
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_analysis_events(url: str, mode: str = "full", business_context: Dict = None):
     """
-    Analyze SEO for the given URL
+    Server-Sent Events for one analysis: seo_data and fastmcp_context as soon as
+    the page is parsed, each recommendation as Groq completes it, then done
     """
     try:
-        # Get HTML content from URL
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
+        seo_data = await analyze_seo_async(url, mode)
 
-        # Parse HTML using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if "error" in seo_data:
+            yield sse_event("error", {"error": seo_data["error"]})
+            return
 
-        # Collect SEO data
-        seo_data = {
-            "url": url,
-            "title": {
-                "content": soup.title.string if soup.title else None,
-                "length": len(soup.title.string) if soup.title and soup.title.string else 0
-            },
-            "meta_description": None,
-            "meta_keywords": None,
-            "headings": {
-                "h1": [],
-                "h2": [],
-                "h3": [],
-                "h4": [],
-                "h5": [],
-                "h6": []
-            },
-            "images": {
-                "total": 0,
-                "without_alt": 0,
-                "with_alt": 0
-            },
-            "links": {
-                "internal": 0,
-                "external": 0,
-                "total": 0
-            },
-            "content": {
-                "word_count": 0,
-                "text": ""
-            },
-            "open_graph": {
-                "title": None,
-                "description": None,
-                "image": None,
-                "url": None
-            },
-            "twitter_card": {
-                "card": None,
-                "title": None,
-                "description": None,
-                "image": None
-            },
-            "canonical": None,
-            "robots": None,
-            "structured_data": []
-        }
+        yield sse_event("seo_data", seo_data)
 
-        # Extract meta description and keywords
-        meta_description = soup.find('meta', attrs={'name': 'description'})
-        if meta_description:
-            seo_data["meta_description"] = meta_description.get('content', '')
+        if mode == "fast":
+            with timed("rules"):
+                recommendations = await rules_executor.run(rule_recommendations, seo_data, business_context)
+            yield sse_event("fastmcp_context", recommendations["fastmcp_context"])
+            for item in recommendations["recommendations"]:
+                yield sse_event("recommendation", item)
+            yield sse_event("done", recommendations)
+            return
 
-        meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-        if meta_keywords:
-            seo_data["meta_keywords"] = meta_keywords.get('content', '')
+        try:
+            with timed("context"):
+                # Keyword ranking and analyzers are CPU work, kept off the loop
+                groq_request = await asyncio.to_thread(build_groq_request, seo_data, business_context)
+        except Exception as e:
+            recommendations = error_recommendations(e)
+            yield sse_event("fastmcp_context", recommendations["fastmcp_context"])
+            yield sse_event("done", recommendations)
+            return
 
-        # Extract headings
-        for i in range(1, 7):
-            headings = soup.find_all(f'h{i}')
-            seo_data["headings"][f'h{i}'] = [h.get_text().strip() for h in headings]
+        yield sse_event("fastmcp_context", groq_request["fastmcp_context"])
 
-        # Image analysis
-        images = soup.find_all('img')
-        seo_data["images"]["total"] = len(images)
+        async for event, payload in stream_groq_recommendations(groq_request):
+            yield sse_event(event, payload)
 
-        for img in images:
-            if not img.get('alt') or img.get('alt') == '':
-                seo_data["images"]["without_alt"] += 1
+    except ExecutorSaturated as e:
+        yield sse_event("error", {"error": str(e)})
+    except Exception as e:
+        yield sse_event("error", {"error": f"Error analyzing website: {str(e)}"})
+
+
+def event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def business_context_error(
+        primary_goal: Optional[str],
+        target_customer: Optional[str],
+        price_position: Optional[str],
+        geographic_focus: Optional[str],
+        geographic_location: Optional[str],
+        desired_action: Optional[str]
+) -> Optional[str]:
+    # Validate business context - ALL fields are required
+    if not primary_goal or not target_customer or not price_position or not geographic_focus or not desired_action:
+        return "Please answer all 5 business context questions to get accurate SEO recommendations."
+
+    # If hyper-local or regional, location is also required
+    if geographic_focus in ['hyper_local', 'regional'] and not geographic_location:
+        return "Please enter your location/city for hyper-local or regional geographic focus."
+
+    return None
+
+
+def build_business_context(
+        primary_goal: Optional[str],
+        target_customer: Optional[str],
+        price_position: Optional[str],
+        geographic_focus: Optional[str],
+        geographic_location: Optional[str],
+        desired_action: Optional[str]
+) -> Dict:
+    return {
+        "primary_goal": primary_goal or "Not specified",
+        "target_customer": target_customer or "Not specified",
+        "price_position": price_position or "Not specified",
+        "geographic_focus": geographic_focus or "Not specified",
+        "geographic_location": geographic_location or "Not specified",
+        "desired_action": desired_action or "Not specified"
+    }
+
+
+# Response shaping for /api/analyze
+TEXT_MODES = ("full", "excerpt", "none")
+TEXT_EXCERPT_CHARS = int(os.environ.get("TEXT_EXCERPT_CHARS", "500"))
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "1024"))
+
+
+def shape_body_text(result: Dict, text_mode: str) -> Dict:
+    """
+    Replace seo_data.content.text with an excerpt (or nothing) without
+    touching the cached seo_data the result shares
+    """
+    seo_data = result.get("seo_data")
+    if text_mode == "full" or not seo_data or "content" not in seo_data:
+        return result
+    content = dict(seo_data["content"])
+    text = content.pop("text", '') or ''
+    if text_mode == "excerpt":
+        text = ' '.join(text.split())
+        content["truncated"] = len(text) > TEXT_EXCERPT_CHARS
+        if content["truncated"]:
+            text = text[:TEXT_EXCERPT_CHARS].rsplit(' ', 1)[0] + '...'
+        content["text"] = text
+    return dict(result, seo_data=dict(seo_data, content=content))
+
+
+def project_fields(result: Dict, fields: List[str]) -> Dict:
+    """
+    Keep only the dotted paths in fields (e.g. "seo_data.title"); an error is always kept
+    """
+    projected = {"error": result["error"]} if "error" in result else {}
+    for field in fields:
+        source, target = result, projected
+        parts = field.split('.')
+        for depth, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+            if depth == len(parts) - 1:
+                target[part] = source
+            elif target.get(part) is source:
+                # A shorter path already selected all of it
+                break
             else:
-                seo_data["images"]["with_alt"] += 1
+                target = target.setdefault(part, {})
+    return projected
 
-        # Link analysis
-        links = soup.find_all('a', href=True)
-        seo_data["links"]["total"] = len(links)
 
-        parsed_url = urlparse(url)
-        domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    encodings = []
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        encodings.append(name.strip())
+    return encodings
 
-        for link in links:
-            href = link['href']
-            if href.startswith('http'):
-                if domain in href:
-                    seo_data["links"]["internal"] += 1
-                else:
-                    seo_data["links"]["external"] += 1
-            elif href.startswith('/'):
-                seo_data["links"]["internal"] += 1
 
-        # Content analysis
-        if soup.body:
-            text = soup.body.get_text()
-            seo_data["content"]["text"] = text
-            seo_data["content"]["word_count"] = len(text.split())
+def compact_json_response(request: Request, content, status_code: int = 200) -> Response:
+    """
+    JSON encoded with orjson (json for integers it cannot hold) and compressed
+    with brotli or gzip when the client accepts it and the body is big enough
+    to be worth it
+    """
+    body = _dump_json(content)
+    headers = {"Vary": "Accept-Encoding"}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encodings = accepted_encodings(request.headers.get("accept-encoding", ''))
+        if brotli is not None and "br" in encodings:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
 
-        # Open Graph tags
-        og_title = soup.find('meta', property='og:title')
-        if og_title:
-            seo_data["open_graph"]["title"] = og_title.get('content', '')
 
-        og_description = soup.find('meta', property='og:description')
-        if og_description:
-            seo_data["open_graph"]["description"] = og_description.get('content', '')
+# Startup: the port opens as soon as the app is imported; heavy clients are
+# created lazily and warmed up in the background so the first request finds them ready
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "1") != "0"
+WARMUP_HTML = (
+    "<html><head><title>Warm-up</title><meta name='description' content='Warm-up page'></head>"
+    "<body><h1>Warm-up</h1><p>Warm-up page <a href='/'>home</a> <img src='a.png'></p></body></html>"
+)
 
-        og_image = soup.find('meta', property='og:image')
-        if og_image:
-            seo_data["open_graph"]["image"] = og_image.get('content', '')
+# Seconds spent importing the module and in each warm-up step
+startup_stats: Dict[str, float] = {}
+_warmup_task: Optional[asyncio.Task] = None
 
-        og_url = soup.find('meta', property='og:url')
-        if og_url:
-            seo_data["open_graph"]["url"] = og_url.get('content', '')
 
-        # Twitter Card tags
-        twitter_card = soup.find('meta', attrs={'name': 'twitter:card'})
-        if twitter_card:
-            seo_data["twitter_card"]["card"] = twitter_card.get('content', '')
+async def warm_up() -> Dict[str, float]:
+    """
+    Create the clients, parser workers and templates the first request would
+    otherwise pay for. Returns the seconds each step took.
+    """
+    steps = {}
 
-        twitter_title = soup.find('meta', attrs={'name': 'twitter:title'})
-        if twitter_title:
-            seo_data["twitter_card"]["title"] = twitter_title.get('content', '')
+    async def step(name: str, fn, *args):
+        started = time.perf_counter()
+        try:
+            await fn(*args)
+        except Exception:
+            # Not fatal: the first request creates whatever is missing
+            metrics.inc("seo_stage_errors_total", stage=f"warmup_{name}")
+        steps[name] = time.perf_counter() - started
 
-        twitter_description = soup.find('meta', attrs={'name': 'twitter:description'})
-        if twitter_description:
-            seo_data["twitter_card"]["description"] = twitter_description.get('content', '')
+    async def http_client():
+        get_http_client()
 
-        twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-        if twitter_image:
-            seo_data["twitter_card"]["image"] = twitter_image.get('content', '')
+    async def groq_client():
+        await groq_executor.run(get_groq_client)
 
-        # Canonical link
-        canonical = soup.find('link', rel='canonical')
-        if canonical:
-            seo_data["canonical"] = canonical.get('href', '')
+    async def parser():
+        # Starts the parse workers (processes are forked on first use)
+        await parse_executor.run(parse_seo_html, WARMUP_HTML, "https://warmup.invalid/")
 
-        # Robots meta tag
-        robots = soup.find('meta', attrs={'name': 'robots'})
-        if robots:
-            seo_data["robots"] = robots.get('content', '')
+    async def templates():
+        environment = get_templates().env
+        for name in environment.list_templates():
+            environment.get_template(name)
 
-        # Structured data (JSON-LD)
-        scripts = soup.find_all('script', type='application/ld+json')
-        for script in scripts:
-            try:
-                data = json.loads(script.string)
-                seo_data["structured_data"].append(data)
-            except:
-                pass
+    await step("http_client", http_client)
+    await step("groq_client", groq_client)
+    await step("parser", parser)
+    await step("templates", templates)
+    startup_stats.update({f"warmup_{name}": seconds for name, seconds in steps.items()})
+    return steps
 
-        return seo_data
 
-    except Exception as e:
-        return {"error": str(e)}
+async def start_up():
+    """
+    Run by the app's lifespan before the first request
+    """
+    global _warmup_task, _bulk_limits
+    _bulk_limits = BulkLimits(BULK_CONCURRENCY)
+    os.makedirs("static", exist_ok=True)
+    os.makedirs("templates", exist_ok=True)
+    # Resume jobs that were queued or running when the server last stopped
+    await job_queue.start()
+    if WARMUP_ON_STARTUP:
+        _warmup_task = asyncio.create_task(warm_up())
+
+
+async def shut_down():
+    """
+    Run by the app's lifespan once the server stops taking requests
+    """
+    global _bulk_limits
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+    await job_queue.stop()
+    await close_http_client()
+    _bulk_limits = None
+    groq_scheduler.close()
+    llm_router.close()
+    groq_executor.shutdown()
+    groq_batch_executor.shutdown()
+    parse_executor.shutdown()
+    rules_executor.shutdown()
+    llm_cache.close()
+    job_store.close()
+    history_store.close()
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    headers = {"Retry-After": str(exc.retry_after)}
+    if request.url.path.startswith("/api/"):
+        return JSONResponse({"error": str(exc)}, status_code=503, headers=headers)
+    return get_templates().TemplateResponse(
+        "index.html",
+        {"request": request, "error": str(exc)},
+        status_code=503,
+        headers=headers
+    )
+
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    timings = {}
+    request_timings.set(timings)
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed * 1000)
+    route = request.scope.get("route")
+    metrics.observe(
+        "seo_http_request_duration_seconds",
+        elapsed,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code
+    )
+    return response
 
-# Templates are managed separately in templates/ folder
-# No need to create them programmatically
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(collected_metrics()), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_templates().TemplateResponse("index.html", {"request": request})
 
 
 @app.post("/analyze", response_class=HTMLResponse)
@@ -714,98 +4703,304 @@ async def analyze_website(
         price_position: str = Form(None),
         geographic_focus: str = Form(None),
         geographic_location: str = Form(None),
-        desired_action: str = Form(None)
+        desired_action: str = Form(None),
+        mode: str = Form("full")
 ):
-    # Clean and validate URL
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    url = clean_url(url)
 
-    # Validate business context - ALL fields are required
-    if not primary_goal or not target_customer or not price_position or not geographic_focus or not desired_action:
-        return templates.TemplateResponse(
+    error = business_context_error(
+        primary_goal, target_customer, price_position, geographic_focus, geographic_location, desired_action
+    )
+    if mode not in ANALYSIS_MODES:
+        error = f"mode must be one of: {', '.join(ANALYSIS_MODES)}"
+    if error:
+        return get_templates().TemplateResponse(
             "index.html",
-            {"request": request,
-             "error": "Please answer all 5 business context questions to get accurate SEO recommendations."}
+            {"request": request, "error": error}
         )
 
-    # If hyper-local or regional, location is also required
-    if geographic_focus in ['hyper_local', 'regional'] and not geographic_location:
-        return templates.TemplateResponse(
-            "index.html",
-            {"request": request,
-             "error": "Please enter your location/city for hyper-local or regional geographic focus."}
+    try:
+        # Prepare business context
+        business_context = build_business_context(
+            primary_goal, target_customer, price_position, geographic_focus, geographic_location, desired_action
         )
 
-    try:
-        # Perform SEO analysis
-        seo_data = analyze_seo(url)
+        # SEO analysis plus FastMCP-enhanced recommendations from Groq API with business context
+        analysis = await analyze_url(url, mode, business_context)
 
-        if "error" in seo_data:
-            return templates.TemplateResponse(
+        if "error" in analysis:
+            return get_templates().TemplateResponse(
                 "index.html",
-                {"request": request, "error": seo_data["error"]}
+                {"request": request, "error": analysis["error"]}
             )
 
-        # Prepare business context
-        business_context = {
-            "primary_goal": primary_goal or "Not specified",
-            "target_customer": target_customer or "Not specified",
-            "price_position": price_position or "Not specified",
-            "geographic_focus": geographic_focus or "Not specified",
-            "geographic_location": geographic_location or "Not specified",
-            "desired_action": desired_action or "Not specified"
-        }
-
-        # Get FastMCP-enhanced recommendations from Groq API with business context
-        recommendations = get_groq_recommendations(seo_data, business_context)
-
-        return templates.TemplateResponse(
-            "results.html",
-            {
-                "request": request,
-                "seo_data": seo_data,
-                "recommendations": recommendations.get("recommendations", []),
-                "fastmcp_context": recommendations.get("fastmcp_context", {})
-            }
-        )
+        with timed("render"):
+            return get_templates().TemplateResponse(
+                "results.html",
+                {
+                    "request": request,
+                    "seo_data": analysis["seo_data"],
+                    "recommendations": analysis["recommendations"],
+                    "fastmcp_context": analysis["fastmcp_context"]
+                }
+            )
 
+    except ExecutorSaturated:
+        raise
     except Exception as e:
-        return templates.TemplateResponse(
+        return get_templates().TemplateResponse(
             "index.html",
             {"request": request, "error": f"Error analyzing website: {str(e)}"}
         )
 
 
+@app.post("/analyze/stream")
+async def analyze_website_stream(
+        url: str = Form(...),
+        # Business Context Fields
+        primary_goal: str = Form(None),
+        target_customer: str = Form(None),
+        price_position: str = Form(None),
+        geographic_focus: str = Form(None),
+        geographic_location: str = Form(None),
+        desired_action: str = Form(None),
+        mode: str = Form("full")
+):
+    fields = (primary_goal, target_customer, price_position, geographic_focus, geographic_location, desired_action)
+    error = business_context_error(*fields)
+    if mode not in ANALYSIS_MODES:
+        error = f"mode must be one of: {', '.join(ANALYSIS_MODES)}"
+
+    async def events():
+        if error:
+            yield sse_event("error", {"error": error})
+            return
+        async for event in stream_analysis_events(clean_url(url), mode, build_business_context(*fields)):
+            yield event
+
+    return event_stream_response(events())
+
+
+@app.get("/api/cache/stats", response_class=JSONResponse)
+async def api_cache_stats():
+    return {
+        "seo": seo_cache.snapshot(),
+        "llm": llm_cache.snapshot(),
+        "links": link_cache.snapshot(),
+        "images": image_cache.snapshot(),
+        "keywords": keyword_corpus.snapshot(),
+        "single_flight": {
+            "seo": seo_flights.snapshot(),
+            "analysis": analysis_flights.snapshot(),
+            "links": link_flights.snapshot(),
+            "images": image_flights.snapshot()
+        }
+    }
+
+
 @app.post("/api/analyze", response_class=JSONResponse)
 async def api_analyze_website(request: Request):
     data = await request.json()
     url = data.get("url")
+    mode = data.get("mode", "full")
+    text_mode = data.get("text", "full")
+    check_links = data.get("check_links", False)
+    audit_images = data.get("audit_images", False)
+    fields = data.get("fields", request.query_params.get("fields"))
 
     if not url:
         raise HTTPException(status_code=400, detail="URL is required")
 
-    # Clean and validate URL
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
 
-    try:
-        # Perform SEO analysis
-        seo_data = analyze_seo(url)
+    if text_mode not in TEXT_MODES:
+        raise HTTPException(status_code=400, detail=f"text must be one of: {', '.join(TEXT_MODES)}")
 
-        if "error" in seo_data:
-            return {"error": seo_data["error"]}
+    for name, value in (("check_links", check_links), ("audit_images", audit_images)):
+        if not isinstance(value, bool):
+            raise HTTPException(status_code=400, detail=f"{name} must be true or false")
+        if value and mode == "head":
+            raise HTTPException(status_code=400, detail=f"{name} needs mode full or fast; head mode does not read the body")
 
-        # Get FastMCP-enhanced recommendations
-        recommendations = get_groq_recommendations(seo_data)
+    if isinstance(fields, str):
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+    if fields is not None and (not isinstance(fields, list) or not all(isinstance(f, str) and f for f in fields)):
+        raise HTTPException(status_code=400, detail="fields must be a list of field paths, e.g. [\"seo_data.title\"]")
 
-        return {
-            "seo_data": seo_data,
-            "recommendations": recommendations.get("recommendations", []),
-            "fastmcp_context": recommendations.get("fastmcp_context", {})
-        }
+    try:
+        result = shape_body_text(await analyze_url(clean_url(url), mode, check_links=check_links, audit_images=audit_images), text_mode)
+        if fields:
+            result = project_fields(result, fields)
 
+    except ExecutorSaturated:
+        raise
     except Exception as e:
-        return {"error": f"Error analyzing website: {str(e)}"}
+        result = {"error": f"Error analyzing website: {str(e)}"}
+
+    return compact_json_response(request, result)
+
+
+@app.post("/api/analyze/stream")
+async def api_analyze_website_stream(request: Request):
+    data = await request.json()
+    url = data.get("url")
+    mode = data.get("mode", "full")
+
+    if not url:
+        raise HTTPException(status_code=400, detail="URL is required")
+
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
+
+    return event_stream_response(stream_analysis_events(clean_url(url), mode))
+
+
+@app.post("/api/analyze/batch")
+async def api_analyze_batch(request: Request):
+    data = await request.json()
+    urls = data.get("urls")
+    mode = data.get("mode", "full")
+    concurrency = data.get("concurrency", BATCH_CONCURRENCY)
+    cluster = data.get("cluster", True)
+
+    if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls):
+        raise HTTPException(status_code=400, detail="urls must be a non-empty list of URLs")
+
+    if len(urls) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_URLS} URLs per batch")
+
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
+
+    if not isinstance(concurrency, int) or concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be a positive integer")
+
+    if not isinstance(cluster, bool):
+        raise HTTPException(status_code=400, detail="cluster must be true or false")
+
+    return StreamingResponse(
+        stream_batch_analysis(
+            [clean_url(u) for u in urls],
+            mode,
+            min(concurrency, BATCH_CONCURRENCY),
+            BATCH_HOST_INTERVAL,
+            cluster
+        ),
+        media_type="application/x-ndjson"
+    )
+
+
+@app.post("/api/jobs", status_code=202)
+async def api_submit_job(request: Request):
+    data = await request.json()
+    url = data.get("url")
+    mode = data.get("mode", "full")
+    business_context = data.get("business_context")
+
+    if not url:
+        raise HTTPException(status_code=400, detail="URL is required")
+
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(ANALYSIS_MODES)}")
+
+    if business_context is not None and not isinstance(business_context, dict):
+        raise HTTPException(status_code=400, detail="business_context must be an object")
+
+    job_id = await job_queue.submit(clean_url(url), mode, business_context)
+    return {"id": job_id, "status": "queued"}
+
+
+@app.get("/api/jobs/{job_id}")
+async def api_get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {
+        "id": job["id"],
+        "status": job["status"],
+        "url": job["url"],
+        "mode": job["mode"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+    if job["result"] is not None:
+        response["result"] = json.loads(job["result"])
+    if job["error"] is not None:
+        response["error"] = job["error"]
+    return response
+
+
+@app.get("/api/history")
+async def api_history(url: Optional[str] = None, domain: Optional[str] = None, limit: int = 50):
+    if not url and not domain:
+        raise HTTPException(status_code=400, detail="url or domain is required")
+    limit = max(1, min(limit, 500))
+    return {"snapshots": await asyncio.to_thread(history_store.list, clean_url(url) if url else None, domain, limit)}
+
+
+@app.get("/api/history/diff")
+async def api_history_diff(
+        url: Optional[str] = None,
+        from_id: Optional[int] = Query(None, alias="from"),
+        to_id: Optional[int] = Query(None, alias="to")
+):
+    if from_id is None or to_id is None:
+        if not url:
+            raise HTTPException(status_code=400, detail="Give from and to snapshot ids, or a url to compare its last two snapshots")
+        recent = await asyncio.to_thread(history_store.list, clean_url(url), None, 2)
+        if len(recent) < 2:
+            raise HTTPException(status_code=404, detail="Fewer than two snapshots for this URL")
+        to_id, from_id = recent[0]["id"], recent[1]["id"]
+
+    before = await asyncio.to_thread(history_store.get, from_id)
+    after = await asyncio.to_thread(history_store.get, to_id)
+    if before is None or after is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return history_store.diff(before, after)
+
+
+@app.get("/api/history/{snapshot_id}")
+async def api_history_snapshot(snapshot_id: int):
+    snapshot = await asyncio.to_thread(history_store.get, snapshot_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return snapshot
+
+
+@app.post("/api/crawl")
+async def api_crawl_site(request: Request):
+    data = await request.json()
+    url = data.get("url")
+    max_pages = data.get("max_pages", 50)
+    max_depth = data.get("max_depth", 3)
+    include_recommendations = data.get("recommendations") or False
+    cluster = data.get("cluster", True)
+
+    if not url:
+        raise HTTPException(status_code=400, detail="URL is required")
+
+    if include_recommendations not in (True, False, "fast"):
+        raise HTTPException(status_code=400, detail='recommendations must be true, false or "fast"')
+
+    if not isinstance(cluster, bool):
+        raise HTTPException(status_code=400, detail="cluster must be true or false")
+
+    for name, value, limit in (("max_pages", max_pages, CRAWL_MAX_PAGES), ("max_depth", max_depth, CRAWL_MAX_DEPTH)):
+        if not isinstance(value, int) or value < 0 or value > limit:
+            raise HTTPException(status_code=400, detail=f"{name} must be an integer between 0 and {limit}")
+
+    if max_pages < 1:
+        raise HTTPException(status_code=400, detail="max_pages must be at least 1")
+
+    return StreamingResponse(
+        stream_site_crawl(clean_url(url), max_pages, max_depth, CRAWL_CONCURRENCY, include_recommendations, cluster),
+        media_type="application/x-ndjson"
+    )
+
+
+startup_stats["import"] = time.perf_counter() - IMPORT_STARTED
 
 
 if __name__ == "__main__":
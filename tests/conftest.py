@@ -0,0 +1,11 @@
+import os
+import pathlib
+import sys
+
+# Keep the app's on-disk stores out of the tests
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["HISTORY_DB_PATH"] = ""
+os.environ["JOBS_DB_PATH"] = ":memory:"
+os.environ["WARMUP_ON_STARTUP"] = "0"
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
@@ -0,0 +1,54 @@
+import asyncio
+import pathlib
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import scrap
+
+JSON_LD = (pathlib.Path(__file__).resolve().parent / "fixtures" / "json_ld.html").read_text(encoding="utf-8")
+
+
+@pytest.fixture
+def client():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/part":
+            return httpx.Response(200, html='<script type="application/ld+json">{"mpn": -9223372036854775809}</script>')
+        return httpx.Response(200, html=JSON_LD)
+
+    scrap._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scrap.seo_cache.clear()
+    yield TestClient(scrap.app)
+    asyncio.run(scrap.close_http_client())
+
+
+def test_fast_analysis_keeps_json_ld_integers_exact(client):
+    response = client.post("/api/analyze", json={"url": "https://example.com/product", "mode": "fast"})
+
+    assert response.status_code == 200
+    product = response.json()["seo_data"]["structured_data"][0]
+    assert product["gtin"] == 123456789012345678901234567890
+    assert product["sku"] == -18446744073709551616
+    assert product["mpn"] == -9223372036854775809
+
+
+def test_full_analysis_keeps_json_ld_integers_exact(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(scrap, "llm_router", scrap.LLMRouter([scrap.StubBackend("0")], 5, False, 1))
+    monkeypatch.setattr(scrap, "history_store", scrap.HistoryStore(str(tmp_path / "history.sqlite3"), 10))
+
+    result = client.post("/api/analyze", json={"url": "https://example.com/product"}).json()
+
+    assert "error" not in result
+    assert result["recommendations"][0]["parameter"] == "Title Tag"
+    stored = scrap.history_store.get(result["snapshot_id"])["seo_data"]["structured_data"][0]
+    assert stored["gtin"] == 123456789012345678901234567890
+    assert stored["mpn"] == -9223372036854775809
+    scrap.history_store.close()
+
+
+def test_negative_integers_below_64_bits_stay_exact(client):
+    # The page's only out-of-range integer has 19 digits
+    response = client.post("/api/analyze", json={"url": "https://example.com/part", "mode": "fast"})
+
+    assert response.json()["seo_data"]["structured_data"] == [{"mpn": -9223372036854775809}]
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+import scrap
+
+
+def test_batches_share_the_host_interval_and_concurrency(monkeypatch):
+    starts, in_flight, peak = [], [0], [0]
+
+    async def analyze_url(url, mode, lane="interactive", clusters=None):
+        starts.append((scrap.urlparse(url).netloc, time.monotonic()))
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.02)
+        in_flight[0] -= 1
+        return {"recommendations": []}
+
+    async def batch(urls):
+        return [line async for line in scrap.stream_batch_analysis(urls, "full", 4, 0.05)]
+
+    async def run():
+        monkeypatch.setattr(scrap, "_bulk_limits", scrap.BulkLimits(3))
+        urls = [f"https://example.com/{i}" for i in range(4)]
+        others = [f"https://other{i}.example/" for i in range(8)]
+        await asyncio.gather(batch(urls), batch(urls), batch(others))
+
+    monkeypatch.setattr(scrap, "analyze_url", analyze_url)
+    asyncio.run(run())
+
+    assert len(starts) == 16
+    assert peak[0] == 3
+    # Eight example.com pages from two batches, still one every 0.05s
+    shared_host = sorted(t for host, t in starts if host == "example.com")
+    assert len(shared_host) == 8
+    assert min(b - a for a, b in zip(shared_host, shared_host[1:])) >= 0.045
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import scrap
+
+
+def page(path: str, text: str) -> dict:
+    seo_data = scrap.empty_seo_data(f"https://shop.example/{path}")
+    seo_data["title"] = {"content": f"{path} | Shop", "length": len(path) + 7}
+    seo_data["meta_description"] = f"Buy {path} online"
+    seo_data["headings"]["h1"] = [path]
+    seo_data["content"]["text"] = text
+    return seo_data
+
+
+class FakeLLM:
+    """
+    get_groq_recommendations stand-in that fails its first `failures` calls
+    """
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = []
+        self.analyses = []
+        self._lock = threading.Lock()
+
+    def __call__(self, seo_data, business_context=None, lane="interactive", analysis=None):
+        with self._lock:
+            self.calls.append(seo_data["url"])
+            self.analyses.append(analysis)
+            failed = len(self.calls) <= self.failures
+        if failed:
+            return {"recommendations": [{"parameter": "API Error"}], "fastmcp_context": {}}
+        keyword = analysis["content_context"]["keywords"][0] if analysis["content_context"]["keywords"] else ""
+        examples = [seo_data["url"], f"Buy {keyword.title()} Online", f"Fast delivery of {keyword}"]
+        return {"recommendations": [{"parameter": "Title Tag", "examples": examples}],
+                "fastmcp_context": {}, "usage": {"prompt_tokens": 1}}
+
+
+def recommend_all(clusters, pages):
+    async def run():
+        return await asyncio.gather(*(clusters.recommend(seo_data) for seo_data in pages))
+    return asyncio.run(run())
+
+
+def product_name(i: int) -> str:
+    return "".join(chr(ord("a") + (i * 7 + k * 3) % 26) for k in range(6)) + "er"
+
+
+def test_product_pages_of_one_template_share_a_cluster(monkeypatch):
+    # Enough pages to switch keyword ranking to TF-IDF part way through
+    monkeypatch.setattr(scrap, "keyword_corpus", scrap.KeywordCorpus(5, 1000, 1000))
+    llm = FakeLLM()
+    monkeypatch.setattr(scrap, "get_groq_recommendations", llm)
+    clusters = scrap.TemplateClusters()
+    names = [product_name(i) for i in range(40)]
+    pages = [page(name, f"{name} {name} {name} trail shoes with grip, free shipping and returns") for name in names]
+
+    results = recommend_all(clusters, pages)
+
+    assert clusters.stats == {"clusters": 1, "llm_calls": 1, "shared": 39}
+    # The leader's prompt was built from the analysis its signature came from
+    assert llm.analyses[0]["content_context"]["keywords"][0] == names[0]
+    for name, result in zip(names, results):
+        examples = result["recommendations"][0]["examples"]
+        assert examples[1:] == [f"Buy {name.title()} Online", f"Fast delivery of {name}"]
+
+
+def test_members_make_their_own_call_when_the_leader_fails(monkeypatch):
+    llm = FakeLLM(failures=1)
+    monkeypatch.setattr(scrap, "get_groq_recommendations", llm)
+    clusters = scrap.TemplateClusters()
+    pages = [page(f"boots-{i}", "boots boots boots leather") for i in range(3)]
+
+    leader, *members = recommend_all(clusters, pages)
+
+    assert leader["recommendations"][0]["parameter"] == "API Error"
+    assert all(result["recommendations"][0]["parameter"] == "Title Tag" for result in members)
+    assert clusters.stats == {"clusters": 2, "llm_calls": 2, "shared": 1}
+
+
+def test_page_without_keywords(monkeypatch):
+    monkeypatch.setattr(scrap, "get_groq_recommendations", FakeLLM())
+    seo_data = page("cart", "Buy now")
+
+    result, = recommend_all(scrap.TemplateClusters(), [seo_data])
+
+    assert result["recommendations"][0]["parameter"] == "Title Tag"
@@ -0,0 +1,41 @@
+import asyncio
+import json
+
+import httpx
+
+import scrap
+
+PAGES = {
+    "/": '<a href="https://www.example.com/a">a</a> <a href="/b">b</a> <a href="https://other.net/">x</a>',
+    "/a": '<a href="https://example.com/c">c</a>',
+    "/b": '<h1>B</h1>',
+    "/c": '<h1>C</h1>',
+}
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "example.com" and request.url.path == "/":
+        return httpx.Response(301, headers={"location": "https://www.example.com/"})
+    if request.url.path == "/robots.txt":
+        return httpx.Response(404)
+    if request.url.host.endswith("example.com") and request.url.path in PAGES:
+        return httpx.Response(200, html=PAGES[request.url.path])
+    return httpx.Response(404)
+
+
+async def crawl(seed: str):
+    scrap._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+    try:
+        return [json.loads(line) async for line in scrap.stream_site_crawl(seed, 10, 3, 2)]
+    finally:
+        await scrap.close_http_client()
+
+
+def test_crawl_follows_seed_redirect_to_www():
+    lines = asyncio.run(crawl("https://example.com"))
+    urls = sorted(line["url"] for line in lines[:-1])
+
+    assert urls == ["https://example.com", "https://example.com/c", "https://www.example.com/a",
+                    "https://www.example.com/b"]
+    assert all("error" not in line for line in lines[:-1])
+    assert lines[-1]["summary"]["pages"] == 4
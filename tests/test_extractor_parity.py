@@ -0,0 +1,159 @@
+# SEOExtractor must give the same seo_data as the BeautifulSoup extractor it
+# replaced, field by field. The one intended difference is how links are split
+# into internal and external, covered by test_link_classification below.
+import gzip
+import json
+import pathlib
+
+import pytest
+from bs4 import BeautifulSoup
+
+import scrap
+
+FIXTURES = pathlib.Path(__file__).resolve().parent / "fixtures"
+CORPUS = pathlib.Path(__file__).resolve().parent.parent / "benchmarks" / "corpus"
+PAGE_URL = "https://example.com/shop/page"
+
+
+def bs4_seo_data(html: str, url: str) -> dict:
+    """
+    The original BeautifulSoup extractor, kept as the reference
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    seo_data = scrap.empty_seo_data(url)
+    seo_data["title"] = {
+        "content": soup.title.string if soup.title else None,
+        "length": len(soup.title.string) if soup.title and soup.title.string else 0
+    }
+
+    meta_description = soup.find('meta', attrs={'name': 'description'})
+    if meta_description:
+        seo_data["meta_description"] = meta_description.get('content', '')
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if meta_keywords:
+        seo_data["meta_keywords"] = meta_keywords.get('content', '')
+
+    for i in range(1, 7):
+        seo_data["headings"][f'h{i}'] = [h.get_text().strip() for h in soup.find_all(f'h{i}')]
+
+    images = soup.find_all('img')
+    seo_data["images"]["total"] = len(images)
+    for img in images:
+        if not img.get('alt') or img.get('alt') == '':
+            seo_data["images"]["without_alt"] += 1
+        else:
+            seo_data["images"]["with_alt"] += 1
+
+    links = soup.find_all('a', href=True)
+    seo_data["links"]["total"] = len(links)
+    parsed_url = scrap.urlparse(url)
+    domain = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    for link in links:
+        href = link['href']
+        if href.startswith('http'):
+            if domain in href:
+                seo_data["links"]["internal"] += 1
+            else:
+                seo_data["links"]["external"] += 1
+        elif href.startswith('/'):
+            seo_data["links"]["internal"] += 1
+
+    if soup.body:
+        text = soup.body.get_text()
+        seo_data["content"]["text"] = text
+        seo_data["content"]["word_count"] = len(text.split())
+
+    for key in ("title", "description", "image", "url"):
+        tag = soup.find('meta', property=f'og:{key}')
+        if tag:
+            seo_data["open_graph"][key] = tag.get('content', '')
+    for key in ("card", "title", "description", "image"):
+        tag = soup.find('meta', attrs={'name': f'twitter:{key}'})
+        if tag:
+            seo_data["twitter_card"][key] = tag.get('content', '')
+
+    canonical = soup.find('link', rel='canonical')
+    if canonical:
+        seo_data["canonical"] = canonical.get('href', '')
+    robots = soup.find('meta', attrs={'name': 'robots'})
+    if robots:
+        seo_data["robots"] = robots.get('content', '')
+
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            seo_data["structured_data"].append(json.loads(script.string))
+        except:
+            pass
+    return seo_data
+
+
+def _pages():
+    for path in sorted(FIXTURES.glob("*.html")):
+        yield pytest.param(path.read_text(encoding="utf-8"), id=path.name)
+    for path in sorted(CORPUS.glob("*.html.gz")):
+        yield pytest.param(gzip.decompress(path.read_bytes()).decode("utf-8"), id=path.name)
+
+
+PAGES = list(_pages())
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_matches_beautifulsoup(html):
+    expected = bs4_seo_data(html, PAGE_URL)
+    actual = scrap.parse_seo_html(html, PAGE_URL)
+
+    assert actual["links"]["total"] == expected["links"]["total"]
+    expected.pop("links"), actual.pop("links")
+    assert actual == expected
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_chunked_feed_matches_single_feed(html):
+    extractor = scrap.SEOExtractor(PAGE_URL)
+    for start in range(0, len(html), 997):
+        extractor.feed(html[start:start + 997])
+    extractor.close()
+    assert extractor.result() == scrap.parse_seo_html(html, PAGE_URL)
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_page_record_round_trip(html):
+    assert scrap.extract_page(html, PAGE_URL).as_dict() == scrap.parse_seo_html(html, PAGE_URL)
+
+
+def test_link_classification():
+    # Intended difference: hosts are compared after resolving the href, so
+    # relative links and the www. host count as internal, and lookalike hosts
+    # or URLs merely mentioning the site as external. The old substring test
+    # got all four wrong.
+    html = """<body>
+        <a href="page">relative</a>
+        <a href="../up">parent</a>
+        <a href="//example.com/x">protocol-relative</a>
+        <a href="https://www.example.com/y">www host</a>
+        <a href="https://example.com.evil.net/">lookalike</a>
+        <a href="https://other.net/?ref=https://example.com">query mention</a>
+        <a href="mailto:hi@example.com">mail</a>
+    </body>"""
+    expected = bs4_seo_data(html, PAGE_URL)["links"]
+    actual = scrap.parse_seo_html(html, PAGE_URL)["links"]
+
+    assert expected == {"internal": 3, "external": 1, "total": 7}
+    assert actual == {"internal": 4, "external": 2, "total": 7}
+
+
+@pytest.mark.parametrize("value", [2 ** 64, -2 ** 63 - 1, 2 ** 64 - 1, -2 ** 63])
+def test_page_record_keeps_json_ld_integers_exact(value):
+    html = f'<script type="application/ld+json">{{"sku": {value}}}</script>'
+    assert scrap.extract_page(html, PAGE_URL).as_dict()["structured_data"] == [{"sku": value}]
+
+
+def test_tree_building_rules_match_bs4():
+    from bs4.builder import HTMLParserTreeBuilder
+    from bs4.dammit import EntitySubstitution
+
+    assert scrap.VOID_TAGS == HTMLParserTreeBuilder.empty_element_tags
+    assert scrap.PRESERVE_WHITESPACE_TAGS == HTMLParserTreeBuilder.DEFAULT_PRESERVE_WHITESPACE_TAGS
+    assert scrap.STRING_CONTAINER_TAGS == set(HTMLParserTreeBuilder.DEFAULT_STRING_CONTAINERS)
+    assert scrap.ASCII_SPACES == BeautifulSoup.ASCII_SPACES
+    assert scrap.HTML_ENTITIES == EntitySubstitution.HTML_ENTITY_TO_CHARACTER
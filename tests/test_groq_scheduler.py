@@ -0,0 +1,118 @@
+import threading
+import time
+
+import httpx
+import pytest
+from groq import Groq
+
+import scrap
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "model",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+}
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeGroq:
+    """
+    Chat completions endpoint answering 429 to the first `limited` requests
+    """
+
+    def __init__(self, limited: int = 0, retry_after: str = "0.2"):
+        self.limited = limited
+        self.retry_after = retry_after
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(time.monotonic())
+        if len(self.requests) <= self.limited:
+            return httpx.Response(429, headers={"retry-after": self.retry_after},
+                                  json={"error": {"message": "Rate limit reached"}})
+        return httpx.Response(200, json=COMPLETION)
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    def install(server: FakeGroq) -> FakeGroq:
+        http_client = httpx.Client(transport=httpx.MockTransport(server))
+        monkeypatch.setattr(scrap, "client", Groq(api_key="test", max_retries=0, http_client=http_client))
+        return server
+    return install
+
+
+def scheduler(tpm: int = 0, rpm: int = 0, max_retries: int = 3) -> scrap.GroqScheduler:
+    return scrap.GroqScheduler(tpm, rpm, max_retries, {"interactive": 5, "batch": None})
+
+
+def create(groq: scrap.GroqScheduler, lane: str = "interactive"):
+    return groq.create(lane, MESSAGES, model="model", max_tokens=100)
+
+
+def test_requests_per_minute(fake_groq):
+    server = fake_groq(FakeGroq())
+    groq = scheduler(rpm=2)
+    now = time.monotonic()
+    groq._window.extend([[now - 59.8, 1], [now - 30, 1]])  # the older one frees up in 0.2s
+
+    started = time.monotonic()
+    create(groq)
+
+    assert server.requests[0] - started >= 0.15
+    assert groq.snapshot()["window_requests"] == 2
+
+
+def test_tokens_per_minute(fake_groq):
+    server = fake_groq(FakeGroq())
+    groq = scheduler(tpm=1000)
+    now = time.monotonic()
+    groq._window.extend([[now - 59.8, 900], [now - 30, 50]])
+
+    started = time.monotonic()
+    completion = create(groq)
+
+    assert server.requests[0] - started >= 0.15
+    # The reservation is replaced by what the call really used
+    assert groq.snapshot()["window_tokens"] == 50 + completion.usage.total_tokens
+
+
+def test_429_waits_for_retry_after(fake_groq):
+    server = fake_groq(FakeGroq(limited=1, retry_after="0.3"))
+    groq = scheduler()
+
+    assert create(groq).choices[0].message.content == "ok"
+    assert server.requests[1] - server.requests[0] >= 0.25
+    assert (groq.stats["rate_limited"], groq.stats["retries"]) == (1, 1)
+
+
+def test_429_after_the_last_retry(fake_groq):
+    fake_groq(FakeGroq(limited=3, retry_after="0"))
+
+    with pytest.raises(scrap.GroqRateLimited) as raised:
+        create(scheduler(max_retries=2))
+    assert not raised.value.local
+
+
+def test_interactive_calls_go_before_waiting_batch_calls(fake_groq):
+    fake_groq(FakeGroq())
+    groq = scheduler(rpm=2)
+    now = time.monotonic()
+    groq._window.extend([[now - 59.8, 1], [now - 59.6, 1]])
+    order = []
+
+    def call(lane: str):
+        create(groq, lane)
+        order.append(lane)
+
+    batch = threading.Thread(target=call, args=("batch",))
+    batch.start()
+    time.sleep(0.05)  # the batch call is already waiting for the first free slot
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    batch.join(5), interactive.join(5)
+
+    assert order == ["interactive", "batch"]
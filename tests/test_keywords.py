@@ -0,0 +1,23 @@
+import scrap
+
+
+def page(text: str) -> dict:
+    seo_data = scrap.empty_seo_data("https://example.com/page")
+    seo_data["title"] = {"content": "Trail running shoes", "length": 19}
+    seo_data["meta_description"] = "Trail running shoes with grip"
+    seo_data["content"]["text"] = text
+    return seo_data
+
+
+def test_cache_key_does_not_depend_on_the_keyword_corpus(monkeypatch):
+    monkeypatch.setattr(scrap, "keyword_corpus", scrap.KeywordCorpus(3, 1000, 1000))
+    seo_data = page("shoes shoes shoes shoes trail trail trail running running grip")
+    before = scrap.build_groq_request(seo_data, None)
+
+    # Pages that all mention shoes push that term down once TF-IDF kicks in
+    for i in range(5):
+        scrap.analyze_content_context(f"shoes shoes shoes shoes store{i} catalog{i} ")
+    after = scrap.build_groq_request(seo_data, None)
+
+    assert after["content_context"]["keywords"] != before["content_context"]["keywords"]
+    assert after["cache_key"] == before["cache_key"]
@@ -0,0 +1,48 @@
+import asyncio
+
+import httpx
+import pytest
+
+import scrap
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.method == "HEAD" and request.url.path == "/drops-head":
+        raise httpx.RemoteProtocolError("Server disconnected without sending a response", request=request)
+    if request.url.path == "/image.png":
+        if request.method == "HEAD":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return httpx.Response(206, headers={"content-range": "bytes 0-0/5000"}, content=b"x")
+    return httpx.Response(200)
+
+
+@pytest.fixture
+def mock_client():
+    scrap._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    scrap.link_cache.clear()
+    scrap.image_cache.clear()
+    yield
+    asyncio.run(scrap.close_http_client())
+
+
+@pytest.mark.parametrize("href", ["http://[bad/x", "http://a]b/", "http://exa＃mple.com/"])
+def test_malformed_hosts_are_not_links(href):
+    assert scrap.resolve_link(href, "https://example.com/") is None
+    assert scrap.crawlable_link(href, "https://example.com/", "example.com") is None
+    assert scrap.parse_seo_html(f'<a href="{href}">x</a>', "https://example.com/")["links"]["total"] == 1
+
+
+def test_unrequestable_urls_are_reported_invalid(mock_client):
+    link = asyncio.run(scrap.check_link("http://[bad/x"))
+    image = asyncio.run(scrap.probe_image("http://[bad/x.png"))
+
+    assert link["status"] == "invalid" and not link["ok"]
+    assert image["status"] == "invalid" and image["bytes"] is None
+
+
+def test_head_transport_errors_fall_back_to_get(mock_client):
+    link = asyncio.run(scrap.check_link("https://example.com/drops-head"))
+    image = asyncio.run(scrap.probe_image("https://example.com/image.png"))
+
+    assert (link["status"], link["method"], link["ok"]) == (200, "GET", True)
+    assert image["bytes"] == 5000
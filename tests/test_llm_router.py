@@ -0,0 +1,72 @@
+import threading
+import time
+import types
+
+import pytest
+
+import scrap
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        message = types.SimpleNamespace(content="{}")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def completions(monkeypatch):
+    fake = FakeCompletions()
+    monkeypatch.setattr(scrap, "client", types.SimpleNamespace(chat=types.SimpleNamespace(completions=fake)))
+    return fake
+
+
+def scheduler(max_wait: float) -> scrap.GroqScheduler:
+    return scrap.GroqScheduler(0, 1, 0, {"interactive": max_wait})
+
+
+def test_deadline_starts_once_the_budget_has_room(monkeypatch, completions):
+    groq = scheduler(5)
+    groq.acquire(1, "interactive")[0] -= 59.5  # frees up in half a second
+    monkeypatch.setattr(scrap, "groq_scheduler", groq)
+    backend = scrap.GroqBackend("model")
+
+    started = time.monotonic()
+    backend.complete([{"role": "user", "content": "hi"}], "interactive", scrap.LLMDeadline(0.3))
+
+    assert time.monotonic() - started >= 0.4
+    assert 0.2 < completions.calls[0]["timeout"] <= 0.3
+
+
+def test_local_rate_limit_rejection_is_not_a_backend_failure(monkeypatch, completions):
+    groq = scheduler(0.05)
+    groq.acquire(1, "interactive")
+    monkeypatch.setattr(scrap, "groq_scheduler", groq)
+    backend = scrap.GroqBackend("model")
+
+    for _ in range(scrap.LLM_FAILURE_THRESHOLD):
+        with pytest.raises(scrap.GroqRateLimited):
+            backend.complete([{"role": "user", "content": "hi"}], "interactive", scrap.LLMDeadline(10))
+
+    assert backend.stats["failures"] == 0
+    assert backend.available()
+    assert not completions.calls
+
+
+def test_losing_hedge_is_cancelled(monkeypatch):
+    monkeypatch.setattr(scrap, "LLM_HEDGE_DELAY", 0.1)
+    slow, fast = scrap.StubBackend("5"), scrap.StubBackend("0.05")
+    router = scrap.LLMRouter([slow, fast], 10, True, 2)
+    try:
+        text, usage, route = router.complete([{"role": "user", "content": "hi"}], "interactive")
+        assert route == {"backend": fast.name, "hedged": True}
+
+        # The slow call lets go of its thread instead of sleeping out its 5s
+        both = threading.Barrier(2, timeout=1)
+        assert all(f.result() is not None for f in [router._pool.submit(both.wait) for _ in range(2)])
+        assert slow.stats["failures"] == 0 and slow.available()
+    finally:
+        router.close()
@@ -0,0 +1,23 @@
+import scrap
+
+
+def page_without_description() -> dict:
+    seo_data = scrap.parse_seo_html("<title>Trail running shoes</title><body><h1>Shoes</h1></body>", "https://example.com/")
+    assert seo_data["meta_description"] is None
+    return seo_data
+
+
+def test_prompt_for_a_page_without_description():
+    messages = scrap.build_groq_request(page_without_description(), None)["messages"]
+    prompt = "\n".join(message["content"] for message in messages)
+
+    assert "- Current: MISSING\n- Length: 0 characters" in prompt
+
+
+def test_recommendations_for_a_page_without_description(monkeypatch):
+    monkeypatch.setattr(scrap, "llm_router", scrap.LLMRouter([scrap.StubBackend("0")], 5, False, 1))
+
+    result = scrap.get_groq_recommendations(page_without_description())
+
+    assert [item["parameter"] for item in result["recommendations"]] == ["Title Tag"]
+    assert result["usage"]["backend"] == "stub:0"
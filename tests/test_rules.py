@@ -0,0 +1,31 @@
+import pytest
+
+import scrap
+
+
+@pytest.mark.parametrize("text", ["Buy now", "Buy it", "Hi all", ""])
+def test_rules_without_keywords(text):
+    # Short pages have no term over 3 characters, whatever their content type
+    seo_data = scrap.empty_seo_data("https://example.com/")
+    seo_data["content"]["text"] = text
+
+    result = scrap.rule_recommendations(seo_data)
+
+    assert result["fastmcp_context"]["keywords"] == []
+    titles = next(item for item in result["recommendations"] if item["parameter"] == "Title Tag")
+    assert len(titles["examples"]) == 3
+
+
+def test_fast_mode_analysis_of_a_page_without_keywords(monkeypatch):
+    page = scrap.PageRecord.from_dict(dict(scrap.empty_seo_data("https://shop.example/"),
+                                           content={"word_count": 2, "text": "Buy now"}))
+
+    async def analyze_page(url, mode):
+        return page
+
+    monkeypatch.setattr(scrap, "analyze_page_async", analyze_page)
+    result = scrap.asyncio.run(scrap.analyze_url("https://shop.example/", "fast"))
+
+    assert "error" not in result
+    assert result["fastmcp_context"]["content_type"] == "e-commerce"
+    assert result["recommendations"]
@@ -0,0 +1,32 @@
+import scrap
+
+
+def record(path: str, chars: int) -> scrap.PageRecord:
+    seo_data = scrap.empty_seo_data(f"https://example.com/{path}")
+    seo_data["content"]["text"] = "x" * chars
+    return scrap.PageRecord.from_dict(seo_data)
+
+
+def test_evicts_least_recently_used_pages_over_the_byte_limit():
+    size = record("a", 100_000).size()
+    cache = scrap.SEOCache(100, 60, max_bytes=int(size * 2.5))
+
+    cache.put("a", record("a", 100_000), {})
+    cache.put("b", record("b", 100_000), {})
+    cache.get("a")
+    cache.put("c", record("c", 100_000), {})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.bytes == 2 * size <= cache.max_bytes
+    assert cache.stats["evictions"] == 1
+
+
+def test_page_larger_than_the_limit_is_not_cached():
+    cache = scrap.SEOCache(100, 60, max_bytes=50_000)
+    cache.put("small", record("small", 1_000), {})
+    cache.put("huge", record("huge", 100_000), {})
+
+    assert cache.get("huge") is None
+    assert cache.get("small") is not None
+    assert cache.bytes == record("small", 1_000).size()
@@ -0,0 +1,11 @@
+import pathlib
+import subprocess
+import sys
+
+STARTUP = pathlib.Path(__file__).resolve().parent.parent / "benchmarks" / "startup.py"
+
+
+def test_import_within_budget_and_lazy_modules_stay_lazy():
+    # benchmarks/startup.py imports the app in fresh interpreters; IMPORT_BUDGET_MS sets the budget
+    completed = subprocess.run([sys.executable, str(STARTUP), "--runs", "3"], capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stdout + completed.stderr